@@ -0,0 +1,159 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from config import PNG_PALETTE_OUTPUT, RENDER_BAND_ROWS
+from png_writer import StreamingPNGWriter
+from reccursive_decoder import BIT_POSITIONS
+from tile_index import matrix_tile_positions
+
+WHITE_INDEX = 0
+BLACK_INDEX = 1
+
+
+@lru_cache(maxsize=None)
+def tile_leaf_map(module_size: int, depth: int) -> np.ndarray:
+    """
+    (module_size, module_size) map from tile pixel to the bit index (within
+    the tile's 8 ** depth bits) that colors it, -1 where the tile stays black.
+    Same geometry as `generate_recursive_t_square_tile_from_bytes`.
+    """
+    leaf = np.full((module_size, module_size), -1, dtype=np.int32)
+
+    def walk(y, x, size, current_depth, byte_base):
+        region = size // 3
+        for i, (col, row) in enumerate(BIT_POSITIONS):
+            y0 = y + row * region
+            x0 = x + col * region
+            if current_depth == 1:
+                leaf[y0:y0 + region, x0:x0 + region] = byte_base * 8 + i
+            else:
+                walk(y0, x0, region, current_depth - 1, byte_base + i * 8 ** (current_depth - 2))
+
+    walk(0, 0, module_size, depth, 0)
+    leaf.setflags(write=False)
+    return leaf
+
+
+def _bits_array(bitstream: str, tiles: int, bits_per_tile: int) -> np.ndarray:
+    """
+    (tiles, bits_per_tile + 1) uint8 bits; the extra column is always 0 and
+    is where `tile_leaf_map`'s -1 (black) entries land when used as an index.
+    """
+    bits = np.zeros((tiles, bits_per_tile + 1), dtype=np.uint8)
+    data = np.frombuffer(bitstream.encode("ascii"), dtype=np.uint8)[:tiles * bits_per_tile] - ord("0")
+    bits[:, :bits_per_tile].flat[:data.size] = data
+    return bits
+
+
+def ticket_palette(layer_colors) -> np.ndarray:
+    """
+    (n, 3) RGB palette for a ticket: white, black, then each distinct layer colour.
+    """
+    colors = [(255, 255, 255), (0, 0, 0)]
+    for color in layer_colors:
+        if tuple(color[:3]) not in colors:
+            colors.append(tuple(color[:3]))
+    return np.array(colors, dtype=np.uint8)
+
+
+def plan_segments(layers, total_tiles: int, palette: np.ndarray) -> list[tuple]:
+    """
+    Lays (bitstream, depth, color) layers onto consecutive tiles the way
+    successive `render_qr_with_t_squares_partial` calls do.
+    Returns (start_tile, tile_count, bits, depth, shades) per layer, where
+    shades maps a leaf bit to the palette index of black or the layer colour.
+    """
+    segments = []
+    tile = 0
+    for bitstream, depth, color in layers:
+        bits_per_tile = 8 ** depth
+        count = min(math.ceil(len(bitstream) / bits_per_tile), total_tiles - tile)
+        if count <= 0:
+            continue
+        color_index = int(np.flatnonzero((palette == color[:3]).all(axis=1))[0])
+        shades = np.array([BLACK_INDEX, color_index], dtype=np.uint8)
+        segments.append((tile, count, _bits_array(bitstream, count, bits_per_tile), depth, shades))
+        tile += count
+    return segments
+
+
+def render_index_bands(matrix, layers, module_size: int, palette: np.ndarray, band_rows: int = RENDER_BAND_ROWS):
+    """
+    Yields the ticket top to bottom as (band_rows * module_size, width) bands
+    of `palette` indices (the last band may be shorter): white light modules,
+    black dark modules, and each layer's T-square tiles drawn in scan order.
+    """
+    grid = np.asarray(matrix, dtype=bool)
+    positions = matrix_tile_positions(grid)
+    segments = plan_segments(layers, len(positions), palette)
+    qr_size = grid.shape[0]
+
+    for row0 in range(0, qr_size, band_rows):
+        row1 = min(qr_size, row0 + band_rows)
+        band = np.full(((row1 - row0) * module_size, qr_size * module_size), WHITE_INDEX, dtype=np.uint8)
+        # (module row, pixel row, module col, pixel col) view of the band
+        modules = band.reshape(row1 - row0, module_size, qr_size, module_size)
+        # Dark modules are numbered in scan order, so a band holds a contiguous tile range
+        first, last = np.searchsorted(positions[:, 0], [row0, row1])
+        band_pos = positions[first:last]
+        modules[band_pos[:, 0] - row0, :, band_pos[:, 1]] = BLACK_INDEX
+        for start, count, bits, depth, shades in segments:
+            lo = max(first, start)
+            hi = min(last, start + count)
+            if lo >= hi:
+                continue
+            leaf = tile_leaf_map(module_size, depth) % bits.shape[1]
+            lit = np.take(bits[lo - start:hi - start], leaf, axis=1)
+            tile_pos = positions[lo:hi]
+            modules[tile_pos[:, 0] - row0, :, tile_pos[:, 1]] = shades[lit]
+        yield band
+
+
+def paint_tiles(image: np.ndarray, positions: np.ndarray, tile_bytes: bytes, module_size: int, depth: int, shades: np.ndarray) -> None:
+    """
+    Repaints whole tiles of a rendered ticket in place. `image` is its (h, w)
+    palette-index or (h, w, 3) RGB array, `positions` the (row, col) of each
+    tile to paint, `tile_bytes` their leaf bits (8 ** depth per tile, in
+    order) and `shades` the pixel value of an unlit and a lit leaf.
+    """
+    bits_per_tile = 8 ** depth
+    bits = np.zeros((len(positions), bits_per_tile + 1), dtype=np.uint8)
+    bits[:, :bits_per_tile] = np.unpackbits(np.frombuffer(tile_bytes, dtype=np.uint8)).reshape(len(positions), bits_per_tile)
+    leaf = tile_leaf_map(module_size, depth) % bits.shape[1]
+    grid_h, grid_w = image.shape[0] // module_size, image.shape[1] // module_size
+    # A view, never a copy: setting .shape raises if the array can't be viewed that way
+    modules = image.view()
+    modules.shape = (grid_h, module_size, grid_w, module_size, *image.shape[2:])
+    modules[positions[:, 0], :, positions[:, 1]] = shades[np.take(bits, leaf, axis=1)]
+
+
+def render_bands(matrix, layers, module_size: int, band_rows: int = RENDER_BAND_ROWS):
+    """
+    `render_index_bands` as (h, width, 3) RGB bands.
+    """
+    palette = ticket_palette(color for _, _, color in layers)
+    for band in render_index_bands(matrix, layers, module_size, palette, band_rows):
+        yield palette[band]
+
+
+def write_ticket_png(
+    target,
+    matrix,
+    layers,
+    module_size: int,
+    band_rows: int = RENDER_BAND_ROWS,
+    palette_output: bool = PNG_PALETTE_OUTPUT,
+    **png_options,
+) -> int:
+    """
+    Renders the ticket band by band straight into a PNG file. Peak memory is
+    one band, not the full image. Returns the number of bytes written.
+    """
+    side = len(matrix) * module_size
+    palette = ticket_palette(color for _, _, color in layers)
+    with StreamingPNGWriter(target, side, side, palette=palette if palette_output else None, **png_options) as writer:
+        for band in render_index_bands(matrix, layers, module_size, palette, band_rows):
+            writer.write_rows(band if palette_output else palette[band])
+    return writer.bytes_written
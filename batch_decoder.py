@@ -0,0 +1,187 @@
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import BATCH_DECODE_PREFETCH, ROLE_SECTIONS, SECTION_KEY_IDS
+from public_layer import load_ticket_pixels, palette_ticket_pixels
+from reccursive_decoder import load_palette_png
+
+EXECUTORS = ("thread", "process")
+
+
+def _image_bytes(item) -> bytes:
+    if isinstance(item, (str, os.PathLike)):
+        with open(item, "rb") as f:
+            return f.read()
+    return bytes(item)
+
+
+def _error_result(exc: Exception) -> dict:
+    # Same shape as the gate service's 422/500 bodies
+    if isinstance(exc, ValueError):
+        return {"error": str(exc)}
+    return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+def _decode_item(role: str, item) -> dict:
+    """
+    Thread executor job: loads and decodes one item in this process.
+    """
+    from main import decode_pixels
+
+    try:
+        if isinstance(item, np.ndarray):
+            return decode_pixels(role, item)
+        pixels, indexed = load_ticket_pixels(_image_bytes(item))
+        return decode_pixels(role, pixels, indexed=indexed)
+    except Exception as exc:
+        return _error_result(exc)
+
+
+def _load_shared(item) -> tuple:
+    """
+    Decodes one item into a new shared-memory block: the index plane of a
+    palette ticket, otherwise its RGB pixels.
+    Returns (block, (block name, shape, dtype, palette or None)).
+    """
+    palette = None
+    if isinstance(item, np.ndarray):
+        array = item
+    else:
+        img_bytes = _image_bytes(item)
+        palette_image = load_palette_png(img_bytes)
+        if palette_image is not None:
+            array, palette = palette_image
+        else:
+            array, _ = load_ticket_pixels(img_bytes)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str, palette)
+
+
+def _init_decode_worker(role: str) -> None:
+    """
+    Runs once per worker process: loads the role's keys and the protobuf section types.
+    """
+    from main import load_key, section_messages
+
+    section_messages()
+    for name in ROLE_SECTIONS.get(role, ()):
+        key_id = SECTION_KEY_IDS.get(name)
+        if key_id:
+            load_key(f"keys/{key_id}_private.pem", is_private=True)
+
+
+def _decode_array(role: str, array: np.ndarray, palette: np.ndarray | None) -> dict:
+    from main import decode_pixels
+
+    if palette is None:
+        return decode_pixels(role, array)
+    pixels, indexed = palette_ticket_pixels(array, palette)
+    return decode_pixels(role, pixels, indexed=indexed)
+
+
+def _decode_shared_job(role: str, descriptor: tuple) -> dict:
+    """
+    Process executor job: decodes pixels another process left in shared memory.
+    """
+    name, shape, dtype, palette = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        result = _decode_array(role, np.ndarray(shape, np.dtype(dtype), buffer=block.buf), palette)
+    except Exception as exc:
+        result = _error_result(exc)
+    # No view of the block is left once the decode (or its traceback) is gone
+    block.close()
+    return result
+
+
+def _release(block: shared_memory.SharedMemory) -> None:
+    block.close()
+    block.unlink()
+
+
+def _submit_shared(loaders: ThreadPoolExecutor, pool: ProcessPoolExecutor, role: str, item) -> Future:
+    """
+    Loads `item` on a loader thread, then decodes it in a worker process.
+    The returned future resolves to the decode result; the block is
+    unlinked as soon as the worker is done with it.
+    """
+    done = Future()
+
+    def decoded(decode_future: Future, block: shared_memory.SharedMemory) -> None:
+        _release(block)
+        try:
+            done.set_result(decode_future.result())
+        except BaseException as exc:
+            done.set_exception(exc)
+
+    def loaded(load_future: Future) -> None:
+        try:
+            block, descriptor = load_future.result()
+        except Exception as exc:
+            done.set_result(_error_result(exc))
+            return
+        except BaseException as exc:
+            done.set_exception(exc)
+            return
+        try:
+            decode_future = pool.submit(_decode_shared_job, role, descriptor)
+        except BaseException as exc:
+            _release(block)
+            done.set_exception(exc)
+            return
+        decode_future.add_done_callback(lambda future: decoded(future, block))
+
+    loaders.submit(_load_shared, item).add_done_callback(loaded)
+    return done
+
+
+def _in_order(futures: Iterator[Future], window: int) -> Iterator[dict]:
+    """
+    Yields future results in submission order, keeping at most `window` in flight.
+    """
+    pending = deque()
+    for future in futures:
+        pending.append(future)
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def decode_many(
+    items: Iterable,
+    role: str = "general",
+    workers: int | None = None,
+    executor: str = "thread",
+) -> Iterator[dict]:
+    """
+    Decodes many tickets for `role` and yields one `decode_with_role`-style
+    result per item, in input order, as they complete. Items are paths,
+    encoded image bytes or decoded RGB arrays; a ticket that fails to decode
+    yields {"error": ...} instead of stopping the batch.
+
+    "thread" decodes in `workers` threads of this process (the image codecs
+    and vectorized sampling release the GIL). "process" decodes images on
+    loader threads and hands the pixels to `workers` processes through
+    shared memory, so no pixel buffer is pickled.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}' (expected one of {list(EXECUTORS)})")
+    workers = workers or os.cpu_count() or 1
+    window = workers * BATCH_DECODE_PREFETCH
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from _in_order((pool.submit(_decode_item, role, item) for item in items), window)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as loaders, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_decode_worker,
+        initargs=(role,),
+    ) as pool:
+        yield from _in_order((_submit_shared(loaders, pool, role, item) for item in items), window)
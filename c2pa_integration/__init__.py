@@ -1,12 +1,33 @@
-from .manifest_builder import build_manifest_payload, compute_commitments
-from .signer import sign_png_with_c2pa, is_c2pa_available, get_c2pa_import_error
-from .verifier import verify_png_with_c2pa
-
-__all__ = [
-    "build_manifest_payload",
-    "compute_commitments",
-    "sign_png_with_c2pa",
-    "verify_png_with_c2pa",
-    "is_c2pa_available",
-    "get_c2pa_import_error",
-]
+import importlib
+
+# Public name -> submodule. Submodules load on first attribute access, so
+# importing e.g. `manifest_builder` for its hashes doesn't pull in the signer's
+# cryptography imports, and signing alone doesn't load the verifier.
+_EXPORTS = {
+    "build_manifest_payload": "manifest_builder",
+    "compute_commitments": "manifest_builder",
+    "sign_png_with_c2pa": "signer",
+    "SigningContext": "signer",
+    "get_signing_context": "signer",
+    "sign_many": "signer",
+    "is_c2pa_available": "availability",
+    "get_c2pa_import_error": "availability",
+    "verify_png_with_c2pa": "verifier",
+    "Verifier": "verifier",
+    "get_verifier": "verifier",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,19 @@
+_C2PA_IMPORT_ERROR = None
+_C2PA_AVAILABLE = None  # Memoized import probe; a failed import is not retried per call
+
+
+def is_c2pa_available() -> bool:
+    global _C2PA_AVAILABLE, _C2PA_IMPORT_ERROR
+    if _C2PA_AVAILABLE is not None:
+        return _C2PA_AVAILABLE
+    try:
+        import c2pa  # noqa: F401
+        _C2PA_AVAILABLE = True
+    except Exception as exc:
+        _C2PA_IMPORT_ERROR = str(exc)
+        _C2PA_AVAILABLE = False
+    return _C2PA_AVAILABLE
+
+
+def get_c2pa_import_error() -> str | None:
+    return _C2PA_IMPORT_ERROR
@@ -3,6 +3,8 @@ import json
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
+INTENT_LABEL = "com.qr_proto.intent"  # Assertion carrying the issuer intent and commitments
+
 
 def _iso_now() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -77,7 +79,7 @@ def build_manifest_payload(
                 },
             },
             {
-                "label": "com.qr_proto.intent",
+                "label": INTENT_LABEL,
                 "data": intent_payload,
             },
         ],
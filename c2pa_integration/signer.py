@@ -1,25 +1,128 @@
 import io
 import json
-from typing import Any, Dict, Optional
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography import x509
 from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
 
+# Re-exported: callers imported the probe from here before it moved
+from .availability import get_c2pa_import_error, is_c2pa_available  # noqa: F401
 
-_C2PA_IMPORT_ERROR = None
+logger = logging.getLogger(__name__)
 
 
-def is_c2pa_available() -> bool:
-    try:
-        import c2pa  # noqa: F401
-        return True
-    except Exception as exc:
-        global _C2PA_IMPORT_ERROR
-        _C2PA_IMPORT_ERROR = str(exc)
-        return False
-def get_c2pa_import_error() -> str | None:
-    return _C2PA_IMPORT_ERROR
+class SigningContext:
+    """
+    Key material and a c2pa Signer loaded once, reusable for many PNGs.
+    Falls back to raising a RuntimeError if c2pa-python isn't installed.
+    """
+
+    def __init__(self, cert_path: str, key_path: str):
+        try:
+            from c2pa import C2paSigningAlg, Signer
+        except Exception as exc:
+            raise RuntimeError(
+                "c2pa-python import failed. "
+                f"Details: {exc}"
+            ) from exc
+
+        self.cert_path = cert_path
+        self.key_path = key_path
+
+        with open(cert_path, "rb") as f:
+            cert_chain_bytes = f.read()
+        cert_chain = cert_chain_bytes.decode("utf-8")
+        with open(key_path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+
+        certs = []
+        try:
+            certs = x509.load_pem_x509_certificates(cert_chain_bytes)
+        except Exception:
+            try:
+                certs = [x509.load_pem_x509_certificate(cert_chain_bytes)]
+            except Exception:
+                certs = []
+
+        logger.debug("Loaded certs: %d", len(certs))
+        for i, cert in enumerate(certs):
+            logger.debug("Cert[%d] subject=%s issuer=%s", i, cert.subject.rfc4514_string(), cert.issuer.rfc4514_string())
+
+        if isinstance(private_key, rsa.RSAPrivateKey):
+            def sign_callback(data: bytes) -> bytes:
+                return private_key.sign(
+                    data,
+                    padding.PSS(
+                        mgf=padding.MGF1(hashes.SHA256()),
+                        salt_length=padding.PSS.MAX_LENGTH,
+                    ),
+                    hashes.SHA256(),
+                )
+            signing_alg = C2paSigningAlg.PS256
+        elif isinstance(private_key, ec.EllipticCurvePrivateKey):
+            def sign_callback(data: bytes) -> bytes:
+                return private_key.sign(
+                    data,
+                    ec.ECDSA(hashes.SHA256()),
+                )
+            signing_alg = C2paSigningAlg.ES256
+        else:
+            raise RuntimeError("Unsupported private key type for C2PA signing.")
+
+        if certs:
+            leaf_pub = certs[0].public_key()
+            key_matches = leaf_pub.public_numbers() == private_key.public_key().public_numbers()
+            logger.debug("Leaf cert matches private key: %s", key_matches)
+            logger.debug("Signing alg: %s", signing_alg)
+            logger.debug("Embedded chain cert count: %d", len(certs))
+
+        self.signing_alg = signing_alg
+        self.signer = Signer.from_callback(
+            callback=sign_callback,
+            alg=signing_alg,
+            certs=cert_chain,
+            tsa_url=None,
+        )
+
+    def sign(
+        self,
+        input_png_bytes: bytes,
+        manifest_payload: Dict[str, Any],
+        output_path: Optional[str] = None,
+    ) -> bytes:
+        """
+        Signs and embeds a C2PA manifest into the PNG bytes.
+        """
+        from c2pa import Builder
+
+        manifest_json = json.dumps(manifest_payload, separators=(",", ":"), sort_keys=True)
+        builder = Builder(manifest_json)
+        result = io.BytesIO()
+        builder.sign(self.signer, "image/png", io.BytesIO(input_png_bytes), result)
+        signed_bytes = result.getvalue()
+
+        if output_path:
+            with open(output_path, "wb") as f:
+                f.write(signed_bytes)
+
+        return signed_bytes
+
+
+# (cert_path, key_path) -> (file mtimes, SigningContext); a rotated key is reloaded
+_CONTEXTS: Dict[Tuple[str, str], Tuple[Tuple[float, float], SigningContext]] = {}
+
+
+def get_signing_context(cert_path: str, key_path: str) -> SigningContext:
+    mtimes = (os.path.getmtime(cert_path), os.path.getmtime(key_path))
+    cached = _CONTEXTS.get((cert_path, key_path))
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+    context = SigningContext(cert_path, key_path)
+    _CONTEXTS[(cert_path, key_path)] = (mtimes, context)
+    return context
 
 
 def sign_png_with_c2pa(
@@ -34,79 +137,63 @@ def sign_png_with_c2pa(
     Signs and embeds a C2PA manifest into the PNG bytes.
     Falls back to raising a RuntimeError if c2pa-python isn't installed.
     """
-    try:
-        from c2pa import Builder, C2paSigningAlg, Signer
-    except Exception as exc:
-        raise RuntimeError(
-            "c2pa-python import failed. "
-            f"Details: {exc}"
-        ) from exc
-
-    manifest_json = json.dumps(manifest_payload, separators=(",", ":"), sort_keys=True)
-
-    with open(cert_path, "rb") as f:
-        cert_chain_bytes = f.read()
-    cert_chain = cert_chain_bytes.decode("utf-8")
-    with open(key_path, "rb") as f:
-        private_key = serialization.load_pem_private_key(f.read(), password=None)
-
-    certs = []
-    try:
-        certs = x509.load_pem_x509_certificates(cert_chain_bytes)
-    except Exception:
-        try:
-            certs = [x509.load_pem_x509_certificate(cert_chain_bytes)]
-        except Exception:
-            certs = []
-
-    cert_chain_for_signing = cert_chain
-
-    print(f"[C2PA] Loaded certs: {len(certs)}")
-    for i, cert in enumerate(certs):
-        print(f"[C2PA] Cert[{i}] subject={cert.subject.rfc4514_string()} issuer={cert.issuer.rfc4514_string()}")
-
-    if isinstance(private_key, rsa.RSAPrivateKey):
-        def sign_callback(data: bytes) -> bytes:
-            return private_key.sign(
-                data,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH,
-                ),
-                hashes.SHA256(),
-            )
-        signing_alg = C2paSigningAlg.PS256
-    elif isinstance(private_key, ec.EllipticCurvePrivateKey):
-        def sign_callback(data: bytes) -> bytes:
-            return private_key.sign(
-                data,
-                ec.ECDSA(hashes.SHA256()),
-            )
-        signing_alg = C2paSigningAlg.ES256
-    else:
-        raise RuntimeError("Unsupported private key type for C2PA signing.")
-
-    if certs:
-        leaf_pub = certs[0].public_key()
-        key_matches = leaf_pub.public_numbers() == private_key.public_key().public_numbers()
-        print(f"[C2PA] Leaf cert matches private key: {key_matches}")
-        print(f"[C2PA] Signing alg: {signing_alg}")
-        print(f"[C2PA] Embedded chain cert count: {len(certs)}")
-
-    signer = Signer.from_callback(
-        callback=sign_callback,
-        alg=signing_alg,
-        certs=cert_chain_for_signing,
-        tsa_url=None,
-    )
-
-    builder = Builder(manifest_json)
-    result = io.BytesIO()
-    builder.sign(signer, "image/png", io.BytesIO(input_png_bytes), result)
-    signed_bytes = result.getvalue()
-
-    if output_path:
-        with open(output_path, "wb") as f:
-            f.write(signed_bytes)
-
-    return signed_bytes
+    return get_signing_context(cert_path, key_path).sign(input_png_bytes, manifest_payload, output_path)
+
+
+# Set in each sign_many worker process by _init_signing_worker
+_WORKER_CONTEXT: Optional[SigningContext] = None
+
+
+def _init_signing_worker(cert_path: str, key_path: str) -> None:
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = SigningContext(cert_path, key_path)
+
+
+def _sign_job(item: Tuple[bytes, Dict[str, Any], Optional[str]]):
+    png_bytes, manifest_payload, output_path = item
+    signed = _WORKER_CONTEXT.sign(png_bytes, manifest_payload, output_path)
+    # Written tickets are not shipped back through the pool pipe
+    return output_path if output_path else signed
+
+
+def sign_many(
+    items: Iterable[Tuple[Any, ...]],
+    *,
+    cert_path: str,
+    key_path: str,
+    workers: Optional[int] = None,
+    prefetch: int = 2,
+) -> Iterator[Any]:
+    """
+    Signs many PNGs, yielding the signed bytes per item in input order, or
+    the output path where one was given. Each item is (png_bytes,
+    manifest_payload) or (png_bytes, manifest_payload, output_path); items
+    are consumed lazily and at most `prefetch` per worker are in flight, so
+    memory stays bounded however many tickets are signed. Every worker
+    process loads the key once in its initializer.
+    """
+    jobs = ((item[0], item[1], item[2] if len(item) > 2 else None) for item in items)
+    # Fail fast here: an initializer error would only surface as BrokenProcessPool
+    context = get_signing_context(cert_path, key_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for png_bytes, manifest_payload, output_path in jobs:
+            signed = context.sign(png_bytes, manifest_payload, output_path)
+            yield output_path if output_path else signed
+        return
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    window = workers * prefetch
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_signing_worker,
+        initargs=(cert_path, key_path),
+    ) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(_sign_job, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
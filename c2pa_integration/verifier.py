@@ -1,58 +1,47 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+import io
 import os
-import tempfile
+import threading
 
-from .signer import is_c2pa_available
+from .manifest_builder import INTENT_LABEL
+from .availability import is_c2pa_available
 
+# c2pa settings are process-global: track which trust store is loaded and how
+# many reads are in flight under it. Reads under the loaded store run
+# concurrently; switching stores waits until none are left, so one verifier
+# never reads under another's trust anchors.
+_SETTINGS_CHANGED = threading.Condition()
+_LOADED_TRUST_STORE = None
+_ACTIVE_READS = 0
+_VERIFIERS: Dict[Optional[str], "Verifier"] = {}
+_VERIFIERS_LOCK = threading.Lock()
 
-def verify_png_with_c2pa(png_bytes: bytes, trust_store_dir: str) -> Dict[str, Any]:
-    """
-    Verifies a C2PA manifest embedded in the PNG.
-    Returns structured results for UI consumption.
-    """
-    if not is_c2pa_available():
-        return {
-            "status": "unavailable",
-            "reason": "c2pa-python is not installed",
-        }
+# Human-friendly explanations for common validation codes.
+CODE_EXPLANATIONS = {
+    "claimSignature.insideValidity": "Signature time is within the certificate validity window.",
+    "claimSignature.validated": "Signature is cryptographically valid.",
+    "assertion.hashedURI.match": "Manifest references match the embedded content.",
+    "assertion.dataHash.match": "Data hash matches the signed payload.",
+}
 
-    try:
-        from c2pa import Reader
-        from c2pa import c2pa as c2pa_internal
-    except Exception as exc:
-        return {"status": "error", "reason": f"c2pa import failed: {exc}"}
 
-    if trust_store_dir and os.path.isdir(trust_store_dir):
-        try:
-            c2pa_internal.load_settings({
-                "trust": {
-                    "trust_store_path": trust_store_dir
-                }
-            })
-        except Exception as exc:
-            return {"status": "error", "reason": f"load_settings failed: {exc}"}
+def _missing_result(reason: str) -> Dict[str, Any]:
+    return {
+        "status": "missing",
+        "manifest_present": False,
+        "reason": reason,
+        "summary": [
+            "No C2PA manifest found in the image.",
+            "A signed manifest is a signal the QR was issued by an authorized vendor."
+        ],
+        "explanations": [],
+    }
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        path = os.path.join(tmpdir, "ticket.png")
-        with open(path, "wb") as f:
-            f.write(png_bytes)
-        try:
-            reader = Reader(path)
-        except Exception as exc:
-            return {
-                "status": "missing",
-                "manifest_present": False,
-                "reason": f"Manifest not found: {exc}",
-                "summary": [
-                    "No C2PA manifest found in the image.",
-                    "A signed manifest is a signal the QR was issued by an authorized vendor."
-                ],
-                "explanations": [],
-            }
-        manifest = reader.get_active_manifest()
-        validation_state = reader.get_validation_state()
-        validation_results = reader.get_validation_results()
 
+def summarize_validation(manifest, validation_state, validation_results) -> Dict[str, Any]:
+    """
+    Shapes reader output into the structured result the UI consumes.
+    """
     result = {
         "status": "unknown",
         "manifest_present": manifest is not None,
@@ -71,19 +60,11 @@ def verify_png_with_c2pa(png_bytes: bytes, trust_store_dir: str) -> Dict[str, An
         normalized_state = validation_state.strip().lower()
         result["status"] = "valid" if normalized_state == "valid" else "invalid"
 
-    # Human-friendly explanations for common validation codes.
-    code_explanations = {
-        "claimSignature.insideValidity": "Signature time is within the certificate validity window.",
-        "claimSignature.validated": "Signature is cryptographically valid.",
-        "assertion.hashedURI.match": "Manifest references match the embedded content.",
-        "assertion.dataHash.match": "Data hash matches the signed payload.",
-    }
-
     try:
         success_items = validation_results.get("activeManifest", {}).get("success", [])
         for item in success_items:
             code = item.get("code", "")
-            explanation = code_explanations.get(code, item.get("explanation", ""))
+            explanation = CODE_EXPLANATIONS.get(code, item.get("explanation", ""))
             result["explanations"].append(
                 {"code": code, "explanation": explanation}
             )
@@ -98,7 +79,133 @@ def verify_png_with_c2pa(png_bytes: bytes, trust_store_dir: str) -> Dict[str, An
     try:
         assertions = manifest.get("assertions", [])
         result["assertions"] = [a.get("label") for a in assertions if isinstance(a, dict)]
+        for assertion in assertions:
+            if isinstance(assertion, dict) and assertion.get("label") == INTENT_LABEL:
+                result["intent"] = assertion.get("data")
     except Exception:
         pass
 
     return result
+
+
+class Verifier:
+    """
+    Reusable C2PA verification context for one trust store.
+    The c2pa import and trust settings are resolved once; each call reads the
+    manifest from an in-memory stream, so only the cryptographic checks remain.
+    Instances are safe to share between threads.
+    """
+
+    def __init__(self, trust_store_dir: Optional[str] = None):
+        self.trust_store_dir = trust_store_dir if trust_store_dir and os.path.isdir(trust_store_dir) else None
+        self._reader_cls = None
+        self._c2pa_internal = None
+        self._init_error = None
+        if not is_c2pa_available():
+            return
+        try:
+            from c2pa import Reader
+            from c2pa import c2pa as c2pa_internal
+        except Exception as exc:
+            self._init_error = f"c2pa import failed: {exc}"
+            return
+        self._reader_cls = Reader
+        self._c2pa_internal = c2pa_internal
+
+    def _needs_settings(self) -> bool:
+        return self.trust_store_dir is not None and _LOADED_TRUST_STORE != self.trust_store_dir
+
+    def _ensure_settings(self) -> Optional[str]:
+        """
+        Loads this verifier's trust settings if another store is active.
+        Caller holds _SETTINGS_CHANGED with no reads in flight.
+        """
+        global _LOADED_TRUST_STORE
+        if not self._needs_settings():
+            return None
+        try:
+            self._c2pa_internal.load_settings({
+                "trust": {
+                    "trust_store_path": self.trust_store_dir
+                }
+            })
+        except Exception as exc:
+            return f"load_settings failed: {exc}"
+        _LOADED_TRUST_STORE = self.trust_store_dir
+        return None
+
+    def _begin_read(self) -> Optional[str]:
+        """
+        Registers a read under this verifier's trust store, switching stores
+        once reads under the previous one have finished.
+        """
+        global _ACTIVE_READS
+        with _SETTINGS_CHANGED:
+            _SETTINGS_CHANGED.wait_for(lambda: not self._needs_settings() or _ACTIVE_READS == 0)
+            settings_error = self._ensure_settings()
+            if settings_error:
+                return settings_error
+            _ACTIVE_READS += 1
+        return None
+
+    @staticmethod
+    def _end_read() -> None:
+        global _ACTIVE_READS
+        with _SETTINGS_CHANGED:
+            _ACTIVE_READS -= 1
+            if not _ACTIVE_READS:
+                _SETTINGS_CHANGED.notify_all()
+
+    def verify(self, png_bytes: bytes) -> Dict[str, Any]:
+        """
+        Verifies a C2PA manifest embedded in the PNG.
+        Returns structured results for UI consumption.
+        """
+        if self._reader_cls is None:
+            if self._init_error:
+                return {"status": "error", "reason": self._init_error}
+            return {
+                "status": "unavailable",
+                "reason": "c2pa-python is not installed",
+            }
+
+        settings_error = self._begin_read()
+        if settings_error:
+            return {"status": "error", "reason": settings_error}
+        try:
+            try:
+                reader = self._reader_cls("image/png", io.BytesIO(png_bytes))
+            except Exception as exc:
+                return _missing_result(f"Manifest not found: {exc}")
+            try:
+                manifest = reader.get_active_manifest()
+                validation_state = reader.get_validation_state()
+                validation_results = reader.get_validation_results()
+            finally:
+                close = getattr(reader, "close", None)
+                if close is not None:
+                    close()
+        finally:
+            self._end_read()
+
+        return summarize_validation(manifest, validation_state, validation_results)
+
+
+def get_verifier(trust_store_dir: Optional[str]) -> Verifier:
+    """
+    Process-wide Verifier for a trust store, created on first use.
+    """
+    with _VERIFIERS_LOCK:
+        verifier = _VERIFIERS.get(trust_store_dir)
+        if verifier is None:
+            verifier = Verifier(trust_store_dir)
+            _VERIFIERS[trust_store_dir] = verifier
+        return verifier
+
+
+def verify_png_with_c2pa(png_bytes: bytes, trust_store_dir: str) -> Dict[str, Any]:
+    """
+    Verifies a C2PA manifest embedded in the PNG.
+    Returns structured results for UI consumption.
+    """
+    return get_verifier(trust_store_dir).verify(png_bytes)
@@ -0,0 +1,380 @@
+import math
+
+import cv2
+import numpy as np
+
+from main import decode_pixels, locate_header
+from public_layer import qr_detectors, suppress_overlay_colors
+
+QR_BORDER_MODULES = 4  # Quiet zone the encoder renders around the symbol
+PROBE_MODULE_SIZE = 9  # Pitch frames are first warped to when reading the depth-1 header
+CAPTURE_PAD_RATIO = 0.1  # White margin added so tightly cropped captures still detect
+REFINE_MAX_PATTERN_SHIFT = 1.5  # Furthest pattern matching moves a detected corner, in modules
+REFINE_MAX_SHIFT = 0.5  # Furthest the leaf-level passes then move it, in modules
+CAPTURE_MIN_LEAF_PX = 3  # Captures are warped to a whole multiple of the module size giving the deepest leaves this many px
+
+_FINDER_PATTERN = np.array([
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+], dtype=bool)
+
+
+def locate_qr_corners(gray: np.ndarray) -> np.ndarray | None:
+    """
+    Finds the four outer corners of the QR symbol (quiet zone excluded).
+    Returns a (4, 2) float32 array or None.
+    """
+    pad = int(max(gray.shape) * CAPTURE_PAD_RATIO)
+    padded = cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+    for _, detector in qr_detectors():
+        try:
+            found, points = detector.detect(padded)
+        except cv2.error:
+            continue
+        if found and points is not None:
+            return points.reshape(-1, 2)[:4].astype(np.float32) - pad
+    return None
+
+
+def _module_homography(corners: np.ndarray, symbol_modules: int) -> np.ndarray:
+    grid = np.float32([
+        [0, 0],
+        [symbol_modules, 0],
+        [symbol_modules, symbol_modules],
+        [0, symbol_modules],
+    ])
+    return cv2.getPerspectiveTransform(grid, corners)
+
+
+def _sample_modules(dark: np.ndarray, homography: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    """
+    Samples the dark mask at the centers of (row, col) module cells.
+    """
+    centers = np.float32(cells[:, ::-1] + 0.5).reshape(-1, 1, 2)
+    points = cv2.perspectiveTransform(centers, homography).reshape(-1, 2)
+    xs = np.clip(np.rint(points[:, 0]).astype(int), 0, dark.shape[1] - 1)
+    ys = np.clip(np.rint(points[:, 1]).astype(int), 0, dark.shape[0] - 1)
+    return dark[ys, xs]
+
+
+def estimate_symbol_modules(dark: np.ndarray, corners: np.ndarray) -> int:
+    """
+    Picks the QR version whose timing patterns line up with the capture.
+    """
+    best_modules, best_score = None, -1.0
+    for version in range(1, 41):
+        modules = 17 + 4 * version
+        span = np.arange(8, modules - 8)
+        cells = np.concatenate([
+            np.stack([np.full_like(span, 6), span], axis=1),
+            np.stack([span, np.full_like(span, 6)], axis=1),
+        ])
+        expected = np.concatenate([span % 2 == 0, span % 2 == 0])
+        sampled = _sample_modules(dark, _module_homography(corners, modules), cells)
+        score = float(np.mean(sampled == expected))
+        if score > best_score:
+            best_modules, best_score = modules, score
+    return best_modules
+
+
+def orient_corners(dark: np.ndarray, corners: np.ndarray, symbol_modules: int) -> np.ndarray:
+    """
+    Rolls the corner order so the three finder patterns land top-left, top-right and bottom-left.
+    """
+    finder_cells = np.argwhere(np.ones((7, 7), dtype=bool))
+    expected = _FINDER_PATTERN[finder_cells[:, 0], finder_cells[:, 1]]
+    offsets = [(0, 0), (0, symbol_modules - 7), (symbol_modules - 7, 0)]
+    best, best_score = corners, -1.0
+    for k in range(4):
+        candidate = np.roll(corners, -k, axis=0)
+        homography = _module_homography(candidate, symbol_modules)
+        score = 0.0
+        for row, col in offsets:
+            sampled = _sample_modules(dark, homography, finder_cells + (row, col))
+            score += float(np.mean(sampled == expected))
+        if score > best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def alignment_centres(symbol_modules: int) -> list[int]:
+    """
+    Row/column coordinates of the QR alignment pattern centres (ISO 18004 Annex E).
+    """
+    version = (symbol_modules - 17) // 4
+    if version < 2:
+        return []
+    count = version // 7 + 2
+    step = 26 if version == 32 else -(-(symbol_modules - 13) // (2 * count - 2)) * 2
+    return [6] + [symbol_modules - 7 - i * step for i in reversed(range(count - 1))]
+
+
+def function_pattern_cells(symbol_modules: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (row, col) cells of the finder, timing and alignment patterns, and
+    whether each is dark: the modules every ticket of this size shares.
+    """
+    cells, dark = [], []
+    finder = np.argwhere(np.ones((7, 7), dtype=bool))
+    for row, col in ((0, 0), (0, symbol_modules - 7), (symbol_modules - 7, 0)):
+        cells.append(finder + (row, col))
+        dark.append(_FINDER_PATTERN[finder[:, 0], finder[:, 1]])
+    span = np.arange(8, symbol_modules - 8)
+    cells += [np.stack([np.full_like(span, 6), span], axis=1), np.stack([span, np.full_like(span, 6)], axis=1)]
+    dark += [span % 2 == 0, span % 2 == 0]
+    block = np.argwhere(np.ones((5, 5), dtype=bool)) - 2
+    ring = np.abs(block).max(axis=1)
+    centres = alignment_centres(symbol_modules)
+    last = symbol_modules - 7
+    for row in centres:
+        for col in centres:
+            # The three that would overlap a finder pattern are not drawn
+            if (row, col) in ((6, 6), (6, last), (last, 6)):
+                continue
+            cells.append(block + (row, col))
+            dark.append(ring != 1)
+    return np.concatenate(cells), np.concatenate(dark)
+
+
+def _edge_distance(gray: np.ndarray) -> np.ndarray:
+    """
+    Per pixel, the distance to the nearest pixel on the other side of the
+    Otsu threshold: how far a sample there could drift before it reads the
+    neighbouring colour.
+    """
+    _, light = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    to_dark = cv2.distanceTransform(light, cv2.DIST_L2, 3)
+    to_light = cv2.distanceTransform(1 - light, cv2.DIST_L2, 3)
+    return np.where(light > 0, to_dark, to_light)
+
+
+def _crispness(distance: np.ndarray, cap: float, points: np.ndarray, homography: np.ndarray) -> float:
+    """
+    Mean edge distance at the sample points, capped so that every sample
+    well inside its leaf or module counts the same: a sharp image then
+    scores its best anywhere near the true corners, not at a lucky offset.
+    """
+    mapped = cv2.perspectiveTransform(points, homography).reshape(-1, 2)
+    xs = np.clip(np.rint(mapped[:, 0]).astype(int), 0, distance.shape[1] - 1)
+    ys = np.clip(np.rint(mapped[:, 1]).astype(int), 0, distance.shape[0] - 1)
+    return float(np.mean(np.minimum(distance[ys, xs], cap)))
+
+
+def refine_corners(rgb: np.ndarray, corners: np.ndarray, symbol_modules: int, sample_modules: int = 1500) -> np.ndarray:
+    """
+    Detectors place the finder corners closely, but the finder-less
+    bottom-right one only to within a module or so, and leaf sampling needs
+    a fraction of a module. Moves that corner until the finder, timing and
+    alignment patterns line up, then to where sample points sit furthest
+    inside their module and depth-1 leaf, in steps of a fraction of a
+    module. The detected corners are kept unless the refined ones score
+    strictly better.
+    """
+    rng = np.random.default_rng(0)
+    cells = np.argwhere(np.ones((symbol_modules, symbol_modules), dtype=bool))
+    if len(cells) > sample_modules:
+        cells = cells[rng.choice(len(cells), sample_modules, replace=False)]
+    module_points = np.float32(cells[:, ::-1] + 0.5).reshape(-1, 1, 2)
+    leaf_offsets = np.array([(dx, dy) for dy in (1, 3, 5) for dx in (1, 3, 5)], dtype=np.float32) / 6.0
+    leaf_points = (cells[:, None, ::-1] + leaf_offsets[None, :, :]).astype(np.float32).reshape(-1, 1, 2)
+    pitch = float(np.linalg.norm(corners[1] - corners[0])) / symbol_modules
+    max_shift = REFINE_MAX_SHIFT * pitch
+
+    # Whole-module errors leave every sample equally crisp; only the fixed
+    # patterns tell them apart, so they are matched first (dark mask, as in
+    # estimate_symbol_modules). Finder corners are reliable: only the
+    # bottom-right one moves, by at most REFINE_MAX_PATTERN_SHIFT modules
+    gray = suppress_overlay_colors(rgb)
+    _, dark = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    pattern_cells, pattern_dark = function_pattern_cells(symbol_modules)
+
+    def pattern_score(candidate: np.ndarray) -> float:
+        sampled = _sample_modules(dark, _module_homography(candidate, symbol_modules), pattern_cells)
+        return float(np.mean(sampled == pattern_dark))
+
+    best, best_score = corners.copy(), pattern_score(corners)
+    step = 0.5 * pitch
+    while step > 0.1 * pitch:
+        improved = False
+        for move in ((step, 0), (-step, 0), (0, step), (0, -step)):
+            candidate = best.copy()
+            candidate[2] += move
+            if np.abs(candidate[2] - corners[2]).max() > REFINE_MAX_PATTERN_SHIFT * pitch:
+                continue
+            score = pattern_score(candidate)
+            if score > best_score:
+                best, best_score, improved = candidate, score, True
+        if not improved:
+            step /= 2
+    located = best
+
+    # Capped at a quarter of a module and half a depth-1 leaf, so samples at
+    # a clean image's module and leaf centres all saturate
+    passes = (
+        (_edge_distance(gray), module_points, (2,), 0.25, pitch / 4),
+        (_edge_distance(rgb.max(axis=2)), leaf_points, (2,), 0.125, pitch / 6),
+    )
+    best = located.copy()
+    for distance, points, movable, step, cap in passes:
+        best_score = _crispness(distance, cap, points, _module_homography(best, symbol_modules))
+        step *= pitch
+        while step > 0.02 * pitch:
+            improved = False
+            for idx in movable:
+                for move in ((step, 0), (-step, 0), (0, step), (0, -step)):
+                    candidate = best.copy()
+                    candidate[idx] += move
+                    if np.abs(candidate[idx] - located[idx]).max() > max_shift:
+                        continue
+                    score = _crispness(distance, cap, points, _module_homography(candidate, symbol_modules))
+                    if score > best_score:
+                        best, best_score, improved = candidate, score, True
+            if not improved:
+                step /= 2
+    # Detected corners stand unless the refined ones match the patterns
+    # better, or as well and with crisper leaves
+    refined = (pattern_score(best), best_score)
+    detected = (pattern_score(corners), _crispness(distance, cap, points, _module_homography(corners, symbol_modules)))
+    return best if refined > detected else corners.copy()
+
+
+def rectify_qr_image(
+    rgb: np.ndarray,
+    corners: np.ndarray,
+    symbol_modules: int,
+    module_size: int,
+) -> np.ndarray:
+    """
+    Warps the capture once onto the encoder's canonical grid, quiet zone
+    included, so module (x, y) sits at x * module_size again.
+    """
+    border = QR_BORDER_MODULES * module_size
+    side = (symbol_modules + 2 * QR_BORDER_MODULES) * module_size
+    target = np.float32([
+        [border, border],
+        [border + symbol_modules * module_size, border],
+        [border + symbol_modules * module_size, border + symbol_modules * module_size],
+        [border, border + symbol_modules * module_size],
+    ])
+    homography = cv2.getPerspectiveTransform(corners, target)
+    warped = cv2.warpPerspective(
+        rgb, homography, (side, side),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(255, 255, 255),
+    )
+    return snap_to_palette(normalize_levels(warped, module_size), module_size)
+
+
+def normalize_levels(rgb: np.ndarray, module_size: int) -> np.ndarray:
+    """
+    Stretches each channel so paper white and ink black land back on 255 and 0,
+    matching the thresholds the tile sampler expects. Percentiles rather than a
+    reference patch, since every dark module (finder cores included) carries overlay.
+    Levels come from a strided sample and are applied through a lookup table.
+    """
+    border = QR_BORDER_MODULES * module_size
+    stride = max(1, module_size // 3)
+    symbol = rgb[border:-border:stride, border:-border:stride].reshape(-1, 3)
+    black = np.percentile(symbol, 5, axis=0)
+    white = np.percentile(symbol, 95, axis=0)
+    scale = 255.0 / np.maximum(white - black, 1.0)
+    levels = np.arange(256, dtype=np.float32)[:, None]
+    lut = np.clip((levels - black) * scale, 0, 255).astype(np.uint8)
+    return cv2.LUT(rgb, lut.reshape(256, 1, 3))
+
+
+def snap_to_palette(rgb: np.ndarray, module_size: int) -> np.ndarray:
+    """
+    Snaps normalized pixels back to the colors the encoder draws with
+    (white, black, red data, purple filler). Each module is judged dark or
+    light from its central half, then light modules are blanked and blurred-in
+    white inside dark modules turns black, so edge bleed cannot flip a tile.
+    """
+    red, green, blue = cv2.split(rgb)
+    low = cv2.min(cv2.min(red, green), blue)
+    high = cv2.max(cv2.max(red, green), blue)
+    colored = (low <= 127) & (high > 127)
+    purple = colored & (blue > 127)
+
+    grid = rgb.shape[0] // module_size
+    quarter = module_size // 4
+    cores = low[:grid * module_size, :grid * module_size].reshape(grid, module_size, grid, module_size)
+    cores = cores[:, quarter:module_size - quarter, :, quarter:module_size - quarter]
+    light_modules = cores.mean(axis=(1, 3)) > 127
+    light = np.zeros(low.shape, dtype=bool)
+    light[:grid * module_size, :grid * module_size] = np.repeat(
+        np.repeat(light_modules, module_size, axis=0), module_size, axis=1
+    )
+
+    # Encoder palette: white, black, red (255, 0, 0), purple (200, 0, 200).
+    out_red = np.where(light, 255, np.where(colored, np.where(purple, 200, 255), 0)).astype(np.uint8)
+    out_green = np.where(light, 255, 0).astype(np.uint8)
+    out_blue = np.where(light, 255, np.where(purple, 200, 0)).astype(np.uint8)
+    return cv2.merge([out_red, out_green, out_blue])
+
+
+def capture_pitch(header: dict) -> int:
+    """
+    Pitch to warp a capture of this ticket at: the declared module size times
+    the smallest whole factor that gives its deepest leaves CAPTURE_MIN_LEAF_PX
+    px, so tickets issued with 1 px leaves still get a sampling margin.
+    """
+    module_size = header.get("module_size", PROBE_MODULE_SIZE)
+    depths = [header.get("depth") or 1, header.get("asserter_max_depth") or 1]
+    depths += [entry[4] for entry in header.get("sections") or []]
+    return module_size * max(1, math.ceil(CAPTURE_MIN_LEAF_PX * 3 ** max(depths) / module_size))
+
+
+def rectify_capture(rgb: np.ndarray, module_size: int | None = None) -> tuple[np.ndarray, int]:
+    """
+    Locates the QR in a camera frame and rectifies it.
+    Without a module size the frame is first warped at PROBE_MODULE_SIZE to read
+    the header, then warped once more at `capture_pitch` (a whole multiple of
+    the header-declared size; `decode_pixels` reads that multiple as the
+    pyramid scale and samples the area-averaged level).
+    Returns (canonical RGB array, pitch it was warped at).
+    """
+    dark = suppress_overlay_colors(rgb)
+    corners = locate_qr_corners(dark)
+    if corners is None:
+        raise ValueError("Could not locate a QR code in the capture.")
+    _, dark_mask = cv2.threshold(dark, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    symbol_modules = estimate_symbol_modules(dark_mask, corners)
+    corners = orient_corners(dark_mask, corners, symbol_modules)
+    corners = refine_corners(rgb, corners, symbol_modules)
+
+    if module_size is None:
+        probe = rectify_qr_image(rgb, corners, symbol_modules, PROBE_MODULE_SIZE)
+        header, _, _ = locate_header(probe, [PROBE_MODULE_SIZE])
+        module_size = capture_pitch(header)
+    return rectify_qr_image(rgb, corners, symbol_modules, module_size), module_size
+
+
+def decode_camera_capture(role: str, img_bytes: bytes) -> dict:
+    """
+    Decodes a photo or camera frame of a ticket (JPEG/PNG bytes) in one pass.
+    """
+    img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image bytes.")
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return decode_frame(role, rgb)
+
+
+def decode_frame(role: str, rgb: np.ndarray) -> dict:
+    """
+    Rectifies an RGB camera frame and hands it to the vectorized sampler.
+    """
+    role = role.lower()
+    if role == "general":
+        # Only the public layer is needed; skip the header probe.
+        canonical, module_size = rectify_capture(rgb, module_size=PROBE_MODULE_SIZE)
+    else:
+        canonical, module_size = rectify_capture(rgb)
+    return decode_pixels(role, canonical, module_sizes=[module_size])
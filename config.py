@@ -1,4 +1,5 @@
 # config.py
+import os
 
 # --- General Encoding Parameters ---
 FILLER_TILE_COUNT = 100  # Must match encoder filler tile count
@@ -12,11 +13,78 @@ DUMMY_FILLERS = [
 FILLER_COLOR_BLUE   = (255, 0,   0,   255)  # Blue
 FILLER_COLOR_PURPLE = (200, 0,   200, 255)  # Purple
 HEADER_COLOR        = (0,   0,   255, 255)  # Red
+DATA_COLOR          = (255, 0,   0)         # Header and secret leaves as rendered (RGB)
 
 # --- Tile Layer Parameters ---
 HEADER_DEPTH = 1
 BITS_PER_TILE = 8
-MODULE_SIZE = 10
-MODULE_SIZE_RECURSIVE_CANDIDATES = [27, 81]
+MODULE_SIZE = 10  # Legacy depth-1 pitch (older tickets); new tickets size modules from MIN_LEAF_PX
+MODULE_SIZE_RECURSIVE_CANDIDATES = [27, 81]  # Legacy pitches tried when the image width does not pin one down
+MIN_LEAF_PX = 3  # Side of a depth-1 leaf; module size is 3 * MIN_LEAF_PX. 3 leaves a 1 px sampling margin for print/camera capture
+DEEP_LEAF_PX = 2  # Side of the deepest leaves at depth >= 2 (module size 3 ** depth * DEEP_LEAF_PX), sampled at their centre pixel; 3 adds a margin at 2.25x the pixels
+HEADER_MAX_TILES = 512  # Header JSON (incl. section directory) must fit in these tiles
+QR_BORDER = 4  # Quiet-zone modules rendered around the public QR
+PUBLIC_QR_MODULE_PX = 3  # Pixels per module the public QR is area-reduced to before it is read
+
+# --- Band-Streamed Rendering (deep/large tickets) ---
+RENDER_BAND_ROWS = 4  # Module rows rendered and deflated per band
+STREAM_RENDER_MIN_PIXELS = 4096 * 4096  # encode_from_dict streams images at least this large
+
+# --- Issued PNG Output ---
+PNG_PALETTE_OUTPUT = True  # Indexed-colour PNGs (tickets only use a handful of colours)
+PNG_COMPRESS_LEVEL = 6  # 9 is ~7-10% smaller but several times slower on ticket images
+PNG_ZLIB_STRATEGY = "default"  # default, filtered, rle or huffman
+PNG_FILTER = "adaptive"  # none, sub, up, or adaptive (best of the three per scanline)
+PNG_COMPRESS_WORKERS = 1  # >1 deflates bands on a thread pool
+
+# --- Print Sheets (print_sheet.py) ---
+SHEET_COLUMNS = 4
+SHEET_GAP_PX = 60      # White space between tickets
+SHEET_MARGIN_PX = 120  # White border around each page
+SHEET_DPI = 600        # Recorded in the output so the vendor prints at the intended size
+SHEET_MIN_MODULE_MM = 1.0  # Printed modules are scaled up to at least this size so captures resolve the leaves
+SHEET_RENDER_WORKERS = 4  # Tickets of a sheet row rendered in parallel
+
+# --- Tile Position Index (regenerated from the public payload) ---
+TILE_INDEX_CACHE_SIZE = 256     # Payload indexes kept in memory
+TILE_INDEX_MIN_AGREEMENT = 0.98  # Share of modules that must match the image to trust the index
+
+# --- Forward Error Correction (Reed-Solomon, 0 disables) ---
+RS_PARITY = 16         # Parity bytes per 255-byte codeword of each hidden section
+HEADER_RS_PARITY = 16  # Parity bytes per codeword of the header JSON
+
+# --- Decode/Verify Result Cache (keyed by image sha256 + role) ---
+DECODE_CACHE_SIZE = 1024
+DECODE_CACHE_TTL_S = 300  # Seconds before a repeat scan is decoded again
+
+# --- Batch Decoding (batch_decoder.decode_many) ---
+BATCH_DECODE_PREFETCH = 2  # Images loaded or decoding per worker; bounds memory on large folders
+
+# --- Asserter Overlay Header (depth-1 tiles at the start of the asserter reserve) ---
+OVERLAY_HEADER_MAGIC = 0xA5
+OVERLAY_HEADER_TILES = 5  # magic, depth, 2-byte length, XOR checksum
+
+# --- Hidden Sections ---
+# Key ID recorded in the section directory; maps to keys/<key_id>_private.pem
+SECTION_KEY_IDS = {
+    "VIP": "vip",
+    "STAFF": "staff",
+    "ASSERTER": "asserter",
+    "TICKET": None,  # Per-ticket serial + holder hash, not encrypted
+}
+# Sections each role needs read from the hidden layer
+ROLE_SECTIONS = {
+    "general": (),
+    "vip": ("VIP",),
+    "staff": ("STAFF", "TICKET"),
+    "asserter": ("ASSERTER",),
+    "admin": ("VIP", "STAFF", "TICKET"),
+}
+OPTIONAL_SECTIONS = ("TICKET",)  # Only tickets issued with a serial carry these; decodes without them are still whole
+EVENT_SECTION_CACHE_SIZE = 16  # Events whose encrypted, compressed role sections are kept for batch issuance
+REISSUE_ENCRYPT_ATTEMPTS = 16  # Encryptions tried per section before a re-issue gives up on the existing tiles
+
+# --- Diagnostics ---
+DEBUG_OUTPUT = os.environ.get("QR_PROTO_DEBUG", "") not in ("", "0")  # Header/bit dumps on stdout
 
 PUBLIC_PAYLOAD_URL="https://sumanair.github.io/scanner/l1.html?data"
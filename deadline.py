@@ -0,0 +1,79 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Deadline of the decode running in this thread/task, checked by the hidden-layer loops
+_ACTIVE = ContextVar("qr_proto_deadline", default=None)
+
+
+class DeadlineExceeded(BaseException):
+    """
+    Raised by `check` when the active deadline has passed or was cancelled.
+    `stage` names the step that gave up. A BaseException (like
+    asyncio.CancelledError) so the decoder's broad `except Exception`
+    fallbacks do not swallow it.
+    """
+
+    def __init__(self, stage: str, cancelled: bool = False):
+        self.stage = stage
+        self.cancelled = cancelled
+        super().__init__(f"{'Cancelled' if cancelled else 'Deadline exceeded'} at {stage}")
+
+
+class Deadline:
+    """
+    Time budget and cancellation token for one decode. `cancel()` may be
+    called from another thread, e.g. when the gate moves on to the next ticket.
+    """
+
+    def __init__(self, deadline_ms: float | None = None, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = None if deadline_ms is None else clock() + deadline_ms / 1000
+        self.cancelled = False
+
+    @classmethod
+    def until(cls, expires_at: float, clock=time.monotonic) -> "Deadline":
+        """
+        Deadline at an absolute `clock()` time (monotonic time is shared across processes).
+        """
+        deadline = cls(clock=clock)
+        deadline.expires_at = expires_at
+        return deadline
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def remaining_ms(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - self._clock()) * 1000)
+
+    def expired(self) -> bool:
+        return self.cancelled or (self.expires_at is not None and self._clock() >= self.expires_at)
+
+    def check(self, stage: str) -> None:
+        if self.cancelled:
+            raise DeadlineExceeded(stage, cancelled=True)
+        if self.expires_at is not None and self._clock() >= self.expires_at:
+            raise DeadlineExceeded(stage)
+
+
+@contextmanager
+def active(deadline: Deadline | None):
+    """
+    Makes `deadline` the one `check` tests for the duration of the block.
+    """
+    token = _ACTIVE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _ACTIVE.reset(token)
+
+
+def check(stage: str) -> None:
+    """
+    Raises DeadlineExceeded if the active deadline (if any) is up.
+    """
+    deadline = _ACTIVE.get()
+    if deadline is not None:
+        deadline.check(stage)
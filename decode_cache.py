@@ -0,0 +1,111 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from c2pa_integration.manifest_builder import compute_sha256_hex
+from config import DECODE_CACHE_SIZE, DECODE_CACHE_TTL_S
+
+
+class ResultCache:
+    """
+    Size-bounded LRU with a per-entry TTL and hit/miss counters.
+    Safe to share between threads (Streamlit sessions, service handlers).
+    """
+
+    def __init__(self, max_entries: int = DECODE_CACHE_SIZE, ttl_s: float = DECODE_CACHE_TTL_S, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Returns a copy of the cached value, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] > self.ttl_s:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key, value) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached value for `key`, computing and storing it on a miss. Exceptions are not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    return _RESULT_CACHE
+
+
+def image_cache_key(image_bytes: bytes, kind: str) -> tuple[str, str]:
+    """
+    (image sha256, kind): the digest is the `image_sha256` commitment
+    `compute_commitments` records; kind is the role or check name.
+    """
+    return compute_sha256_hex(image_bytes), kind
+
+
+def cached_decode(role: str, image_bytes: bytes, cache: ResultCache | None = None) -> dict:
+    from main import decode_with_role
+
+    role = role.lower()
+    cache = cache or _RESULT_CACHE
+    return cache.get_or_compute(image_cache_key(image_bytes, role), lambda: decode_with_role(role, image_bytes))
+
+
+def cached_verify(image_bytes: bytes, trust_store_dir: str, cache: ResultCache | None = None) -> dict:
+    from c2pa_integration import verify_png_with_c2pa
+
+    cache = cache or _RESULT_CACHE
+    return cache.get_or_compute(
+        image_cache_key(image_bytes, f"verify:{trust_store_dir}"),
+        lambda: verify_png_with_c2pa(image_bytes, trust_store_dir=trust_store_dir),
+    )
@@ -1,5 +1,7 @@
 from PIL import Image
 
+from metrics import debug
+
 def extract_tiles_from_image(image_path: str, module_size: int = 10):
     """
     Extracts a grid of RGB tiles from a QR code image with overlaid T-square tiles.
@@ -93,17 +95,17 @@ def extract_bitstream_from_qr(image_path, module_size=10):
     # Step 2: Extract total_bits from first 2 tiles
     b0 = extract_byte_from_tile(black_tiles[0])
     b1 = extract_byte_from_tile(black_tiles[1])
-    print(f"[DEBUG] First 2 header bytes from tiles: {b0:08b}, {b1:08b}")
+    debug(f"[DEBUG] First 2 header bytes from tiles: {b0:08b}, {b1:08b}")
     header_bytes = [b0, b1]
-    print("📦 header_bytes:", header_bytes, type(header_bytes[0]))
+    debug("📦 header_bytes:", header_bytes, type(header_bytes[0]))
     total_bits = (header_bytes[0] << 8) | header_bytes[1]
-    print(f"[DECODE] Total bits to extract (from header): {total_bits}")
+    debug(f"[DECODE] Total bits to extract (from header): {total_bits}")
 
     # Step 3: Compute number of tiles needed
     needed_bytes = (total_bits + 7) // 8
     needed_total = 2 + needed_bytes
 
-    print(f"[DECODE] Detected black tiles in image: {len(black_tiles)}")
+    debug(f"[DECODE] Detected black tiles in image: {len(black_tiles)}")
 
 
     if len(black_tiles) < needed_total:
@@ -118,7 +120,7 @@ def extract_bitstream_from_qr(image_path, module_size=10):
         data_bytes.append(byte)
 
 
-    print(f"[DECODE] Total bits extracted: {total_bits}")
+    debug(f"[DECODE] Total bits extracted: {total_bits}")
     #print(f"[DECODE] Tiles used (x, y): {used_coords[:2 + needed_bytes]}")
 
     return ''.join(f'{byte:08b}' for byte in data_bytes)[:total_bits]
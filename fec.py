@@ -0,0 +1,163 @@
+import math
+from functools import lru_cache
+
+RS_BLOCK_SIZE = 255  # GF(256) codeword length
+
+_RS_IMPORT_ERROR = None
+_WARNED_NO_FEC = False
+
+try:
+    import reedsolo
+except Exception as exc:  # pragma: no cover - depends on environment
+    reedsolo = None
+    _RS_IMPORT_ERROR = str(exc)
+
+
+def is_fec_available() -> bool:
+    return reedsolo is not None
+
+
+def get_fec_import_error() -> str | None:
+    return _RS_IMPORT_ERROR
+
+
+def usable_parity(parity: int) -> int:
+    """
+    `parity`, or 0 when reedsolo is missing: tickets are then issued without
+    error correction (the header records rs_parity 0) instead of failing.
+    """
+    global _WARNED_NO_FEC
+    if parity <= 0 or reedsolo is not None:
+        return parity
+    if not _WARNED_NO_FEC:
+        print(f"⚠️ reedsolo is not installed; issuing tickets without Reed-Solomon parity. Details: {_RS_IMPORT_ERROR}")
+        _WARNED_NO_FEC = True
+    return 0
+
+
+@lru_cache(maxsize=None)
+def _codec(parity: int):
+    if reedsolo is None:
+        raise RuntimeError(
+            "reedsolo import failed; Reed-Solomon parity is unavailable. "
+            f"Details: {_RS_IMPORT_ERROR}"
+        )
+    return reedsolo.RSCodec(parity, nsize=RS_BLOCK_SIZE)
+
+
+def block_sizes(message_length: int, parity: int) -> list[int]:
+    """
+    Splits a message into the fewest RS blocks, keeping block sizes within one byte.
+    """
+    if message_length <= 0:
+        return []
+    data_per_block = RS_BLOCK_SIZE - parity
+    if data_per_block <= 0:
+        raise ValueError(f"parity={parity} leaves no room for data in a {RS_BLOCK_SIZE}-byte block")
+    count = math.ceil(message_length / data_per_block)
+    base, extra = divmod(message_length, count)
+    return [base + 1 if i < extra else base for i in range(count)]
+
+
+def encoded_length(message_length: int, parity: int) -> int:
+    return message_length + len(block_sizes(message_length, parity)) * parity
+
+
+def message_length_for(encoded_len: int, parity: int) -> int:
+    """
+    Inverse of `encoded_length`: message bytes behind `encoded_len` encoded bytes.
+    """
+    return encoded_len - math.ceil(encoded_len / RS_BLOCK_SIZE) * parity
+
+
+def _split(data: bytes, sizes: list[int]) -> list[bytes]:
+    blocks = []
+    offset = 0
+    for size in sizes:
+        blocks.append(data[offset:offset + size])
+        offset += size
+    return blocks
+
+
+def _correct_block(codeword: bytes, parity: int) -> bytes:
+    """
+    Returns the corrected message bytes, or the received ones if the block is beyond repair.
+    """
+    if reedsolo is not None:
+        try:
+            return bytes(_codec(parity).decode(bytearray(codeword))[0])
+        except reedsolo.ReedSolomonError:
+            pass
+    return bytes(codeword[:-parity])
+
+
+def rs_encode_interleaved(data: bytes, parity: int) -> bytes:
+    """
+    RS-encodes `data` and interleaves the codewords byte by byte, so a damaged
+    tile costs one byte in several codewords instead of a run in one.
+    """
+    if parity <= 0:
+        return bytes(data)
+    codec = _codec(parity)
+    codewords = [bytes(codec.encode(block)) for block in _split(data, block_sizes(len(data), parity))]
+    out = bytearray()
+    for i in range(max((len(cw) for cw in codewords), default=0)):
+        for cw in codewords:
+            if i < len(cw):
+                out.append(cw[i])
+    return bytes(out)
+
+
+def rs_decode_interleaved(data: bytes, parity: int) -> bytes:
+    """
+    Inverse of `rs_encode_interleaved`; `data` must be exactly the encoded bytes.
+    Blocks with more errors than the parity can fix are passed through uncorrected.
+    """
+    if parity <= 0:
+        return bytes(data)
+    sizes = [size + parity for size in block_sizes(message_length_for(len(data), parity), parity)]
+    codewords = [bytearray() for _ in sizes]
+    idx = 0
+    for i in range(max(sizes, default=0)):
+        for b, size in enumerate(sizes):
+            if i < size:
+                codewords[b].append(data[idx])
+                idx += 1
+    return b"".join(_correct_block(bytes(cw), parity) for cw in codewords)
+
+
+def rs_parity_for(message: bytes, parity: int) -> bytes:
+    """
+    Systematic parity for `message`, appended after it rather than interleaved.
+    Used for the header so its JSON stays readable without correction.
+    """
+    if parity <= 0:
+        return b""
+    codec = _codec(parity)
+    return b"".join(
+        bytes(codec.encode(block))[-parity:]
+        for block in _split(message, block_sizes(len(message), parity))
+    )
+
+
+def rs_correct_systematic(message: bytes, parity_bytes: bytes, parity: int) -> bytes | None:
+    """
+    Corrects `message` against parity from `rs_parity_for`.
+    Returns None when any block cannot be repaired.
+    """
+    if parity <= 0:
+        return bytes(message)
+    if reedsolo is None:
+        return None
+    sizes = block_sizes(len(message), parity)
+    if len(parity_bytes) != len(sizes) * parity:
+        return None
+    codec = _codec(parity)
+    corrected = []
+    for i, block in enumerate(_split(message, sizes)):
+        codeword = bytearray(block + parity_bytes[i * parity:(i + 1) * parity])
+        try:
+            corrected.append(bytes(codec.decode(codeword)[0]))
+        except reedsolo.ReedSolomonError:
+            return None
+    return b"".join(corrected)
@@ -0,0 +1,90 @@
+import json
+import socket
+
+from gate_protocol import (
+    DEFAULT_SOCKET_PATH,
+    MAGIC,
+    OP_DECODE,
+    OP_HEALTH,
+    OP_VERIFY,
+    RESPONSE_HEADER,
+    encode_request,
+)
+
+DEFAULT_TIMEOUT_S = 5.0  # Socket timeout; the service enforces its own per-request deadline
+
+
+class GateClient:
+    """
+    Thin client for the gate service's Unix socket. Holds one connection
+    across scans and imports nothing outside the standard library, so a scan
+    costs only the service's decode work.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH, timeout_s: float = DEFAULT_TIMEOUT_S):
+        self.path = path
+        self.timeout_s = timeout_s
+        self._sock = None
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        return self._sock
+
+    def _recv_exactly(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("Gate service closed the connection.")
+            data += chunk
+        return bytes(data)
+
+    def request(self, op: int, body: bytes = b"", role: str = "") -> tuple[int, dict]:
+        """
+        Sends one frame and returns (status, result). Requests are idempotent,
+        so a connection the service dropped while idle is reopened once.
+        """
+        frame = encode_request(op, role, body)
+        for attempt in range(2):
+            try:
+                self._connect().sendall(frame)
+                magic, status, length = RESPONSE_HEADER.unpack(self._recv_exactly(RESPONSE_HEADER.size))
+                if magic != MAGIC:
+                    raise ConnectionError("Unexpected reply from the gate service.")
+                return status, json.loads(self._recv_exactly(length))
+            except (BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                # A half-read reply would be taken as the answer to the next request
+                self.close()
+                raise
+
+    def decode(self, img_bytes: bytes, role: str = "general") -> tuple[int, dict]:
+        return self.request(OP_DECODE, img_bytes, role)
+
+    def verify(self, png_bytes: bytes) -> tuple[int, dict]:
+        return self.request(OP_VERIFY, png_bytes)
+
+    def health(self) -> tuple[int, dict]:
+        return self.request(OP_HEALTH)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
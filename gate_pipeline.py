@@ -0,0 +1,132 @@
+import hashlib
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from c2pa_integration import get_verifier
+from c2pa_integration.manifest_builder import compute_sha256_hex
+from config import ROLE_SECTIONS
+from main import decode_pixels, decode_public_url, locate_header, read_secret_bytes
+from reccursive_decoder import ImagePyramid
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+C2PA_CHUNK_TYPE = b"caBX"  # JUMBF box the signer inserts; not part of the committed image
+DEFAULT_TRUST_STORE_DIR = "c2pa_integration/trust_store"
+
+
+def png_content_sha256(png_bytes: bytes) -> str:
+    """
+    sha256 of the PNG with any C2PA chunk left out, i.e. the bytes the issuer
+    hashed into `image_sha256` before signing. One pass over the chunk list.
+    """
+    if not png_bytes.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG image.")
+    digest = hashlib.sha256(PNG_SIGNATURE)
+    view = memoryview(png_bytes)
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(view):
+        length, chunk_type = struct.unpack(">I4s", view[offset:offset + 8])
+        end = offset + 12 + length  # length + type + data + crc
+        if end > len(view):
+            raise ValueError("Truncated PNG chunk.")
+        if chunk_type != C2PA_CHUNK_TYPE:
+            digest.update(view[offset:end])
+        offset = end
+        if chunk_type == b"IEND":
+            break
+    return digest.hexdigest()
+
+
+def _compare(expected: str | None, actual: str | None) -> dict:
+    # An empty commitment means the issuer did not commit to that layer
+    if not expected:
+        return {"expected": None, "actual": actual, "match": None}
+    return {"expected": expected, "actual": actual, "match": expected == actual}
+
+
+def verify_and_decode(
+    png_bytes: bytes,
+    role: str = "general",
+    trust_store_dir: str = DEFAULT_TRUST_STORE_DIR,
+) -> dict:
+    """
+    Gate check in one pass over one buffer: verifies the C2PA manifest,
+    decodes the public and hidden layers, and compares them against the
+    manifest commitments.
+
+    verdict is "valid" when the signature checks out and every committed hash
+    matches, "invalid" on a bad signature or any mismatch, and "unverified"
+    when there is no manifest to check against.
+    """
+    role = role.lower()
+    timings = {}
+    started = time.perf_counter()
+
+    def mark(stage: str, since: float) -> float:
+        now = time.perf_counter()
+        timings[stage] = round((now - since) * 1000, 2)
+        return now
+
+    t = started
+    image_sha256 = png_content_sha256(png_bytes)
+    t = mark("hash", t)
+
+    c2pa = get_verifier(trust_store_dir).verify(png_bytes)
+    t = mark("verify", t)
+
+    img = cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image bytes.")
+    # Shared by the header, hidden-bytes and decode steps, so reduced levels are built once
+    pixels = ImagePyramid(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    t = mark("load", t)
+
+    public_url = decode_public_url(pixels)
+    t = mark("public", t)
+
+    commitments = (c2pa.get("intent") or {}).get("commitments") or {}
+    needs_hidden = bool(ROLE_SECTIONS.get(role))
+    located = None
+    hidden_sha256 = None
+    if needs_hidden or commitments.get("hidden_payload_sha256"):
+        try:
+            located = locate_header(pixels, public_payload=public_url)
+            hidden_sha256 = compute_sha256_hex(read_secret_bytes(pixels, *located))
+        except ValueError:
+            located = None
+    t = mark("hidden", t)
+
+    if needs_hidden and located is None:
+        decoded = {"error": "Failed to extract header from QR image."}
+    else:
+        decoded = decode_pixels(role, pixels, public_url=public_url, located=located)
+    t = mark("decode", t)
+
+    checks = {
+        "image_sha256": _compare(commitments.get("image_sha256"), image_sha256),
+        "l0_payload_sha256": _compare(
+            commitments.get("l0_payload_sha256"),
+            compute_sha256_hex(public_url.encode("utf-8")) if public_url is not None else None,
+        ),
+        "hidden_payload_sha256": _compare(commitments.get("hidden_payload_sha256"), hidden_sha256),
+    }
+    mark("compare", t)
+
+    status = c2pa.get("status")
+    if status == "invalid" or any(check["match"] is False for check in checks.values()):
+        verdict = "invalid"
+    elif status == "valid":
+        verdict = "valid"
+    else:
+        verdict = "unverified"
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return {
+        "verdict": verdict,
+        "signature": c2pa,
+        "commitments": checks,
+        "decoded": decoded,
+        "timings_ms": timings,
+    }
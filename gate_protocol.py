@@ -0,0 +1,27 @@
+import json
+import struct
+
+# Framing shared by the gate service's Unix socket and gate_client. Standard
+# library only, so the client stays cheap to import.
+MAGIC = b"QG"
+PROTOCOL_VERSION = 1
+DEFAULT_SOCKET_PATH = "/tmp/qr_proto_gate.sock"
+
+OP_DECODE = 1
+OP_VERIFY = 2
+OP_HEALTH = 3
+
+# Request: magic, version, op, role length, body length; then the role (ASCII) and the body (image bytes)
+REQUEST_HEADER = struct.Struct("!2sBBBI")
+# Response: magic, status (HTTP status code), body length; then the result as UTF-8 JSON
+RESPONSE_HEADER = struct.Struct("!2sHI")
+
+
+def encode_request(op: int, role: str = "", body: bytes = b"") -> bytes:
+    role_bytes = role.encode("ascii")
+    return REQUEST_HEADER.pack(MAGIC, PROTOCOL_VERSION, op, len(role_bytes), len(body)) + role_bytes + body
+
+
+def encode_response(status: int, payload: dict) -> bytes:
+    body = json.dumps(payload, default=str).encode("utf-8")
+    return RESPONSE_HEADER.pack(MAGIC, status, len(body)) + body
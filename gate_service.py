@@ -0,0 +1,386 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from config import MODULE_SIZE, MODULE_SIZE_RECURSIVE_CANDIDATES, ROLE_SECTIONS, SECTION_KEY_IDS
+from decode_cache import ResultCache, image_cache_key
+from gate_protocol import (
+    MAGIC,
+    OP_DECODE,
+    OP_HEALTH,
+    OP_VERIFY,
+    PROTOCOL_VERSION,
+    REQUEST_HEADER,
+    encode_response,
+)
+
+DEFAULT_HOST = "127.0.0.1"  # Gate tablets talk to a service on the same box only
+DEFAULT_PORT = 8765
+DEFAULT_DEADLINE_S = 2.0  # Per-request budget, queueing included
+PARTIAL_MARGIN_S = 0.2  # Hidden-layer decode stops this long before the deadline to reply "partial"
+QUEUE_PER_WORKER = 4  # Requests admitted per worker before answering 503
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_SAMPLING_DEPTH = 3
+
+_STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+# Set in each worker process by _init_worker
+_TRUST_STORE_DIR = None
+
+
+def _init_worker(trust_store_dir: str | None) -> None:
+    """
+    Runs once per worker process: loads the keyring, the C2PA verifier and the
+    sampling plans up front so no request pays for PEM parsing or plan construction.
+    """
+    global _TRUST_STORE_DIR
+    _TRUST_STORE_DIR = trust_store_dir
+
+    from c2pa_integration import get_verifier
+    from main import compute_module_size, load_key, section_messages
+    from reccursive_decoder import build_sampling_plan, sampling_scale
+
+    get_verifier(trust_store_dir)
+    section_messages()
+    # Unencrypted sections have no key
+    for key_id in set(SECTION_KEY_IDS.values()) - {None}:
+        load_key(f"keys/{key_id}_private.pem", is_private=True)
+    # Legacy pitches, then the pitch new tickets of each depth are issued at
+    module_sizes = [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES
+    module_sizes += [compute_module_size(depth) for depth in range(1, MAX_SAMPLING_DEPTH + 1)]
+    for module_size in dict.fromkeys(module_sizes):
+        for depth in range(1, MAX_SAMPLING_DEPTH + 1):
+            try:
+                build_sampling_plan(module_size, depth)
+            except ValueError:
+                break
+            # Sections are sampled on the coarsest pyramid level that resolves them
+            build_sampling_plan(module_size // sampling_scale(module_size, depth), depth)
+
+
+def _decode_job(role: str, img_bytes: bytes, expires_at: float | None = None) -> dict:
+    from deadline import Deadline
+    from main import decode_with_role
+
+    # Monotonic time is system-wide, so the deadline set on the event loop holds here
+    deadline = Deadline.until(expires_at) if expires_at is not None else None
+    return decode_with_role(role, img_bytes, deadline=deadline)
+
+
+def _verify_job(png_bytes: bytes) -> dict:
+    from c2pa_integration import verify_png_with_c2pa
+
+    return verify_png_with_c2pa(png_bytes, _TRUST_STORE_DIR)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """
+    Deletes a socket file left by a daemon that did not shut down cleanly
+    (it would block the bind); refuses if a daemon still answers on it.
+    """
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A gate service is already listening on {path}")
+    finally:
+        probe.close()
+
+
+class GateService:
+    """
+    Localhost front end for decode/verify, over HTTP and/or a Unix socket
+    (binary frames, see gate_protocol). The event loop only parses requests
+    and enforces admission and deadlines; all CPU work runs in a preloaded
+    process pool.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        trust_store_dir: str | None = None,
+        deadline_s: float = DEFAULT_DEADLINE_S,
+        queue_per_worker: int = QUEUE_PER_WORKER,
+        cache: ResultCache | None = None,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.trust_store_dir = trust_store_dir
+        self.deadline_s = deadline_s
+        self.max_pending = self.workers * queue_per_worker
+        self.pending = 0
+        self.counters = {"served": 0, "rejected": 0, "timed_out": 0, "partial": 0, "failed": 0}
+        self.pool = None
+        # Repeat scans of the same image are answered on the event loop
+        self.cache = cache if cache is not None else ResultCache()
+
+    def start_pool(self) -> None:
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.trust_store_dir,),
+        )
+        # Start every worker now so the initializer cost is paid before the first scan
+        for future in [self.pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def run_cached(self, key, fn, *args) -> tuple[int, dict]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters["served"] += 1
+            return 200, {**cached, "cached": True}
+        status, result = await self.run_job(fn, *args)
+        if status == 200 and result.get("status") == "partial":
+            # A later scan with a less loaded pool may get the full result
+            self.counters["partial"] += 1
+        elif status == 200:
+            self.cache.put(key, result)
+        return status, result
+
+    async def run_job(self, fn, *args) -> tuple[int, dict]:
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            return 503, {"error": "Service saturated, retry shortly.", "pending": self.pending}
+        loop = asyncio.get_running_loop()
+        # The slot is held until the worker is done with the job, not just until
+        # the reply: a timed-out job that is already running keeps its worker busy.
+        future = self.pool.submit(fn, *args)
+        self.pending += 1
+
+        def release(_) -> None:
+            # The loop is gone if the job outlives the service (cancelled at shutdown)
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(self._release_slot)
+
+        future.add_done_callback(release)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.deadline_s)
+        except asyncio.TimeoutError:
+            # A job still queued is cancelled; a running one finishes and only the reply is dropped.
+            self.counters["timed_out"] += 1
+            return 504, {"error": f"Deadline of {self.deadline_s}s exceeded."}
+        except ValueError as exc:
+            self.counters["failed"] += 1
+            return 422, {"error": str(exc)}
+        except Exception as exc:
+            self.counters["failed"] += 1
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+        self.counters["served"] += 1
+        return 200, result
+
+    def _release_slot(self) -> None:
+        self.pending -= 1
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "pending": self.pending,
+            **self.counters,
+            "cache": self.cache.stats(),
+        }
+
+    async def decode(self, role: str, body: bytes) -> tuple[int, dict]:
+        role = role.lower()
+        if role not in ROLE_SECTIONS:
+            return 400, {"error": f"Unknown role '{role}'"}
+        if not body:
+            return 400, {"error": "Request body must contain the ticket image."}
+        # Leave the worker time to return the public layer before the reply deadline
+        expires_at = time.monotonic() + max(0.0, self.deadline_s - PARTIAL_MARGIN_S)
+        return await self.run_cached(image_cache_key(body, role), _decode_job, role, body, expires_at)
+
+    async def verify(self, body: bytes) -> tuple[int, dict]:
+        if not body:
+            return 400, {"error": "Request body must contain the signed PNG."}
+        return await self.run_cached(image_cache_key(body, "verify"), _verify_job, body)
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == "/health" and method == "GET":
+            return 200, self.health()
+        if method != "POST":
+            return 404, {"error": f"No route for {method} {url.path}"}
+        if url.path == "/decode":
+            return await self.decode(query.get("role", ["general"])[0], body)
+        if url.path == "/verify":
+            return await self.verify(body)
+        return 404, {"error": f"No route for {method} {url.path}"}
+
+    async def dispatch_frame(self, op: int, role: str, body: bytes) -> tuple[int, dict]:
+        if op == OP_DECODE:
+            return await self.decode(role or "general", body)
+        if op == OP_VERIFY:
+            return await self.verify(body)
+        if op == OP_HEALTH:
+            return 200, self.health()
+        return 400, {"error": f"Unknown op {op}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Minimal HTTP/1.1 with keep-alive: request line, headers, Content-Length body.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line."}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length."}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Image too large."}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                close = headers.get("connection", "").lower() == "close"
+
+                status, payload = await self._timed(self.dispatch(method.upper(), target, body))
+                await self._respond(writer, status, payload, close=close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def handle_socket_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Binary frames (gate_protocol) on a Unix socket: one response frame per
+        request frame, any number of requests per connection.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readexactly(REQUEST_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break  # Client closed between requests
+                magic, version, op, role_length, length = REQUEST_HEADER.unpack(head)
+                if magic != MAGIC or version != PROTOCOL_VERSION:
+                    writer.write(encode_response(400, {"error": "Unsupported frame header."}))
+                    await writer.drain()
+                    break
+                if length > MAX_BODY_BYTES:
+                    writer.write(encode_response(413, {"error": "Image too large."}))
+                    await writer.drain()
+                    break
+                role = (await reader.readexactly(role_length)).decode("ascii", "replace")
+                body = await reader.readexactly(length)
+                status, payload = await self._timed(self.dispatch_frame(op, role, body))
+                writer.write(encode_response(status, payload))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    @staticmethod
+    async def _timed(request) -> tuple[int, dict]:
+        started = time.perf_counter()
+        status, payload = await request
+        payload = dict(payload) if isinstance(payload, dict) else {"result": payload}
+        payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return status, payload
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, close: bool = False) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n"
+        )
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+    async def serve(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int | None = DEFAULT_PORT,
+        unix_socket: str | None = None,
+    ) -> None:
+        """
+        Listens on HTTP `host:port` and/or the Unix socket `unix_socket`
+        (`port=None` for the socket only), sharing one pool, cache and admission limit.
+        """
+        if port is None and unix_socket is None:
+            raise ValueError("Nothing to listen on: give a port or a Unix socket path.")
+        self.start_pool()
+        servers = []
+        try:
+            if port is not None:
+                servers.append(await asyncio.start_server(self.handle_connection, host, port))
+                print(f"✅ Gate service on http://{host}:{port}")
+            if unix_socket is not None:
+                _remove_stale_socket(unix_socket)
+                servers.append(await asyncio.start_unix_server(self.handle_socket_connection, path=unix_socket))
+                os.chmod(unix_socket, 0o600)
+                print(f"✅ Gate service on unix:{unix_socket}")
+            print(f"   {self.workers} workers, max {self.max_pending} pending")
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            if unix_socket is not None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(unix_socket)
+            self.shutdown()
+
+
+def run(
+    host: str = DEFAULT_HOST,
+    port: int | None = DEFAULT_PORT,
+    unix_socket: str | None = None,
+    **kwargs,
+) -> None:
+    service = GateService(**kwargs)
+    try:
+        asyncio.run(service.serve(host, port, unix_socket))
+    except KeyboardInterrupt:
+        pass
@@ -1,53 +1,153 @@
 from PIL import Image
 import json
-import qrcode
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization, hashes
-from google.protobuf.json_format import MessageToDict
-from proto.event_pb2 import Event, AccessLevelVIP, AccessLevelStaff, AccessLevelPublic, AccessLevelAsserter
 from render_qr_with_t_squares import render_qr_with_t_squares_partial, generate_recursive_t_square_tile_from_bytes
-from structured_codec import encode_sections_protobuf, decode_sections_protobuf
+from structured_codec import encode_section_blob, encode_section_blobs, layout_section_blobs, decode_sections_protobuf
+from fec import block_sizes, message_length_for, rs_decode_interleaved, rs_encode_interleaved, rs_parity_for, rs_correct_systematic, usable_parity
 from decoder import extract_bitstream_from_qr
-from reccursive_decoder import extract_bitstream_from_recursive_qr, extract_tiles_from_image, is_black_tile, extract_byte_from_recursive_tile
-from google.protobuf.json_format import MessageToDict
+from reccursive_decoder import (
+    extract_bitstream_from_recursive_qr,
+    extract_tiles_from_image,
+    is_black_tile,
+    extract_byte_from_recursive_tile,
+    load_image_array,
+    ImagePyramid,
+    find_black_tile_positions,
+    find_black_tile_positions_indexed,
+    read_tile_bytes,
+    load_palette_png,
+    palette_lit_table,
+)
+from tile_index import matrix_version, min_version_for_payload, tile_index_for_payload, tile_positions_for_image
+from band_renderer import paint_tiles, ticket_palette, write_ticket_png
+from png_writer import write_png
+from metrics import debug, stage
+from deadline import Deadline, DeadlineExceeded, active as deadline_active, check as check_deadline
+from public_layer import decode_public_url, load_ticket_pixels, parse_public_payload, qr_module_sizes
+import hashlib
+import logging
 import math
+import os
 import urllib.parse
+from collections import OrderedDict
+from functools import lru_cache
 import base64
-import cv2
-from pyzbar.pyzbar import decode as qr_decode
 import numpy as np
 from config import * 
 
+logger = logging.getLogger(__name__)
 
-def compute_module_size(depth: int) -> int:
-    if depth <= 1:
-        return MODULE_SIZE
-    # Ensure leaf sampling has enough pixels at depth >= 2.
-    return 3 ** (depth + 1)
+# protobuf and cryptography are imported where first used: general decodes and
+# overlay-only rendering never load them.
+SECTION_NAMES = ("VIP", "STAFF", "ASSERTER", "TICKET")
+# Event JSON key of each encrypted role section
+SECTION_DATA_KEYS = {"vip_data": "VIP", "staff_data": "STAFF", "asserter_data": "ASSERTER"}
+
+
+@lru_cache(maxsize=None)
+def section_messages() -> dict:
+    """
+    Protobuf message class per hidden section name.
+    """
+    from proto.event_pb2 import AccessLevelAsserter, AccessLevelStaff, AccessLevelVIP, TicketIdentity
+
+    return {
+        "VIP": AccessLevelVIP,
+        "STAFF": AccessLevelStaff,
+        "ASSERTER": AccessLevelAsserter,
+        "TICKET": TicketIdentity,
+    }
+
+
+def compute_module_size(depth: int, leaf_px: int | None = None) -> int:
+    """
+    Smallest module pitch whose deepest leaves are `leaf_px` wide
+    (MIN_LEAF_PX at depth 1, DEEP_LEAF_PX below). The decoder samples the
+    centre ninth of a leaf, or its centre pixel when the leaf is under 3 px,
+    so rendered tickets need no more than this.
+    """
+    depth = max(depth, HEADER_DEPTH)
+    if leaf_px is None:
+        leaf_px = MIN_LEAF_PX if depth == 1 else DEEP_LEAF_PX
+    return 3 ** depth * leaf_px
+
+
+def module_size_candidates(image_side: int) -> list[int]:
+    """
+    Module sizes a ticket `image_side` px wide can have: those that split it
+    into a whole QR version 1-40 plus quiet zone, largest first, then the
+    legacy pitches (cropped or rescaled images fit no version).
+    """
+    sizes = qr_module_sizes(image_side, 3 ** HEADER_DEPTH)
+    legacy = [size for size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES if size not in sizes]
+    return sizes + legacy
 
 
 
 def generate_dummy_filler_bitstream(depth: int, tile_count: int, bits_per_tile: int, color=FILLER_COLOR_PURPLE):
     from random import choice
-    print('[INFO] Filler color:', color)
+    debug('[INFO] Filler color:', color)
     dummy_bytes = [choice(DUMMY_FILLERS) for _ in range(tile_count * (8 ** (depth - 1)))]
     bitstream = ''.join(f"{byte:08b}" for byte in dummy_bytes)
     return bitstream, color
 
 
+def encode_overlay_header(depth: int, byte_length: int) -> bytes:
+    """
+    Overlay header recorded by the asserter: depth used and payload length in bytes.
+    """
+    if not 0 < depth < 256 or not 0 <= byte_length < 65536:
+        raise ValueError(f"Overlay depth={depth} / length={byte_length} do not fit the overlay header.")
+    fields = bytes([OVERLAY_HEADER_MAGIC, depth]) + byte_length.to_bytes(2, "big")
+    checksum = 0
+    for b in fields:
+        checksum ^= b
+    return fields + bytes([checksum])
+
+
+def parse_overlay_header(data: bytes) -> tuple[int, int] | None:
+    """
+    Returns (depth, byte_length), or None when no overlay has been written.
+    """
+    if len(data) < OVERLAY_HEADER_TILES or data[0] != OVERLAY_HEADER_MAGIC:
+        return None
+    checksum = 0
+    for b in data[:OVERLAY_HEADER_TILES - 1]:
+        checksum ^= b
+    if checksum != data[OVERLAY_HEADER_TILES - 1] or data[1] == 0:
+        return None
+    return data[1], int.from_bytes(data[2:4], "big")
+
+
 def append_overlay_to_existing_qr(
     image_path: str,
     bitstream: str,
     module_size: int,
     depth: int,
     start_tile: int,
+    overlay_header: bool = False,
+    public_payload: str | None = None,
 ) -> Image.Image:
-    tiles = extract_tiles_from_image(image_path, module_size=module_size)
-    positions = []
-    for y, row in enumerate(tiles):
-        for x, tile in enumerate(row):
-            if is_black_tile(tile):
-                positions.append((x * module_size, y * module_size))
+    """
+    Paints the asserter bitstream onto the reserve starting at `start_tile`.
+    With `overlay_header` (issuer header flag of the same name) the depth and
+    length are first recorded in OVERLAY_HEADER_TILES depth-1 tiles.
+    Tile positions come from the public payload's matrix when it is given.
+    """
+    index = tile_positions_for_image(load_image_array(image_path), public_payload, module_size)
+    if index is not None:
+        positions = [(int(col) * module_size, int(row) * module_size) for row, col in index]
+    else:
+        tiles = extract_tiles_from_image(image_path, module_size=module_size)
+        positions = []
+        for y, row in enumerate(tiles):
+            for x, tile in enumerate(row):
+                if is_black_tile(tile):
+                    positions.append((x * module_size, y * module_size))
+
+    header_tiles = []
+    if overlay_header:
+        header_tiles = list(encode_overlay_header(depth, math.ceil(len(bitstream) / 8)))
+        start_tile += OVERLAY_HEADER_TILES
 
     bits_per_tile = 8 ** depth
     bit_chunks = [
@@ -59,6 +159,9 @@ def append_overlay_to_existing_qr(
         raise ValueError("Not enough black tiles to append the asserter overlay.")
 
     img = Image.open(image_path).convert("RGB")
+    for idx, byte_value in enumerate(header_tiles):
+        overlay = generate_recursive_t_square_tile_from_bytes([byte_value], module_size, depth=1)
+        img.paste(overlay, positions[start_tile - OVERLAY_HEADER_TILES + idx], overlay)
     for idx, chunk_bits in enumerate(bit_chunks):
         tile_idx = start_tile + idx
         byte_values = [int(chunk_bits[i:i + 8], 2) for i in range(0, len(chunk_bits), 8)]
@@ -70,23 +173,16 @@ def append_overlay_to_existing_qr(
 
 def find_suitable_qr_matrix(bitstream: str, public_payload: str, max_version: int = 40, bits_per_tile: int = 8):
     required_bytes = math.ceil(len(bitstream) / bits_per_tile) + 2
-    print(f"required_bytes is {required_bytes} for bits_per_tile={bits_per_tile}")
-    print(f"[SELECT] Bits to embed: {len(bitstream)} => needs {required_bytes} black tiles (each holds {bits_per_tile} bits)")
+    debug(f"required_bytes is {required_bytes} for bits_per_tile={bits_per_tile}")
+    debug(f"[SELECT] Bits to embed: {len(bitstream)} => needs {required_bytes} black tiles (each holds {bits_per_tile} bits)")
     
-    for version in range(1, max_version + 1):
-        qr = qrcode.QRCode(
-            version=version,
-            error_correction=qrcode.constants.ERROR_CORRECT_Q,
-            box_size=1,
-            border=4
-        )
-        qr.add_data(public_payload)
-        qr.make(fit=True)
-        matrix = qr.get_matrix()
-        black_tiles = sum(1 for row in matrix for mod in row if mod)
+    # Matrices come from the tile-index cache, so tickets of one event build each version once
+    for version in range(min_version_for_payload(public_payload), max_version + 1):
+        grid, positions = tile_index_for_payload(public_payload, version)
+        black_tiles = len(positions)
         if black_tiles >= required_bytes:
-            print(f"[SELECT] ✅ Version {version} works: {black_tiles} black tiles available")
-            return matrix
+            debug(f"[SELECT] ✅ Version {version} works: {black_tiles} black tiles available")
+            return grid.tolist()
 
     raise ValueError(f"[ERROR] ❌ No QR version found with enough black tiles for {required_bytes} bytes")
 
@@ -106,6 +202,8 @@ def load_key(path, is_private=False, required=False):
             raise
         _KEY_CACHE[cache_key] = None
         return None
+    from cryptography.hazmat.primitives import serialization
+
     key = (
         serialization.load_pem_private_key(key_data, password=None)
         if is_private
@@ -114,22 +212,27 @@ def load_key(path, is_private=False, required=False):
     _KEY_CACHE[cache_key] = key
     return key
 
-def encrypt_rsa(public_key, message) -> str:
+def _oaep_padding():
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    return padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+def rsa_plaintext(message) -> str:
     if message is None:
-        message = ""
-    elif not isinstance(message, str):
-        message = json.dumps(message, separators=(",", ":"), sort_keys=True)
-    return public_key.encrypt(
-        message.encode(),
-        padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
-    ).hex()
+        return ""
+    if not isinstance(message, str):
+        return json.dumps(message, separators=(",", ":"), sort_keys=True)
+    return message
+
+
+def encrypt_rsa(public_key, message) -> str:
+    return public_key.encrypt(rsa_plaintext(message).encode(), _oaep_padding()).hex()
 
 def decrypt_rsa(private_key, ciphertext_hex: str) -> str:
     ciphertext = bytes.fromhex(ciphertext_hex)
-    return private_key.decrypt(
-        ciphertext,
-        padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
-    ).decode()
+    return private_key.decrypt(ciphertext, _oaep_padding()).decode()
 
 
 def safe_decrypt_rsa(private_key, ciphertext_hex: str):
@@ -141,7 +244,69 @@ def safe_decrypt_rsa(private_key, ciphertext_hex: str):
         return None
 
 
-def from_json(data: dict) -> Event:
+def _section_ciphertexts(name: str, section) -> dict:
+    """
+    {(field, index): (plaintext, ciphertext hex)} for the encrypted fields of
+    a role section message; empty when the role's private key is not at hand.
+    """
+    private_key = load_key(f"keys/{SECTION_KEY_IDS[name]}_private.pem", is_private=True)
+    if private_key is None:
+        return {}
+    fields = {}
+    for field, value in section.ListFields():
+        if isinstance(value, bool):
+            continue  # Stored in the clear
+        for index, ciphertext in [(None, value)] if isinstance(value, str) else enumerate(value):
+            plaintext = safe_decrypt_rsa(private_key, ciphertext)
+            if plaintext is not None:
+                fields[(field.name, index)] = (plaintext, ciphertext)
+    return fields
+
+
+def encrypt_section(name: str, data: dict, previous=None):
+    """
+    Protobuf message of role section `name` ("VIP", "STAFF" or "ASSERTER")
+    from its event JSON fields, each encrypted with that role's public key.
+    With `previous` (the section message a ticket holds now), fields whose
+    plaintext is unchanged keep their ciphertext, so they re-encode to the same bytes.
+    """
+    reusable = _section_ciphertexts(name, previous) if previous is not None else {}
+
+    def encrypt(public_key, field, message, index=None):
+        plaintext = rsa_plaintext(message)
+        old = reusable.get((field, index))
+        if old is not None and old[0] == plaintext:
+            return old[1]
+        return encrypt_rsa(public_key, plaintext)
+
+    section = section_messages()[name]()
+    if name == "VIP":
+        vip_pub = load_key("keys/vip_public.pem", required=True)
+        section.vip_lounge_location = encrypt(vip_pub, "vip_lounge_location", data["vip_lounge_location"])
+        section.vip_contact = encrypt(vip_pub, "vip_contact", data["vip_contact"])
+        section.exclusive_sessions.extend(
+            [encrypt(vip_pub, "exclusive_sessions", s, i) for i, s in enumerate(data["exclusive_sessions"])]
+        )
+    elif name == "STAFF":
+        staff_pub = load_key("keys/staff_public.pem", required=True)
+        section.internal_briefing = encrypt(staff_pub, "internal_briefing", data["internal_briefing"])
+        section.security_codes.extend(
+            [encrypt(staff_pub, "security_codes", s, i) for i, s in enumerate(data["security_codes"])]
+        )
+        section.requires_background_check = data["requires_background_check"]
+    elif name == "ASSERTER":
+        asserter_pub = load_key("keys/asserter_public.pem", required=True)
+        section.asserter_app_version = encrypt(asserter_pub, "asserter_app_version", data["asserter_app_version"])
+        section.geolocation = encrypt(asserter_pub, "geolocation", data["geolocation"])
+        section.assertion_valid_until = encrypt(asserter_pub, "assertion_valid_until", data["assertion_valid_until"])
+    else:
+        raise ValueError(f"Section {name} is not an encrypted role section")
+    return section
+
+
+def from_json(data: dict) -> "Event":
+    from proto.event_pb2 import Event, AccessLevelPublic
+
     event = Event(
         event_id=data["event_id"],
         name=data["name"],
@@ -152,35 +317,17 @@ def from_json(data: dict) -> Event:
     if "public_data" in data:
         event.public_data.CopyFrom(AccessLevelPublic(**data["public_data"]))
     if "vip_data" in data:
-        vip_pub = load_key("keys/vip_public.pem", required=True)
-        vip = AccessLevelVIP()
-        vip.vip_lounge_location = encrypt_rsa(vip_pub, data["vip_data"]["vip_lounge_location"])
-        vip.vip_contact = encrypt_rsa(vip_pub, data["vip_data"]["vip_contact"])
-        vip.exclusive_sessions.extend([encrypt_rsa(vip_pub, s) for s in data["vip_data"]["exclusive_sessions"]])
-        event.vip_data.CopyFrom(vip)
+        event.vip_data.CopyFrom(encrypt_section("VIP", data["vip_data"]))
     if "staff_data" in data:
-        staff_pub = load_key("keys/staff_public.pem", required=True)
-        staff = AccessLevelStaff()
-        staff.internal_briefing = encrypt_rsa(staff_pub, data["staff_data"]["internal_briefing"])
-        staff.security_codes.extend([encrypt_rsa(staff_pub, s) for s in data["staff_data"]["security_codes"]])
-        staff.requires_background_check = data["staff_data"]["requires_background_check"]
-        event.staff_data.CopyFrom(staff)
+        event.staff_data.CopyFrom(encrypt_section("STAFF", data["staff_data"]))
     if "asserter_data" in data:
-        asserter_pub = load_key("keys/asserter_public.pem", required=True)
-        asserter = AccessLevelAsserter()
-        asserter.asserter_app_version = encrypt_rsa(asserter_pub, data["asserter_data"]["asserter_app_version"])
-        asserter.geolocation = encrypt_rsa(asserter_pub, data["asserter_data"]["geolocation"])
-        asserter.assertion_valid_until = encrypt_rsa(asserter_pub, data["asserter_data"]["assertion_valid_until"])
-        event.asserter_data.CopyFrom(asserter)
+        event.asserter_data.CopyFrom(encrypt_section("ASSERTER", data["asserter_data"]))
     return event
 
-def generate_public_qr(public_payload: str, max_version: int, module_size: int):
-    matrix = find_suitable_qr_matrix(
-        bitstream="0" * 8,  # placeholder to satisfy capacity check
-        public_payload=public_payload,
-        max_version=max_version,
-        bits_per_tile=8,
-    )
+def render_public_qr(matrix, module_size: int) -> Image.Image:
+    """
+    Draws the visible QR (L0) for a matrix; overlays must use the same matrix.
+    """
     qr_size = len(matrix)
     image_size = qr_size * module_size
     img = Image.new("RGB", (image_size, image_size), "white")
@@ -189,7 +336,17 @@ def generate_public_qr(public_payload: str, max_version: int, module_size: int):
             if matrix[y][x]:
                 img.paste("black", (x * module_size, y * module_size,
                                     (x + 1) * module_size, (y + 1) * module_size))
-    return img, matrix
+    return img
+
+
+def generate_public_qr(public_payload: str, max_version: int, module_size: int):
+    matrix = find_suitable_qr_matrix(
+        bitstream="0" * 8,  # placeholder to satisfy capacity check
+        public_payload=public_payload,
+        max_version=max_version,
+        bits_per_tile=8,
+    )
+    return render_public_qr(matrix, module_size), matrix
 
 
 def save_public_qr(public_payload: str, filename: str, module_size: int, max_version: int = 40):
@@ -198,6 +355,30 @@ def save_public_qr(public_payload: str, filename: str, module_size: int, max_ver
     return filename, matrix
 
 
+def overlay_layers(matrix, header_bitstream: str, filler_bitstream: str, secret_bitstream: str, depth: int) -> list:
+    """
+    (bitstream, depth, color) for each overlay layer in tile order: header,
+    filler, secret, then end filler over every dark module still unused.
+    """
+    layers = [
+        (header_bitstream, 1, DATA_COLOR),
+        (filler_bitstream, 1, FILLER_COLOR_PURPLE),
+        (secret_bitstream, depth, DATA_COLOR),
+    ]
+    used_tiles = sum(math.ceil(len(bits) / 8 ** layer_depth) for bits, layer_depth, _ in layers)
+    total_black_tiles = sum(row.count(1) for row in matrix)
+    remaining_tiles = total_black_tiles - used_tiles
+    if remaining_tiles > 0:
+        end_filler_bitstream, end_filler_color = generate_dummy_filler_bitstream(
+            depth=1,
+            tile_count=remaining_tiles,
+            bits_per_tile=8,
+            color=FILLER_COLOR_BLUE
+        )
+        layers.append((end_filler_bitstream, 1, end_filler_color))
+    return layers
+
+
 def apply_overlays(
     base_img: Image.Image,
     matrix,
@@ -206,41 +387,43 @@ def apply_overlays(
     secret_bitstream: str,
     module_size: int,
     depth: int,
+    layers: list | None = None,
 ):
+    # `layers` reuses an `overlay_layers` result so the image matches other renders of it
+    if layers is None:
+        layers = overlay_layers(matrix, header_bitstream, filler_bitstream, secret_bitstream, depth)
+    img = base_img
     tile_index = 0
-    img, tile_index = render_qr_with_t_squares_partial(
-        matrix, header_bitstream, module_size=module_size, depth=1, start_tile=tile_index, img=base_img
-    )
-    img, tile_index = render_qr_with_t_squares_partial(
-        matrix, filler_bitstream, module_size=module_size, depth=1, start_tile=tile_index, img=img, color=FILLER_COLOR_PURPLE
-    )
-    img, tile_index = render_qr_with_t_squares_partial(
-        matrix, secret_bitstream, module_size=module_size, depth=depth, start_tile=tile_index, img=img
-    )
-    total_black_tiles = sum(row.count(1) for row in matrix)
-    remaining_tiles = total_black_tiles - tile_index
-    if remaining_tiles > 0:
-        end_filler_bitstream, end_filler_color = generate_dummy_filler_bitstream(
-            depth=1,
-            tile_count=remaining_tiles,
-            bits_per_tile=8,
-            color=FILLER_COLOR_BLUE
-        )
+    for bitstream, layer_depth, color in layers:
         img, tile_index = render_qr_with_t_squares_partial(
-            matrix, end_filler_bitstream, module_size=module_size, depth=1, start_tile=tile_index, img=img, color=end_filler_color
+            matrix, bitstream, module_size=module_size, depth=layer_depth, start_tile=tile_index, img=img, color=color
         )
     return img
 
 
-def encode_from_dict(
-    json_data: dict,
-    filename: str = "fractalized_qr.png",
-    dimension: int = 1,
-    return_metadata: bool = False,
-    reserve_bits: int = 0,
-    asserter_max_depth: int | None = None,
-):
-    from_json_proto = from_json(json_data)
+_EVENT_SECTION_CACHE = OrderedDict()
+
+
+def event_sections(json_data: dict, rs_parity: int = RS_PARITY, reuse: bool = False) -> tuple:
+    """
+    Encrypts an event once: returns (event proto, public payload, {section:
+    encoded blob}) for its role sections. With `reuse` the result is cached
+    per event content and parity, so a batch encrypts and compresses each
+    role section once and its tickets carry identical ciphertexts.
+    """
+    cache_key = None
+    if reuse:
+        content = json.dumps(json_data, sort_keys=True, separators=(",", ":"), default=str)
+        cache_key = (hashlib.sha256(content.encode("utf-8")).hexdigest(), rs_parity)
+        cached = _EVENT_SECTION_CACHE.get(cache_key)
+        if cached is not None:
+            _EVENT_SECTION_CACHE.move_to_end(cache_key)
+            return cached
+
+    from google.protobuf.json_format import MessageToDict
+
+    with stage("encode.encrypt"):
+        from_json_proto = from_json(json_data)
     base_fields = MessageToDict(from_json_proto, preserving_proto_field_name=True)
 
     # Strip hidden roles from public layer
@@ -253,9 +436,9 @@ def encode_from_dict(
     base64_bytes = base64.b64encode(compact_json.encode("utf-8"))
     encoded_payload = urllib.parse.quote(base64_bytes.decode("utf-8"))
     public_payload = f"{PUBLIC_PAYLOAD_URL}={encoded_payload}"
-    print(f"Public URL : {public_payload}")
+    debug(f"Public URL : {public_payload}")
 
-    # Encode hidden protobuf data
+    # Encode hidden protobuf data (each section compressed on its own tiles)
     sections = {}
     if from_json_proto.HasField("vip_data"):
         sections["VIP"] = from_json_proto.vip_data
@@ -263,14 +446,73 @@ def encode_from_dict(
         sections["STAFF"] = from_json_proto.staff_data
     if from_json_proto.HasField("asserter_data"):
         sections["ASSERTER"] = from_json_proto.asserter_data
-    secret_bitstream = encode_sections_protobuf(sections, depth=dimension)
-    secret_bytes = bytes(
-        int(secret_bitstream[i:i + 8], 2) for i in range(0, len(secret_bitstream), 8)
-    )
+    with stage("encode.compress", sections=len(sections)) as fields:
+        blobs = encode_section_blobs(sections, rs_parity)
+        fields["bytes"] = sum(len(blob) for blob in blobs.values())
+
+    result = (from_json_proto, public_payload, blobs)
+    if cache_key is not None:
+        _EVENT_SECTION_CACHE[cache_key] = result
+        if len(_EVENT_SECTION_CACHE) > EVENT_SECTION_CACHE_SIZE:
+            _EVENT_SECTION_CACHE.popitem(last=False)
+    return result
+
+
+def ticket_identity(event_id: str, ticket: dict) -> "TicketIdentity":
+    """
+    TICKET section for {"serial": ..., "holder": ...}. The holder is hashed
+    with the event id as salt; a precomputed "holder_sha256" is used as is.
+    """
+    holder_sha256 = ticket.get("holder_sha256")
+    if holder_sha256 is None and ticket.get("holder"):
+        holder_sha256 = hashlib.sha256(f"{event_id}:{ticket['holder']}".encode("utf-8")).hexdigest()
+    from proto.event_pb2 import TicketIdentity
+
+    return TicketIdentity(serial=str(ticket["serial"]), holder_sha256=holder_sha256 or "")
+
+
+def encode_from_dict(
+    json_data: dict,
+    filename: str = "fractalized_qr.png",
+    dimension: int = 1,
+    return_metadata: bool = False,
+    reserve_bits: int = 0,
+    asserter_max_depth: int | None = None,
+    rs_parity: int = RS_PARITY,
+    stream: bool | None = None,
+    ticket: dict | None = None,
+    reuse_sections: bool = False,
+):
+    """
+    `stream` renders in bands straight into the PNG file instead of building
+    the whole image in memory; by default only images of at least
+    STREAM_RENDER_MIN_PIXELS are streamed. Streamed tickets carry no
+    `public_qr_image` in the metadata.
+
+    `ticket` ({"serial", "holder"}) adds a per-ticket TICKET section;
+    `reuse_sections` takes the event's role sections from `event_sections`'
+    cache instead of encrypting them again (see `issue_batch`).
+
+    The metadata also carries the overlay `layers`, `module_size` and
+    `qr_version`, enough to render the ticket again (e.g. onto a print sheet).
+    """
+    rs_parity = usable_parity(rs_parity)
+    from_json_proto, public_payload, blobs = event_sections(json_data, rs_parity, reuse=reuse_sections)
+    with stage("encode.compress", sections=len(blobs) + (ticket is not None)) as fields:
+        if ticket is not None:
+            identity = ticket_identity(from_json_proto.event_id, ticket)
+            blobs = {**blobs, **encode_section_blobs({"TICKET": identity}, rs_parity)}
+        secret_bitstream, section_directory = layout_section_blobs(
+            blobs, depth=dimension, key_ids=SECTION_KEY_IDS, rs_parity=rs_parity
+        )
+        secret_bytes = bytes(
+            int(secret_bitstream[i:i + 8], 2) for i in range(0, len(secret_bitstream), 8)
+        )
+        fields["bytes"] = len(secret_bytes)
 
     # Compute tile capacity
     bits_per_tile = 8 ** dimension
-    print(f"bits_per_tile is {bits_per_tile} for (dimension={dimension})")
+    debug(f"bits_per_tile is {bits_per_tile} for (dimension={dimension})")
     max_depth = max(dimension, asserter_max_depth or dimension)
     module_size = compute_module_size(max_depth)
 
@@ -295,43 +537,63 @@ def encode_from_dict(
         "asserter_bits_per_tile": (8 ** asserter_max_depth) if asserter_max_depth else None,
         "asserter_module_size": compute_module_size(asserter_max_depth) if asserter_max_depth else None,
         "asserter_reserve_bits": reserve_bits,
+        "overlay_header": reserve_bits > 0,
+        "sections": section_directory,
+        "rs_parity": rs_parity,
+        "header_parity": usable_parity(HEADER_RS_PARITY),
     }
-    header_bytes = json.dumps(header_json, separators=(",", ":")).encode("utf-8")
+    header_bytes = encode_header_bytes(header_json)
 
-    print("[ENCODE] Header JSON:", header_json)
-    print("[ENCODE] Header Bytes:", list(header_bytes))
-    
     header_bitstream = ''.join(f"{b:08b}" for b in header_bytes)
-    print("[ENCODE] Header Bitstream First 64 bits:", header_bitstream[:64])
+    if DEBUG_OUTPUT:
+        print("[ENCODE] Header JSON:", header_json)
+        print("[ENCODE] Header Bytes:", list(header_bytes))
+        print("[ENCODE] Header Bitstream First 64 bits:", header_bitstream[:64])
 
     # Combine bitstream
     flattened_bitstream = header_bitstream + filler_bitstream + secret_bitstream
 
     # Find suitable QR version (reserve optional capacity for asserter layer)
-    capacity_bitstream = flattened_bitstream + ("0" * max(0, reserve_bits))
-    matrix = find_suitable_qr_matrix(
-        bitstream=capacity_bitstream,
-        public_payload=public_payload,
-        bits_per_tile=bits_per_tile
-    )
-
-    # Step 1: Generate visible QR (L0)
-    base_img, _ = generate_public_qr(public_payload, max_version=40, module_size=module_size)
-
-    # Step 2: Apply overlays (header + filler + secret)
-    img = apply_overlays(
-        base_img=base_img,
-        matrix=matrix,
-        header_bitstream=header_bitstream,
-        filler_bitstream=filler_bitstream,
-        secret_bitstream=secret_bitstream,
-        module_size=module_size,
-        depth=dimension,
-    )
-        
+    reserve_capacity = reserve_bits + OVERLAY_HEADER_TILES * bits_per_tile if reserve_bits > 0 else 0
+    capacity_bitstream = flattened_bitstream + ("0" * reserve_capacity)
+    with stage("encode.version_search", bits=len(capacity_bitstream)) as fields:
+        matrix = find_suitable_qr_matrix(
+            bitstream=capacity_bitstream,
+            public_payload=public_payload,
+            bits_per_tile=bits_per_tile
+        )
+        fields["modules"] = len(matrix)
+
+    image_side = len(matrix) * module_size
+    if stream is None:
+        stream = image_side * image_side >= STREAM_RENDER_MIN_PIXELS
+    layers = overlay_layers(matrix, header_bitstream, filler_bitstream, secret_bitstream, dimension)
+    if stream:
+        # Render band by band into the PNG encoder; the full image never exists in memory
+        base_img = None
+        with stage("encode.render_stream", pixels=image_side * image_side, depth=dimension) as fields:
+            fields["bytes"] = write_ticket_png(filename, matrix, layers, module_size)
+    else:
+        with stage("encode.render", tiles=math.ceil(len(flattened_bitstream) / bits_per_tile), depth=dimension):
+            # Step 1: Generate visible QR (L0) from the matrix the overlays are laid out on
+            base_img = render_public_qr(matrix, module_size)
+
+            # Step 2: Apply overlays (header + filler + secret)
+            img = apply_overlays(
+                base_img=base_img,
+                matrix=matrix,
+                header_bitstream=header_bitstream,
+                filler_bitstream=filler_bitstream,
+                secret_bitstream=secret_bitstream,
+                module_size=module_size,
+                depth=dimension,
+                layers=layers,
+            )
 
-    # Save QR image + proto blob
-    img.save(filename)
+        # Save QR image + proto blob
+        with stage("encode.png_save", pixels=img.width * img.height) as fields:
+            palette = ticket_palette((DATA_COLOR, FILLER_COLOR_PURPLE, FILLER_COLOR_BLUE)) if PNG_PALETTE_OUTPUT else None
+            fields["bytes"] = write_png(filename, np.asarray(img), palette=palette)
     with open("event_rsa.bin", "wb") as f:
         f.write(from_json_proto.SerializeToString())
 
@@ -343,8 +605,190 @@ def encode_from_dict(
             "secret_bytes": secret_bytes,
             "header": header_json,
             "public_qr_image": base_img,
+            "layers": layers,
+            "module_size": module_size,
+            "qr_version": matrix_version(matrix),
+            "serial": str(ticket["serial"]) if ticket is not None else None,
         }
 
+
+def encode_header_bytes(header_json: dict) -> bytes:
+    """
+    Header as written to its depth-1 tiles: compact JSON, then its RS parity.
+    """
+    header_bytes = json.dumps(header_json, separators=(",", ":")).encode("utf-8")
+    # Parity follows the JSON so the header still reads without correction
+    return header_bytes + rs_parity_for(header_bytes, header_json.get("header_parity") or 0)
+
+
+def issue_batch(
+    json_data: dict,
+    tickets: list[dict],
+    filename_pattern: str = "ticket_{serial}.png",
+    dimension: int = 1,
+    **options,
+) -> list[dict]:
+    """
+    Issues one ticket per {"serial", "holder"} entry for the same event.
+    The role sections are encrypted and compressed once and the QR matrix is
+    built once; per ticket only the TICKET section is encoded, and tickets
+    are band-rendered straight to PNG. Returns each ticket's metadata.
+    """
+    options.setdefault("stream", True)
+    return [
+        encode_from_dict(
+            json_data,
+            filename=filename_pattern.format(serial=ticket["serial"]),
+            dimension=dimension,
+            return_metadata=True,
+            ticket=ticket,
+            reuse_sections=True,
+            **options,
+        )
+        for ticket in tickets
+    ]
+
+
+def _changed_tiles(old: bytes, new: bytes, bytes_per_tile: int) -> np.ndarray:
+    """
+    Indices of the tiles whose bytes differ between two equal-length spans.
+    """
+    old_tiles = np.frombuffer(old, dtype=np.uint8).reshape(-1, bytes_per_tile)
+    new_tiles = np.frombuffer(new, dtype=np.uint8).reshape(-1, bytes_per_tile)
+    return np.flatnonzero((old_tiles != new_tiles).any(axis=1))
+
+
+def _palette_slot(palette: np.ndarray, color) -> int:
+    slots = np.flatnonzero((palette[:, :3] == np.asarray(color)[:3]).all(axis=1))
+    if not len(slots):
+        raise ValueError(f"Ticket palette has no {tuple(color)} entry; re-issue it with encode_from_dict.")
+    return int(slots[0])
+
+
+def reissue_sections(image, section_data: dict, filename: str | None = None, header: dict | None = None) -> dict:
+    """
+    Re-issues a ticket with new role-section contents ({"vip_data": ...,
+    "staff_data": ...}, shaped as in the event JSON) without rebuilding it.
+    Each section is encrypted and compressed again into the tiles it already
+    has, padded to its old encoded length so the header normally stays as
+    is, and only tiles whose bytes differ from the image are repainted: the
+    QR version, base raster, filler and other sections are left untouched.
+    Where the role's private key is at hand, unchanged fields keep their
+    ciphertext, so a section passed in unchanged repaints no tiles; an edited
+    section is recompressed (and RS-interleaved) as a whole, so most of its
+    tiles still change.
+
+    `image` is the ticket's path (overwritten unless `filename` is given) or
+    PNG bytes; `header` (e.g. from the issuance metadata) skips reading it
+    from the image. Raises ValueError when a section is not on the ticket or
+    no longer fits its tiles; re-issue those with `encode_from_dict`. A C2PA
+    signature no longer matches the repainted image: sign it again.
+    Returns {"filename", "header", "repainted_tiles": {"header"/section: count}}.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        img_bytes = bytes(image)
+        if filename is None:
+            raise ValueError("filename is required when the ticket is given as bytes")
+    else:
+        with open(image, "rb") as f:
+            img_bytes = f.read()
+        filename = filename or image
+    # Palette tickets are repainted and written back as palette indices
+    palette_image = load_palette_png(img_bytes)
+    if palette_image is not None:
+        canvas, palette = palette_image
+        pixels = np.take(palette, canvas, axis=0)
+        indexed = (canvas, palette_lit_table(palette))
+    else:
+        pixels, indexed = load_ticket_pixels(img_bytes)
+        canvas, palette = pixels, None
+
+    if header is None:
+        header, header_end_tile, positions = locate_header(pixels, indexed=indexed)
+    else:
+        header_end_tile = len(encode_header_bytes(header))
+        positions = None
+    module_size = header.get("module_size", MODULE_SIZE)
+    if positions is None:
+        positions = find_black_tile_positions(pixels, module_size)
+    directory = header.get("sections")
+    if directory is None:
+        raise ValueError("Ticket has no section directory; re-issue it with encode_from_dict.")
+    rs_parity = header.get("rs_parity") or 0
+    tile_start = secret_tile_start(header, header_end_tile)
+
+    new_directory = [list(entry) for entry in directory]
+    spans = []
+    with stage("reissue.encrypt", sections=len(section_data)):
+        for key, data in section_data.items():
+            name = SECTION_DATA_KEYS.get(key)
+            if name is None:
+                raise ValueError(f"Unknown role section '{key}' (expected one of {sorted(SECTION_DATA_KEYS)})")
+            entry = next((entry for entry in new_directory if entry[0] == name), None)
+            if entry is None:
+                raise ValueError(f"Ticket has no {name} section to replace; re-issue it with encode_from_dict.")
+            _name, _key_id, start, count, depth = entry[:5]
+            capacity = count * 8 ** depth // 8
+            try:
+                previous = decode_hidden_sections(pixels, header, header_end_tile, [name], positions, indexed).get(name)
+            except ValueError:
+                previous = None  # Unreadable: every field is encrypted afresh
+            message_capacity = message_length_for(capacity, rs_parity) if rs_parity and len(entry) > 5 else capacity
+            # OAEP is randomized, so each encryption compresses to a slightly
+            # different length: draw again when one misses the tiles by a few bytes
+            for _attempt in range(REISSUE_ENCRYPT_ATTEMPTS):
+                blob = encode_section_blob(name, encrypt_section(name, data, previous))
+                if len(blob) <= message_capacity:
+                    break
+            else:
+                raise ValueError(
+                    f"New {name} section needs {len(blob)} bytes but its {count} tiles hold {message_capacity}; "
+                    "re-issue the ticket with encode_from_dict."
+                )
+            if rs_parity and len(entry) > 5:
+                # Zeros after the zlib stream are ignored on decode; padding to the
+                # old message length keeps the encoded length the directory records
+                old_message_length = message_length_for(entry[5], rs_parity)
+                blob = rs_encode_interleaved(blob.ljust(old_message_length, b"\0"), rs_parity)
+                entry[5] = len(blob)
+            spans.append((name, tile_start + start, count, depth, blob.ljust(capacity, b"\0")))
+
+    new_header = {**header, "sections": new_directory}
+    old_header_bytes = encode_header_bytes(header)
+    new_header_bytes = encode_header_bytes(new_header)
+    if len(new_header_bytes) != len(old_header_bytes):
+        raise ValueError("The new section lengths change the header size; re-issue the ticket with encode_from_dict.")
+    # Header tiles are depth 1, one byte each
+    spans.insert(0, ("header", 0, len(new_header_bytes), HEADER_DEPTH, new_header_bytes))
+
+    # Compare with what the image holds now, then repaint just the differing tiles
+    with stage("reissue.sampling", tiles=sum(count for _, _, count, _, _ in spans)):
+        changed = {
+            name: _changed_tiles(
+                read_tile_bytes(pixels, positions, module_size, depth, first_tile, count, indexed=indexed),
+                new_bytes,
+                8 ** depth // 8,
+            )
+            for name, first_tile, count, depth, new_bytes in spans
+        }
+    canvas = np.require(canvas, requirements=["C", "W"])
+    shades = np.array([(0, 0, 0), DATA_COLOR[:3]], dtype=np.uint8)
+    if palette is not None:
+        shades = np.array([_palette_slot(palette, color) for color in shades], dtype=np.uint8)
+    with stage("reissue.repaint", tiles=sum(len(tiles) for tiles in changed.values())):
+        for name, first_tile, count, depth, new_bytes in spans:
+            tiles = changed[name]
+            if len(tiles):
+                tile_bytes = np.frombuffer(new_bytes, dtype=np.uint8).reshape(count, -1)[tiles].tobytes()
+                paint_tiles(canvas, positions[first_tile + tiles], tile_bytes, module_size, depth, shades)
+
+    with stage("reissue.png_save", pixels=canvas.shape[0] * canvas.shape[1]) as fields:
+        fields["bytes"] = write_png(filename, canvas, palette=palette)
+    repainted = {name: int(len(tiles)) for name, tiles in changed.items()}
+    print(f"✅ Re-issued {', '.join(name for name, *_ in spans[1:])} ({sum(repainted.values())} tiles repainted) to '{filename}'")
+    return {"filename": filename, "header": new_header, "repainted_tiles": repainted}
+
+
 def extract_tiles_by_color(img, color, module_size=10, tolerance=10):
     import numpy as np
 
@@ -361,66 +805,91 @@ def extract_tiles_by_color(img, color, module_size=10, tolerance=10):
     return tiles
 
 
-def extract_header_from_qr(img_path: str, module_size: int = MODULE_SIZE, max_tiles: int = 256) -> tuple:
-    # Step 1: Extract tiles and keep only black tiles in scan order
-    tile_grid = extract_tiles_from_image(
-        img_path,
-        module_size=module_size,
-        depth=HEADER_DEPTH,
-    )
+def extract_header_from_qr(
+    image,
+    module_size: int = MODULE_SIZE,
+    max_tiles: int = HEADER_MAX_TILES,
+    positions=None,
+    indexed=None,
+) -> tuple:
+    # Step 1: Index black tiles in scan order (image may be a path, PIL image or RGB array)
+    pixels = load_image_array(image)
+    if positions is None:
+        positions = find_black_tile_positions(pixels, module_size)
 
-    if isinstance(tile_grid[0], list):
-        tiles = [tile for row in tile_grid for tile in row]
-    else:
-        tiles = tile_grid
-
-    black_tiles = []
-    for tile in tiles:
-        if isinstance(tile, np.ndarray):
-            tile = Image.fromarray(tile)
-        if not isinstance(tile, Image.Image):
-            raise TypeError(f"Unexpected tile type: {type(tile)}")
-        if is_black_tile(tile):
-            black_tiles.append(tile)
-        if len(black_tiles) >= max_tiles:
-            break
-
-    # Step 4: Decode bytes from header tiles
-    header_bytes = []
-    for i, tile in enumerate(black_tiles):
-        byte = extract_byte_from_recursive_tile(tile, depth=HEADER_DEPTH)
-        byte_val = byte[0] if isinstance(byte, bytes) else byte
-        header_bytes.append(byte_val)
+    # Step 2: Decode bytes from header tiles
+    tile_count = min(max_tiles, len(positions))
+    header_bytes = list(read_tile_bytes(pixels, positions, module_size, HEADER_DEPTH, 0, tile_count, indexed=indexed))
 
     # Step 5: Extract JSON substring
     header_raw = bytes(header_bytes)
     json_start = header_raw.find(b"{")
     json_end = header_raw.find(b"}", json_start + 1) if json_start != -1 else -1
+    header = None
+    parse_error = None
     if json_start != -1 and json_end != -1 and json_end > json_start:
         header_str = header_raw[json_start:json_end + 1].decode("utf-8", errors="ignore")
+        # Step 6: Parse JSON
+        try:
+            header = json.loads(header_str)
+        except Exception as e:
+            parse_error = e
     else:
         header_str = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in header_bytes)
-        print("[ERROR] No JSON bounds detected in header bytes")
-        print("[DEBUG] Raw header string:", repr(header_str))
-        print("[DEBUG] Raw header bytes:", header_bytes)
-        raise ValueError("No JSON bounds detected in header bytes")
 
-    # Step 6: Parse JSON
-    try:
-        header = json.loads(header_str)
-    except Exception as e:
-        print("[ERROR] JSON decode failed:", e)
-        print("[DEBUG] Raw header string:", repr(header_str))
-        print("[DEBUG] Raw header bytes:", header_bytes)
-        raise
+    # Step 7: Check the JSON against its RS parity, or repair it when it did not parse
+    if header is not None and header.get("header_parity"):
+        parity = header["header_parity"]
+        repaired = _correct_header_bytes(header_raw, json_start, json_end + 1, parity)
+        if repaired is not None:
+            return repaired
+        parity_len = len(block_sizes(json_end + 1 - json_start, parity)) * parity
+        return header, json_end + 1 + parity_len
+    if header is None and HEADER_RS_PARITY > 0:
+        for idx, byte in enumerate(header_raw):
+            if byte != ord("}"):
+                continue
+            repaired = _correct_header_bytes(header_raw, 0, idx + 1, HEADER_RS_PARITY)
+            if repaired is not None:
+                debug("[DECODE] Header repaired with Reed-Solomon parity")
+                return repaired
+
+    if header is None:
+        debug("[ERROR] JSON decode failed:", parse_error or "No JSON bounds detected in header bytes")
+        debug("[DEBUG] Raw header string:", repr(header_str))
+        debug("[DEBUG] Raw header bytes:", header_bytes)
+        if parse_error is not None:
+            raise parse_error
+        raise ValueError("No JSON bounds detected in header bytes")
 
     return header, json_end + 1
 
 
+def _correct_header_bytes(header_raw: bytes, json_start: int, json_stop: int, parity: int):
+    """
+    RS-corrects header_raw[json_start:json_stop] with the parity written after it.
+    Returns (header, header_end_tile), or None if it cannot be repaired.
+    """
+    message = header_raw[json_start:json_stop]
+    parity_len = len(block_sizes(len(message), parity)) * parity
+    corrected = rs_correct_systematic(message, header_raw[json_stop:json_stop + parity_len], parity)
+    if corrected is None:
+        return None
+    try:
+        header = json.loads(corrected.decode("utf-8"))
+    except Exception:
+        return None
+    if not isinstance(header, dict) or header.get("header_parity") != parity:
+        return None
+    return header, json_stop + parity_len
+
+
 def decode_asserter_overlay(
-    image_path: str,
+    image_path,
     header: dict,
     header_end_tile: int,
+    positions=None,
+    indexed=None,
 ) -> dict | None:
     reserve_bits = header.get("asserter_reserve_bits") or header.get("reserve_bits") or 0
     asserter_max_depth = header.get("asserter_max_depth") or 1
@@ -432,21 +901,56 @@ def decode_asserter_overlay(
     issuer_bits_per_tile = header.get("bits_per_tile", 8)
     issuer_tiles = math.ceil(header.get("bit_length", 0) / issuer_bits_per_tile)
     tile_start = header_end_tile + filler_tiles + issuer_tiles
+    pixels = load_image_array(image_path)
+    module_size = header.get("module_size", MODULE_SIZE)
+
+    if header.get("overlay_header"):
+        # The asserter recorded its depth and length: sample the reserve once.
+        if positions is None:
+            positions = find_black_tile_positions(pixels, module_size)
+        try:
+            recorded = parse_overlay_header(
+                read_tile_bytes(pixels, positions, module_size, 1, tile_start, OVERLAY_HEADER_TILES, indexed=indexed)
+            )
+            if recorded is None:
+                return None
+            depth, byte_length = recorded
+            compressed = read_tile_bytes(
+                pixels,
+                positions,
+                module_size,
+                depth,
+                tile_start + OVERLAY_HEADER_TILES,
+                math.ceil(byte_length * 8 / 8 ** depth),
+                indexed=indexed,
+            )[:byte_length]
+            sections = decode_sections_protobuf(compressed, {
+                "ASSERTER": section_messages()["ASSERTER"],
+            })
+        except Exception as e:
+            logger.warning("Asserter overlay decode failed: %s", e)
+            return None
+        if sections.get("ASSERTER"):
+            return {"sections": sections, "depth": depth}
+        return None
 
+    # Tickets issued without an overlay header: probe each allowed depth.
     for depth in range(int(asserter_max_depth), 0, -1):
+        check_deadline("decode.asserter")
         try:
             bitstream = extract_bitstream_from_recursive_qr(
-                image_path=image_path,
-                module_size=header.get("module_size", MODULE_SIZE),
+                image_path=pixels,
+                module_size=module_size,
                 depth=depth,
                 tile_start=tile_start,
                 bit_limit=reserve_bits,
+                positions=positions,
             )
             if not bitstream:
                 continue
             compressed = bytes(int(bitstream[i:i+8], 2) for i in range(0, len(bitstream), 8))
             sections = decode_sections_protobuf(compressed, {
-                "ASSERTER": AccessLevelAsserter,
+                "ASSERTER": section_messages()["ASSERTER"],
             })
             if sections.get("ASSERTER"):
                 return {"sections": sections, "depth": depth}
@@ -454,6 +958,88 @@ def decode_asserter_overlay(
             continue
     return None
 
+
+def secret_tile_start(header: dict, header_end_tile: int) -> int:
+    filler_bits = header.get("filler_bits")
+    if filler_bits is not None:
+        filler_tiles = math.ceil(filler_bits / 8)  # filler is always depth=1 (8 bits per tile)
+    else:
+        filler_tiles = FILLER_TILE_COUNT
+    return header_end_tile + filler_tiles
+
+
+def read_secret_bytes(image, header: dict, header_end_tile: int, positions=None, indexed=None) -> bytes:
+    """
+    Raw hidden-layer bytes as encode_from_dict produced them (`secret_bytes`),
+    i.e. what the manifest's hidden_payload_sha256 commits to.
+    """
+    pixels = load_image_array(image)
+    module_size = header.get("module_size", MODULE_SIZE)
+    if positions is None:
+        positions = find_black_tile_positions(pixels, module_size)
+    depth = header["depth"]
+    bit_length = header["bit_length"]
+    tile_count = math.ceil(bit_length / 8 ** depth)
+    data = read_tile_bytes(
+        pixels, positions, module_size, depth, secret_tile_start(header, header_end_tile), tile_count, indexed=indexed
+    )
+    return data[:bit_length // 8]
+
+
+def decode_hidden_sections(
+    image,
+    header: dict,
+    header_end_tile: int,
+    section_names,
+    positions=None,
+    indexed=None,
+) -> dict:
+    """
+    Samples and decompresses only the requested hidden sections.
+    Tickets issued before the section directory fall back to the shared stream.
+    """
+    section_names = [name for name in section_names if name in SECTION_NAMES]
+    if not section_names:
+        return {}
+
+    pixels = load_image_array(image)
+    module_size = header.get("module_size", MODULE_SIZE)
+    if positions is None:
+        positions = find_black_tile_positions(pixels, module_size)
+
+    tile_start = secret_tile_start(header, header_end_tile)
+
+    directory = header.get("sections")
+    if directory is None:
+        with stage("decode.sampling", bits=header["bit_length"], depth=header["depth"]):
+            bitstream = extract_bitstream_from_recursive_qr(
+                image_path=pixels,
+                module_size=module_size,
+                depth=header["depth"],
+                tile_start=tile_start,
+                bit_limit=header["bit_length"],
+                positions=positions,
+            )
+        compressed = bytes(int(bitstream[i:i+8], 2) for i in range(0, len(bitstream), 8))
+        with stage("decode.decompress", bytes=len(compressed)):
+            sections = decode_sections_protobuf(compressed, section_messages())
+        return {name: sections[name] for name in section_names if name in sections}
+
+    rs_parity = header.get("rs_parity") or 0
+    sections = {}
+    for entry in directory:
+        name, _key_id, start, count, depth = entry[:5]
+        if name not in section_names:
+            continue
+        check_deadline("decode.sampling")
+        with stage("decode.sampling", section=name, tiles=count, depth=depth):
+            blob = read_tile_bytes(pixels, positions, module_size, depth, tile_start + start, count, indexed=indexed)
+        with stage("decode.decompress", section=name, bytes=len(blob)):
+            if rs_parity and len(entry) > 5:
+                blob = rs_decode_interleaved(blob[:entry[5]], rs_parity)
+            sections.update(decode_sections_protobuf(blob, {name: section_messages()[name]}))
+    return sections
+
 # def extract_header_from_image(img_np: np.ndarray, module_size: int = 27):
 #     from PIL import Image
 #     import numpy as np
@@ -512,111 +1098,192 @@ def decode_asserter_overlay(
 
 
 
-def decode_with_role(role: str, img_bytes: bytes):
-    import numpy as np
-    import json
-    import re
-    import urllib.parse
-
-    # Step 1: Convert image bytes → image and save temporarily
-    np_img = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-    cv2.imwrite("temp_qr.png", img)
-
- 
-    # Step 2: Extract header (always depth=1)
-    header = None
-    header_end_tile = None
-    header_module_size = None
-    module_size_candidates = [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES
-    for candidate_size in module_size_candidates:
+def locate_header(pixels, module_sizes=None, public_payload: str | None = None, indexed=None) -> tuple:
+    """
+    Tries each candidate module size until the header parses.
+    With the public payload, tile positions come from the regenerated QR
+    matrix; otherwise palette tickets are read from each module's centre
+    pixel and other images have every module thresholded.
+    `pixels` may be an ImagePyramid: the header is then read from a reduced
+    level, and an image a whole number of times larger than issued gets its
+    `scale` set so the sections are sampled at the issued resolution.
+    Returns (header, header_end_tile, positions); positions is None if the
+    header declares a module size other than the one it was read at (and
+    the difference could not be recorded as a pyramid scale).
+    """
+    pyramid = pixels if isinstance(pixels, ImagePyramid) else ImagePyramid(pixels)
+    pyramid.scale = 1  # Candidates are pitches of the image as given
+    full = pyramid.level(1)
+    if module_sizes is None:
+        module_sizes = module_size_candidates(full.shape[1])
+    for candidate_size in module_sizes:
+        check_deadline("decode.header")
         try:
-            header, header_end_tile = extract_header_from_qr("temp_qr.png", module_size=candidate_size)
-            header_module_size = candidate_size
-            break
+            candidate_positions = tile_positions_for_image(full, public_payload, candidate_size)
+            if candidate_positions is None and indexed is not None:
+                candidate_positions = find_black_tile_positions_indexed(*indexed, candidate_size)
+            if candidate_positions is None:
+                candidate_positions = find_black_tile_positions(pyramid, candidate_size)
+            header, header_end_tile = extract_header_from_qr(
+                pyramid, module_size=candidate_size, positions=candidate_positions, indexed=indexed
+            )
         except Exception:
             continue
-    if header is None or header_end_tile is None:
-        raise ValueError("Failed to extract header from QR image.")
-    #header, header_end_tile = extract_header_from_image(img)
-    actual_depth = header["depth"]
-    bit_length = header["bit_length"]
-    module_size = header.get("module_size", header_module_size or MODULE_SIZE)
-    filler_bits = header.get("filler_bits")
-    if filler_bits is not None:
-        filler_tiles = math.ceil(filler_bits / 8)  # filler is always depth=1 (8 bits per tile)
-    else:
-        filler_tiles = FILLER_TILE_COUNT
-    # Adjust starting tile for secret data based on header + filler tiles
-    tile_start = header_end_tile + filler_tiles
-    print(f"[DEBUG] Header: {header}")
-    print(f"[DEBUG] header_end_tile={header_end_tile} filler_tiles={filler_tiles} tile_start={tile_start}")
-
-    # Step 3: Decode secret bitstream using declared depth
-    bitstream = extract_bitstream_from_recursive_qr(
-        image_path="temp_qr.png",
-        module_size=module_size,
-        depth=actual_depth,
-        tile_start=tile_start,       # 32 for header + 8 filler (adjustable)
-        bit_limit=bit_length
-    )
-
-    # Step 4: Decode protobuf sections
-    compressed = bytes(int(bitstream[i:i+8], 2) for i in range(0, len(bitstream), 8))
-    zlib_idx = -1
-    for i in range(len(compressed) - 1):
-        if compressed[i] == 0x78 and compressed[i + 1] in (0x01, 0x9C, 0xDA):
-            zlib_idx = i
-            break
-    print(f"[DEBUG] Compressed bytes (first 32): {compressed[:32].hex()}")
-    print(f"[DEBUG] zlib_header_index={zlib_idx}")
-    sections = decode_sections_protobuf(compressed, {
-        "VIP": AccessLevelVIP,
-        "STAFF": AccessLevelStaff,
-    })
-
-    vip = sections.get("VIP")
-    staff = sections.get("STAFF")
+        declared_size = header.get("module_size", candidate_size)
+        positions = candidate_positions
+        if declared_size != candidate_size:
+            if pyramid is pixels and candidate_size % declared_size == 0:
+                pyramid.scale = candidate_size // declared_size
+            else:
+                positions = None
+        return header, header_end_tile, positions
+    raise ValueError("Failed to extract header from QR image.")
+
+
+def decode_with_role(role: str, img_bytes: bytes, deadline_ms: float | None = None, deadline: Deadline | None = None):
+    """
+    Decodes ticket image bytes for `role`. `deadline_ms` (or a `Deadline`,
+    which can also be cancelled) bounds the hidden layer; see `decode_pixels`.
+    """
+    if deadline is None and deadline_ms is not None:
+        deadline = Deadline(deadline_ms)
+    # Step 1: Convert image bytes → RGB array (sampled in memory, no temp file)
+    pixels, indexed = load_ticket_pixels(img_bytes)
+    return decode_pixels(role, pixels, indexed=indexed, deadline=deadline)
+
+
+def _decode_hidden_layer(
+    role: str,
+    pixels: ImagePyramid,
+    public_url: str | None,
+    module_sizes,
+    located: tuple | None,
+    indexed: tuple | None,
+) -> tuple:
+    """
+    Hidden-layer steps of `decode_pixels`: header, the role's sections and
+    decryption. Returns (vip, staff, asserter, ticket); the role sections
+    decrypted, None where absent or not readable by the role.
+    """
+    wanted_sections = ROLE_SECTIONS.get(role, ())
+    vip = None
+    staff = None
     asserter = None
-    asserter_decode = decode_asserter_overlay("temp_qr.png", header, header_end_tile)
-    if asserter_decode:
-        asserter = asserter_decode["sections"].get("ASSERTER")
+    ticket = None
+
+    if wanted_sections:
+        # Step 2: Extract header (always depth=1)
+        with stage("decode.header") as fields:
+            header, header_end_tile, positions = located or locate_header(pixels, module_sizes, public_url, indexed)
+            fields["tiles"] = header_end_tile
+            fields["scale"] = pixels.scale
+        if pixels.scale > 1:
+            # Palette indices cannot be area-reduced; sample the RGB levels
+            indexed = None
+        debug(f"[DEBUG] Header: {header}")
+        debug(f"[DEBUG] header_end_tile={header_end_tile}")
+
+        # Step 3: Sample only the sections this role can read
+        sections = decode_hidden_sections(
+            pixels,
+            header,
+            header_end_tile,
+            [name for name in wanted_sections if name != "ASSERTER"],
+            positions=positions,
+            indexed=indexed,
+        )
+        vip = sections.get("VIP")
+        staff = sections.get("STAFF")
+        ticket = sections.get("TICKET")
+        if "ASSERTER" in wanted_sections:
+            asserter_decode = decode_asserter_overlay(
+                pixels, header, header_end_tile, positions=positions, indexed=indexed
+            )
+            if asserter_decode:
+                asserter = asserter_decode["sections"].get("ASSERTER")
+            else:
+                asserter = decode_hidden_sections(
+                    pixels, header, header_end_tile, ["ASSERTER"], positions=positions, indexed=indexed
+                ).get("ASSERTER")
 
     decrypted_vip = None
     decrypted_staff = None
     decrypted_asserter = None
 
+    with stage("decode.decrypt", role=role):
+        check_deadline("decode.decrypt")
+        if role in ("vip", "admin") and vip is not None:
+            vip_priv = load_key("keys/vip_private.pem", is_private=True)
+            if vip_priv:
+                decrypted_vip = {
+                    "vip_lounge_location": safe_decrypt_rsa(vip_priv, vip.vip_lounge_location),
+                    "vip_contact": safe_decrypt_rsa(vip_priv, vip.vip_contact),
+                    "exclusive_sessions": [safe_decrypt_rsa(vip_priv, s) for s in vip.exclusive_sessions],
+                }
+
+        if role in ("staff", "admin") and staff is not None:
+            staff_priv = load_key("keys/staff_private.pem", is_private=True)
+            if staff_priv:
+                decrypted_staff = {
+                    "internal_briefing": safe_decrypt_rsa(staff_priv, staff.internal_briefing),
+                    "security_codes": [safe_decrypt_rsa(staff_priv, s) for s in staff.security_codes],
+                    "requires_background_check": staff.requires_background_check
+                }
+
+        if role == "asserter" and asserter is not None:
+            asserter_priv = load_key("keys/asserter_private.pem", is_private=True)
+            if asserter_priv:
+                decrypted_asserter = {
+                    "asserter_app_version": safe_decrypt_rsa(asserter_priv, asserter.asserter_app_version),
+                    "geolocation": safe_decrypt_rsa(asserter_priv, asserter.geolocation),
+                    "assertion_valid_until": safe_decrypt_rsa(asserter_priv, asserter.assertion_valid_until),
+                }
+
+    return decrypted_vip, decrypted_staff, decrypted_asserter, ticket
+
+
+def decode_pixels(
+    role: str,
+    pixels,
+    public_url: str | None = None,
+    module_sizes=None,
+    located: tuple | None = None,
+    indexed: tuple | None = None,
+    deadline: Deadline | None = None,
+) -> dict:
+    """
+    Role-based decode of an RGB array (or ImagePyramid) laid out on the
+    module grid, at the issued resolution or a whole multiple of it.
+    `public_url` skips the public-layer scan when the caller already read it;
+    `module_sizes` narrows the header search when the grid pitch is known;
+    `located` is a `locate_header` result the caller already has;
+    `indexed` is (palette indices, lit table) for a palette PNG, sampled instead of RGB.
+    `deadline` bounds the hidden layer: once it runs out (or is cancelled)
+    the public result is returned with "status": "partial".
+    """
     role = role.lower()
-    has_hidden = False
-    if role in ("vip", "admin") and vip is not None:
-        vip_priv = load_key("keys/vip_private.pem", is_private=True)
-        if vip_priv:
-            decrypted_vip = {
-                "vip_lounge_location": safe_decrypt_rsa(vip_priv, vip.vip_lounge_location),
-                "vip_contact": safe_decrypt_rsa(vip_priv, vip.vip_contact),
-                "exclusive_sessions": [safe_decrypt_rsa(vip_priv, s) for s in vip.exclusive_sessions],
-            }
-            has_hidden = True
-
-    if role in ("staff", "admin") and staff is not None:
-        staff_priv = load_key("keys/staff_private.pem", is_private=True)
-        if staff_priv:
-            decrypted_staff = {
-                "internal_briefing": safe_decrypt_rsa(staff_priv, staff.internal_briefing),
-                "security_codes": [safe_decrypt_rsa(staff_priv, s) for s in staff.security_codes],
-                "requires_background_check": staff.requires_background_check
-            }
-            has_hidden = True
-
-    if role == "asserter" and asserter is not None:
-        asserter_priv = load_key("keys/asserter_private.pem", is_private=True)
-        if asserter_priv:
-            decrypted_asserter = {
-                "asserter_app_version": safe_decrypt_rsa(asserter_priv, asserter.asserter_app_version),
-                "geolocation": safe_decrypt_rsa(asserter_priv, asserter.geolocation),
-                "assertion_valid_until": safe_decrypt_rsa(asserter_priv, asserter.assertion_valid_until),
-            }
-            has_hidden = True
+    # Each hidden layer is sampled at the coarsest level of the image that resolves it
+    if not isinstance(pixels, ImagePyramid):
+        pixels = ImagePyramid(pixels)
+
+    # Step 1: Read the visible QR first; its payload also yields the tile index
+    if public_url is None:
+        public_url = decode_public_url(pixels, module_sizes)
+
+    # Steps 2-4: header, hidden sections and decryption, within the deadline
+    try:
+        with deadline_active(deadline):
+            decrypted_vip, decrypted_staff, decrypted_asserter, ticket = _decode_hidden_layer(
+                role, pixels, public_url, module_sizes, located, indexed
+            )
+    except DeadlineExceeded as exc:
+        debug(f"[DEBUG] {exc}")
+        return {
+            "general": parse_public_payload(public_url),
+            "status": "partial",
+            "reason": "cancelled" if exc.cancelled else "deadline",
+            "stage": exc.stage,
+        }
 
     def has_content(payload: dict) -> bool:
         if not payload:
@@ -645,30 +1312,13 @@ def decode_with_role(role: str, img_bytes: bytes):
     elif role == "admin":
         has_hidden = any([decrypted_vip, decrypted_staff])
 
-    print("🔓 Decrypted VIP Data:\n", decrypted_vip)
-    print("🔓 Decrypted STAFF Data:\n", decrypted_staff)
-
-    # Step 5: Decode public visible QR content
-    general_data = {}
-    bw_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, bw_thresh = cv2.threshold(bw_img, 128, 255, cv2.THRESH_BINARY)
-    qr_result = qr_decode(bw_thresh)
-    print(f"QR result: {qr_result}")
-
-    if qr_result:
-        public_url = qr_result[0].data.decode()
-        match = re.search(r'data=([^&]+)', public_url)
-        if match:
-            encoded_segment = match.group(1)
-            try:
-                decoded_json = base64.b64decode(urllib.parse.unquote(encoded_segment)).decode("utf-8")
-                general_data = json.loads(decoded_json)
-            except Exception as e:
-                general_data = {"error": f"Failed to decode public payload: {str(e)}"}
-        else:
-            general_data = {"warning": "No 'data=' segment found in the URL."}
-    else:
-        general_data = {"error": "Could not detect a QR code for the public payload."}
+    debug("🔓 Decrypted VIP Data:\n", decrypted_vip)
+    debug("🔓 Decrypted STAFF Data:\n", decrypted_staff)
+
+    # Step 5: Parse public visible QR content
+    general_data = parse_public_payload(public_url)
+    # Per-ticket identity is plaintext; older tickets have no TICKET section
+    ticket_data = {"serial": ticket.serial, "holder_sha256": ticket.holder_sha256} if ticket is not None else None
 
     # Step 6: Role-based response
     if role == "general":
@@ -680,7 +1330,11 @@ def decode_with_role(role: str, img_bytes: bytes):
     elif role == "staff":
         if not has_hidden:
             return {"general": general_data, "notice": "No additional information found for this ticket."}
-        return {"general": general_data, "staff": decrypted_staff or {}}
+        return {
+            "general": general_data,
+            "staff": decrypted_staff or {},
+            **({"ticket": ticket_data} if ticket_data else {}),
+        }
     elif role == "asserter":
         if not has_hidden:
             return {"general": general_data, "notice": "No additional information found for this ticket."}
@@ -692,6 +1346,7 @@ def decode_with_role(role: str, img_bytes: bytes):
             "general": general_data,
             **({"vip": decrypted_vip} if decrypted_vip else {}),
             **({"staff": decrypted_staff} if decrypted_staff else {}),
+            **({"ticket": ticket_data} if ticket_data else {}),
         }
     else:
         return {"error": f"Unknown role '{role}'"}
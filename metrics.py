@@ -0,0 +1,120 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from config import DEBUG_OUTPUT
+
+# Stage fields that add up across records (depth, role, section are labels)
+COUNTED_FIELDS = ("bytes", "bits", "tiles", "pixels", "sections")
+
+
+class NullSink:
+    """
+    Default sink: drops every record.
+    """
+
+    def record(self, stage: str, duration_s: float, fields: dict) -> None:
+        pass
+
+
+class MemorySink:
+    """
+    Keeps every record in memory; `summary()` aggregates them per stage.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, duration_s: float, fields: dict) -> None:
+        with self._lock:
+            self.records.append({"stage": stage, "duration_ms": duration_s * 1000, **fields})
+
+    def summary(self) -> dict:
+        """
+        {stage: {count, total_ms, max_ms, <COUNTED_FIELDS totals>}} in first-seen order.
+        """
+        stages = {}
+        with self._lock:
+            records = list(self.records)
+        for entry in records:
+            agg = stages.setdefault(entry["stage"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            agg["count"] += 1
+            agg["total_ms"] += entry["duration_ms"]
+            agg["max_ms"] = max(agg["max_ms"], entry["duration_ms"])
+            for key in COUNTED_FIELDS:
+                if key in entry:
+                    agg[key] = agg.get(key, 0) + entry[key]
+        for agg in stages.values():
+            agg["total_ms"] = round(agg["total_ms"], 3)
+            agg["max_ms"] = round(agg["max_ms"], 3)
+        return stages
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+
+class PrintSink:
+    """
+    One line per stage on stdout, for ad-hoc profiling from a shell.
+    """
+
+    def record(self, stage: str, duration_s: float, fields: dict) -> None:
+        extras = " ".join(f"{key}={value}" for key, value in fields.items())
+        print(f"[METRIC] {stage:<24} {duration_s * 1000:9.2f} ms {extras}")
+
+
+_SINK = NullSink()
+
+
+def get_sink():
+    return _SINK
+
+
+def set_sink(sink):
+    """
+    Installs `sink` process-wide (None restores the silent default) and returns the previous one.
+    """
+    global _SINK
+    previous = _SINK
+    _SINK = sink if sink is not None else NullSink()
+    return previous
+
+
+@contextmanager
+def stage(name: str, **fields):
+    """
+    Times the block and reports it to the active sink. Yields the fields dict
+    so the block can add counts it only knows at the end (bytes, tiles).
+    """
+    sink = _SINK
+    if isinstance(sink, NullSink):
+        yield fields
+        return
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        sink.record(name, time.perf_counter() - started, fields)
+
+
+@contextmanager
+def collect():
+    """
+    Records into a fresh MemorySink for the duration of the block.
+    """
+    sink = MemorySink()
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_sink(previous)
+
+
+def debug(*args, **kwargs) -> None:
+    """
+    Debug print, only emitted when QR_PROTO_DEBUG is set.
+    """
+    if DEBUG_OUTPUT:
+        print(*args, **kwargs)
@@ -0,0 +1,218 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import PNG_COMPRESS_LEVEL, PNG_COMPRESS_WORKERS, PNG_FILTER, PNG_ZLIB_STRATEGY
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IDAT_CHUNK_BYTES = 1 << 16  # Compressed bytes buffered before an IDAT chunk is emitted
+COLOR_TYPE_RGB = 2
+COLOR_TYPE_PALETTE = 3
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2}  # "adaptive" picks one of these per scanline
+ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+}
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _deflate_block(data: bytes, level: int, strategy: int) -> bytes:
+    # Raw deflate ending on a byte boundary, so independently compressed blocks concatenate
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 8, strategy)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class StreamingPNGWriter:
+    """
+    Writes an 8-bit RGB or indexed-palette PNG one band of rows at a time.
+    Rows are filtered and deflated as they arrive, so memory stays at one
+    band plus the compressor window no matter how large the image is.
+
+    With `palette` ((n, 3) RGB, n <= 256) bands are (h, width) palette
+    indices; otherwise (h, width, 3) RGB. `workers` > 1 deflates bands on a
+    thread pool, each band as its own block (slightly larger output).
+    `dpi` records the print resolution (pHYs chunk).
+    """
+
+    def __init__(
+        self,
+        target,
+        width: int,
+        height: int,
+        compress_level: int = PNG_COMPRESS_LEVEL,
+        strategy: str = PNG_ZLIB_STRATEGY,
+        png_filter: str = PNG_FILTER,
+        palette=None,
+        workers: int = PNG_COMPRESS_WORKERS,
+        dpi: int | None = None,
+    ):
+        if strategy not in ZLIB_STRATEGIES:
+            raise ValueError(f"Unknown zlib strategy '{strategy}'")
+        if png_filter != "adaptive" and png_filter not in PNG_FILTERS:
+            raise ValueError(f"Unknown PNG filter '{png_filter}'")
+        self.channels = 1 if palette is not None else 3
+        if palette is not None and not 0 < len(palette) <= 256:
+            raise ValueError("A PNG palette holds 1 to 256 colours.")
+        self._own_file = isinstance(target, (str, os.PathLike))
+        self._file = open(target, "wb") if self._own_file else target
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.compress_level = compress_level
+        self._strategy = ZLIB_STRATEGIES[strategy]
+        self._filter = PNG_FILTERS.get(png_filter)
+        self._previous_row = np.zeros(width * self.channels, dtype=np.uint8)  # Row above the first scanline is zeros
+        self._pending = []
+        self._pending_bytes = 0
+        self._closed = False
+        self._workers = workers
+        if workers > 1:
+            # zlib releases the GIL, so threads compress bands in parallel
+            self._pool = ThreadPoolExecutor(max_workers=workers)
+            self._jobs = []
+            self._adler = zlib.adler32(b"")
+            self._compressor = None
+        else:
+            self._pool = None
+            self._compressor = zlib.compressobj(compress_level, zlib.DEFLATED, zlib.MAX_WBITS, 8, self._strategy)
+
+        self._write(PNG_SIGNATURE)
+        color_type = COLOR_TYPE_PALETTE if palette is not None else COLOR_TYPE_RGB
+        self._write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+        if palette is not None:
+            self._write(png_chunk(b"PLTE", np.asarray(palette, dtype=np.uint8)[:, :3].tobytes()))
+        if dpi:
+            pixels_per_metre = round(dpi / 0.0254)
+            self._write(png_chunk(b"pHYs", struct.pack(">IIB", pixels_per_metre, pixels_per_metre, 1)))
+        if self._pool is not None:
+            self._emit(b"\x78\x9c")  # zlib header; the blocks below are raw deflate
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _emit(self, compressed: bytes, flush: bool = False) -> None:
+        if compressed:
+            self._pending.append(compressed)
+            self._pending_bytes += len(compressed)
+        if self._pending_bytes >= IDAT_CHUNK_BYTES or (flush and self._pending_bytes):
+            self._write(png_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def _filtered(self, rows: np.ndarray, png_filter: int) -> np.ndarray:
+        if png_filter == PNG_FILTERS["up"]:
+            above = np.concatenate([self._previous_row[None, :], rows[:-1]])
+            return rows - above
+        if png_filter == PNG_FILTERS["sub"]:
+            left = np.zeros_like(rows)
+            left[:, self.channels:] = rows[:, :-self.channels]
+            return rows - left
+        return rows
+
+    def _filter_rows(self, rows: np.ndarray) -> bytes:
+        height = rows.shape[0]
+        scanlines = np.empty((height, 1 + rows.shape[1]), dtype=np.uint8)
+        if self._filter is None:
+            # Per scanline, the filter with the smallest sum of signed bytes (the libpng heuristic)
+            candidates = np.stack([self._filtered(rows, f) for f in PNG_FILTERS.values()])
+            cost = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+            choice = cost.argmin(axis=0)
+            scanlines[:, 0] = np.array(list(PNG_FILTERS.values()), dtype=np.uint8)[choice]
+            scanlines[:, 1:] = candidates[choice, np.arange(height)]
+        else:
+            scanlines[:, 0] = self._filter
+            scanlines[:, 1:] = self._filtered(rows, self._filter)
+        self._previous_row = rows[-1].copy()
+        return scanlines.tobytes()
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """
+        Appends a band below the rows already written: (h, width) indices for
+        palette images, (h, width, 3) uint8 otherwise.
+        """
+        height, width = rows.shape[:2]
+        if width != self.width or self.rows_written + height > self.height:
+            raise ValueError("Band does not fit the declared image size.")
+        data = self._filter_rows(np.ascontiguousarray(rows, dtype=np.uint8).reshape(height, width * self.channels))
+        self.rows_written += height
+        if self._pool is None:
+            self._emit(self._compressor.compress(data))
+            return
+        self._adler = zlib.adler32(data, self._adler)
+        self._jobs.append(self._pool.submit(_deflate_block, data, self.compress_level, self._strategy))
+        # Write finished blocks in order; keep at most a few bands in flight per worker
+        while self._jobs and (self._jobs[0].done() or len(self._jobs) > 2 * self._workers):
+            self._emit(self._jobs.pop(0).result())
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        if self.rows_written != self.height:
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows.")
+        self._closed = True
+        if self._pool is None:
+            self._emit(self._compressor.flush(), flush=True)
+        else:
+            for job in self._jobs:
+                self._emit(job.result())
+            self._pool.shutdown()
+            final_block = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15).flush(zlib.Z_FINISH)
+            self._emit(final_block + struct.pack(">I", self._adler & 0xFFFFFFFF), flush=True)
+        self._write(png_chunk(b"IEND", b""))
+        if self._own_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        if self._own_file:
+            self._file.close()
+
+
+def palette_indices(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray | None:
+    """
+    Maps an RGB image onto `palette`; None if any pixel is not a palette colour.
+    """
+    keys = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+    palette = np.asarray(palette, dtype=np.uint32)
+    palette_keys = (palette[:, 0] << 16) | (palette[:, 1] << 8) | palette[:, 2]
+    order = np.argsort(palette_keys)
+    slots = np.searchsorted(palette_keys[order], keys).clip(0, len(palette) - 1)
+    if not np.array_equal(palette_keys[order][slots], keys):
+        return None
+    return order[slots].astype(np.uint8)
+
+
+def write_png(target, pixels: np.ndarray, palette=None, band_rows: int = 256, **options) -> int:
+    """
+    Writes a whole RGB image, as an indexed PNG when every pixel is in
+    `palette`; (h, w) `pixels` are taken as indices into `palette` already.
+    Returns the number of bytes written.
+    """
+    if palette is not None and pixels.ndim == 3:
+        indices = palette_indices(pixels, palette)
+        if indices is not None:
+            pixels = indices
+        else:
+            palette = None
+    height, width = pixels.shape[:2]
+    with StreamingPNGWriter(target, width, height, palette=palette, **options) as writer:
+        for row in range(0, height, band_rows):
+            writer.write_rows(pixels[row:row + band_rows])
+    return writer.bytes_written
@@ -0,0 +1,232 @@
+import contextlib
+import math
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from band_renderer import WHITE_INDEX, render_index_bands, ticket_palette
+from config import (
+    PNG_COMPRESS_LEVEL,
+    SHEET_COLUMNS,
+    SHEET_DPI,
+    SHEET_GAP_PX,
+    SHEET_MARGIN_PX,
+    SHEET_MIN_MODULE_MM,
+    SHEET_RENDER_WORKERS,
+)
+from png_writer import StreamingPNGWriter
+from tile_index import tile_index_for_payload
+
+TIFF_FORMATS = (".tif", ".tiff")  # Multi-page TIFF is written by PIL from pages held in memory
+WRITE_ROWS = 256  # Sheet pixel rows handed to the PNG writer per call
+
+
+class StreamingPDFWriter:
+    """
+    Minimal multi-page PDF, one full-page indexed image per page. Page images
+    are deflated as their bands arrive, so only one band is ever in memory.
+    """
+
+    def __init__(self, target: str, palette: np.ndarray, dpi: int = SHEET_DPI):
+        self._file = open(target, "wb")
+        self._palette = np.asarray(palette, dtype=np.uint8)[:, :3]
+        self._dpi = dpi
+        self._offsets = {}
+        self._pages = []
+        self._next_id = 3  # 1 is the catalog, 2 the page tree
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _allocate(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+    def _object(self, object_id: int, body: bytes) -> None:
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def add_page(self, width: int, height: int, bands) -> None:
+        """
+        Appends a page from (h, width) palette-index bands, top to bottom.
+        """
+        image_id, length_id, content_id, page_id = (self._allocate() for _ in range(4))
+        colour_space = b"[/Indexed /DeviceRGB %d <%s>]" % (len(self._palette) - 1, self._palette.tobytes().hex().encode())
+        self._offsets[image_id] = self._file.tell()
+        self._file.write(
+            b"%d 0 obj\n<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+            b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d 0 R >>\nstream\n"
+            % (image_id, width, height, colour_space, length_id)
+        )
+        compressor = zlib.compressobj(PNG_COMPRESS_LEVEL)
+        length = 0
+        for band in bands:
+            data = compressor.compress(np.ascontiguousarray(band, dtype=np.uint8).tobytes())
+            self._file.write(data)
+            length += len(data)
+        data = compressor.flush()
+        self._file.write(data + b"\nendstream\nendobj\n")
+        length += len(data)
+        self._object(length_id, b"%d" % length)
+
+        # PDF units are 1/72 inch
+        page_w = width * 72 / self._dpi
+        page_h = height * 72 / self._dpi
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (page_w, page_h)
+        self._object(content_id, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        self._object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /XObject << /Im0 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (page_w, page_h, image_id, content_id),
+        )
+        self._pages.append(page_id)
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self._pages)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self._file.tell()
+        self._file.write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next_id)
+        for object_id in range(1, self._next_id):
+            self._file.write(b"%010d 00000 n \n" % self._offsets[object_id])
+        self._file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self._next_id, xref_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+def ticket_grid(ticket: dict) -> np.ndarray:
+    """
+    Dark-module grid of an issued ticket. Tickets of the same event share a
+    public payload, so they hit the same cached matrix.
+    """
+    grid, _ = tile_index_for_payload(ticket["public_payload"], ticket["qr_version"])
+    return grid
+
+
+def ticket_side(ticket: dict) -> int:
+    return ticket_grid(ticket).shape[0] * ticket["module_size"]
+
+
+def print_scale(ticket: dict, min_module_mm: float, dpi: int) -> int:
+    """
+    Whole pixels per issued pixel that print the ticket's modules at least
+    `min_module_mm` wide at `dpi`.
+    """
+    return max(1, math.ceil(min_module_mm * dpi / 25.4 / ticket["module_size"]))
+
+
+def render_ticket(ticket: dict, scale: int, palette: np.ndarray) -> np.ndarray:
+    """
+    (side * scale, side * scale) palette indices of one ticket, rendered from
+    its overlay layers at `scale` times its module size.
+    """
+    bands = render_index_bands(ticket_grid(ticket), ticket["layers"], ticket["module_size"] * scale, palette)
+    return np.concatenate(list(bands))
+
+
+def _page_bands(rows, cell: int, gap_px: int, margin_px: int, width: int, height: int, render):
+    """
+    Yields one page top to bottom: margin, then each row of tickets (rendered
+    on the pool while the row above is written) with gaps between, then
+    white down to `height` so short last pages keep the page size.
+    """
+    yield np.full((margin_px, width), WHITE_INDEX, dtype=np.uint8)
+    used = margin_px
+    pending = [render(ticket) for ticket in rows[0]]
+    for row_index in range(len(rows)):
+        if row_index:
+            yield np.full((gap_px, width), WHITE_INDEX, dtype=np.uint8)
+            used += gap_px
+        images = [future.result() for future in pending]
+        pending = [render(ticket) for ticket in rows[row_index + 1]] if row_index + 1 < len(rows) else []
+        band = np.full((cell, width), WHITE_INDEX, dtype=np.uint8)
+        for column, image in enumerate(images):
+            side = image.shape[0]
+            x = margin_px + column * (cell + gap_px) + (cell - side) // 2
+            y = (cell - side) // 2
+            band[y:y + side, x:x + side] = image
+        yield band
+        used += cell
+    yield np.full((height - used, width), WHITE_INDEX, dtype=np.uint8)
+
+
+def render_sheet(
+    tickets: list[dict],
+    target: str,
+    columns: int = SHEET_COLUMNS,
+    rows_per_page: int | None = None,
+    gap_px: int = SHEET_GAP_PX,
+    margin_px: int = SHEET_MARGIN_PX,
+    dpi: int = SHEET_DPI,
+    workers: int = SHEET_RENDER_WORKERS,
+    min_module_mm: float = SHEET_MIN_MODULE_MM,
+) -> list[str]:
+    """
+    Lays issuance results (`encode_from_dict(..., return_metadata=True)`)
+    out on print pages, rendered straight from their overlay layers: no
+    ticket PNG is decoded or re-encoded. Every ticket is scaled by a whole
+    number of pixels per module so its modules print at least
+    `min_module_mm` wide at `dpi`, and gets a cell the size of the largest
+    scaled ticket, filled by raising the scale further (camera decode
+    rectifies back to the header's module size).
+
+    A `.png` target is streamed row by row, one file per page (`_p<n>`
+    suffix when there are several); `.pdf` streams every page into one
+    file; `.tif`/`.tiff` writes one multi-page file, with the pages held in
+    memory until it is saved. Returns the written paths.
+    """
+    if not tickets:
+        raise ValueError("No tickets to lay out.")
+    if any("layers" not in ticket for ticket in tickets):
+        raise ValueError("Tickets need the overlay layers from encode_from_dict(..., return_metadata=True).")
+    extension = os.path.splitext(target)[1].lower()
+    if extension not in (".png", ".pdf") + TIFF_FORMATS:
+        raise ValueError(f"Unsupported sheet format '{extension}'")
+
+    cell = max(ticket_side(ticket) * print_scale(ticket, min_module_mm, dpi) for ticket in tickets)
+    rows_per_page = rows_per_page or math.ceil(len(tickets) / columns)
+    width = 2 * margin_px + columns * cell + (columns - 1) * gap_px
+    height = 2 * margin_px + rows_per_page * cell + (rows_per_page - 1) * gap_px
+    palette = ticket_palette(color for ticket in tickets for _, _, color in ticket["layers"])
+
+    per_page = columns * rows_per_page
+    pages = [tickets[i:i + per_page] for i in range(0, len(tickets), per_page)]
+    written = []
+    images = []
+    pdf_writer = StreamingPDFWriter(target, palette, dpi) if extension == ".pdf" else contextlib.nullcontext()
+    with pdf_writer as pdf, ThreadPoolExecutor(max_workers=workers) as pool:
+        def render(ticket):
+            return pool.submit(render_ticket, ticket, cell // ticket_side(ticket), palette)
+
+        for page_number, page in enumerate(pages, start=1):
+            rows = [page[i:i + columns] for i in range(0, len(page), columns)]
+            bands = _page_bands(rows, cell, gap_px, margin_px, width, height, render)
+            if pdf is not None:
+                pdf.add_page(width, height, bands)
+            elif extension in TIFF_FORMATS:
+                image = Image.fromarray(np.concatenate(list(bands)))
+                image.putpalette(palette.tobytes())
+                images.append(image)
+            else:
+                path = target if len(pages) == 1 else f"{os.path.splitext(target)[0]}_p{page_number}.png"
+                with StreamingPNGWriter(path, width, height, palette=palette, dpi=dpi) as writer:
+                    for band in bands:
+                        for row in range(0, band.shape[0], WRITE_ROWS):
+                            writer.write_rows(band[row:row + WRITE_ROWS])
+                written.append(path)
+
+    if pdf is not None:
+        written.append(target)
+    if images:
+        images[0].save(target, save_all=True, append_images=images[1:], dpi=(dpi, dpi), compression="tiff_adobe_deflate")
+        written.append(target)
+    return written
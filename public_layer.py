@@ -0,0 +1,170 @@
+import base64
+import json
+import re
+import urllib.parse
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode as qr_decode
+
+from config import PUBLIC_QR_MODULE_PX, QR_BORDER
+from metrics import debug, stage
+from reccursive_decoder import ImagePyramid, load_palette_png, palette_lit_table
+
+
+def load_ticket_pixels(img_bytes: bytes) -> tuple:
+    """
+    (RGB array, indexed) for ticket image bytes, sampled in memory. Issued
+    palette PNGs keep their index plane, returned as indexed = (palette
+    indices, lit table) so tiles are sampled by index; otherwise None.
+    """
+    with stage("decode.image_load", bytes=len(img_bytes)):
+        palette_image = load_palette_png(img_bytes)
+        if palette_image is not None:
+            return palette_ticket_pixels(*palette_image)
+        img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image bytes.")
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB), None
+
+
+def palette_ticket_pixels(indices: np.ndarray, palette: np.ndarray) -> tuple:
+    """
+    `load_ticket_pixels` result for a palette ticket's index plane and palette.
+    """
+    return np.take(palette, indices, axis=0), (indices, palette_lit_table(palette))
+
+
+def load_public_gray(img_bytes: bytes) -> np.ndarray:
+    """
+    Overlay-suppressed grayscale of ticket image bytes, all the visible QR
+    needs. Palette tickets are mapped index by index, never expanded to RGB.
+    """
+    with stage("decode.image_load", bytes=len(img_bytes)):
+        palette_image = load_palette_png(img_bytes)
+        if palette_image is not None:
+            indices, palette = palette_image
+            return palette.min(axis=1)[indices]
+        img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image bytes.")
+        return suppress_overlay_colors(img)  # Channel order does not matter for the minimum
+
+
+def suppress_overlay_colors(rgb: np.ndarray) -> np.ndarray:
+    """
+    Grayscale where red/purple/blue overlay pixels read as dark, like the black
+    module they sit on. White stays white because all three channels are high.
+    Grayscale input is returned unchanged.
+    """
+    if rgb.ndim == 2:
+        return rgb
+    return np.minimum(np.minimum(rgb[..., 0], rgb[..., 1]), rgb[..., 2])
+
+
+def qr_detectors():
+    """
+    (name, detector) for the OpenCV QR readers, most capable first: the
+    ArUco-based one finds ticket finder patterns the classic one misses.
+    """
+    if hasattr(cv2, "QRCodeDetectorAruco"):
+        yield "cv2-aruco", cv2.QRCodeDetectorAruco()
+    yield "cv2", cv2.QRCodeDetector()
+
+
+def qr_module_sizes(image_side: int, min_size: int = 1) -> list[int]:
+    """
+    Module pitches (at least `min_size`) that split an image `image_side` px
+    wide into a whole QR version 1-40 plus quiet zone, largest first.
+    """
+    sizes = []
+    for version in range(1, 41):
+        modules = 4 * version + 17 + 2 * QR_BORDER
+        if image_side % modules == 0 and image_side // modules >= min_size:
+            sizes.append(image_side // modules)
+    return sizes
+
+
+def reduce_to_pitch(pyramid: ImagePyramid, module_size: int) -> np.ndarray:
+    """
+    The image area-reduced from `module_size` to PUBLIC_QR_MODULE_PX px per module.
+    """
+    factor, remainder = divmod(module_size, PUBLIC_QR_MODULE_PX)
+    if not remainder:
+        return pyramid.level(factor)
+    full = pyramid.level(1)
+    size = (full.shape[1] // module_size * PUBLIC_QR_MODULE_PX, full.shape[0] // module_size * PUBLIC_QR_MODULE_PX)
+    return cv2.resize(full, size, interpolation=cv2.INTER_AREA)
+
+
+def read_qr(gray: np.ndarray) -> tuple[str | None, str | None]:
+    """
+    Thresholds one grayscale image and reads it with pyzbar, then the
+    OpenCV detectors. Returns (data, reader name), or (None, None).
+    """
+    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
+    qr_result = qr_decode(binary)
+    debug(f"QR result: {qr_result}")
+    if qr_result:
+        return qr_result[0].data.decode(), "pyzbar"
+    for name, detector in qr_detectors():
+        try:
+            data = detector.detectAndDecode(binary)[0]
+        except cv2.error:
+            continue
+        if data:
+            return data, name
+    return None, None
+
+
+def read_public_qr(pixels, module_sizes=None) -> tuple[str | None, str | None]:
+    """
+    Reads the visible QR of an RGB or grayscale array (or ImagePyramid).
+    The image is first area-reduced to PUBLIC_QR_MODULE_PX px per module for
+    each pitch its width allows (or `module_sizes`), then read at full
+    resolution as a last resort; overlay colours are suppressed before
+    thresholding. Returns (url, path), path naming the reader and image
+    that succeeded, e.g. "pyzbar:reduced" or "cv2-aruco:full"; (None, None)
+    if nothing reads.
+    """
+    pyramid = pixels if isinstance(pixels, ImagePyramid) else ImagePyramid(pixels)
+    full = pyramid.level(1)
+    if module_sizes is None:
+        module_sizes = qr_module_sizes(full.shape[1])
+    views = [("reduced", size) for size in module_sizes if size > PUBLIC_QR_MODULE_PX] + [("full", None)]
+    for view, module_size in views:
+        image = full if module_size is None else reduce_to_pitch(pyramid, module_size)
+        data, reader = read_qr(suppress_overlay_colors(image))
+        if data is not None:
+            return data, f"{reader}:{view}"
+    return None, None
+
+
+def decode_public_url(pixels, module_sizes=None) -> str | None:
+    full = pixels.level(1) if isinstance(pixels, ImagePyramid) else pixels
+    with stage("decode.public", pixels=full.shape[0] * full.shape[1]) as fields:
+        public_url, fields["path"] = read_public_qr(pixels, module_sizes)
+    return public_url
+
+
+def parse_public_payload(public_url: str | None) -> dict:
+    if public_url is None:
+        return {"error": "Could not detect a QR code for the public payload."}
+    match = re.search(r'data=([^&]+)', public_url)
+    if not match:
+        return {"warning": "No 'data=' segment found in the URL."}
+    encoded_segment = match.group(1)
+    try:
+        decoded_json = base64.b64decode(urllib.parse.unquote(encoded_segment)).decode("utf-8")
+        return json.loads(decoded_json)
+    except Exception as e:
+        return {"error": f"Failed to decode public payload: {str(e)}"}
+
+
+def decode_general(img_bytes: bytes) -> dict:
+    """
+    `decode_with_role("general", img_bytes)` without importing the hidden-layer
+    stack (protobuf, cryptography, QR regeneration): for processes that only
+    ever read the visible QR.
+    """
+    return {"general": parse_public_payload(decode_public_url(load_public_gray(img_bytes)))}
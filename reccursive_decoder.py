@@ -1,6 +1,16 @@
+import io
+from functools import lru_cache
 from PIL import Image
 import numpy as np
 
+from metrics import debug
+
+BIT_POSITIONS = [
+    (0, 0), (1, 0), (2, 0),
+    (0, 1),         (2, 1),
+    (0, 2), (1, 2), (2, 2)
+]
+
 # def extract_tiles_from_image(image_path: str, module_size: int = 27):
 #     """
 #     Extracts a grid of RGBA tiles from a QR code image with overlaid recursive T-square tiles.
@@ -76,9 +86,9 @@ def extract_byte_from_recursive_tile(tile, depth=1):
             sub_region = region[y0:y0 + region_size, x0:x0 + region_size, :]
 
             if current_depth == 1:
-                # Sample center of subregion
-                inner_third = region_size // 3
-                inner_x = inner_y = inner_third
+                # Sample center of subregion (the centre pixel of leaves under 3 px)
+                inner_third = max(1, region_size // 3)
+                inner_x = inner_y = (region_size - inner_third) // 2
                 center_region = sub_region[inner_y:inner_y + inner_third, inner_x:inner_x + inner_third, :]
                 avg_intensity = np.mean(center_region[:, :, :3])  # RGB only
                 bits.append(1 if avg_intensity > 50 else 0)
@@ -92,61 +102,274 @@ def extract_byte_from_recursive_tile(tile, depth=1):
         byte_stream = (byte_stream << 1) | bit
     total_bits = 8 ** depth
     return byte_stream.to_bytes(total_bits // 8, byteorder='big')
+
+
+def sampling_scale(module_size: int, depth: int) -> int:
+    """
+    Factor an image can be area-reduced by before its depth-`depth` tiles are
+    sampled: when the sample windows tile the module, each becomes one pixel
+    (its mean) at `module_size // factor`. 1 when they do not.
+    """
+    leaf_region = module_size // 3 ** depth
+    if module_size % 3 ** depth or leaf_region % 3:
+        return 1
+    return leaf_region // 3
+
+
+class ImagePyramid:
+    """
+    Area-averaged reductions of one RGB image, built on demand: `level(k)`
+    has one pixel per k x k block. `scale` is how many times larger than
+    issued the image is, set once the header has been read; module sizes
+    passed alongside a pyramid are at that scale.
+    """
+
+    def __init__(self, pixels: np.ndarray):
+        self._levels = {1: pixels}
+        self.scale = 1
+
+    @property
+    def shape(self) -> tuple:
+        return self._levels[1].shape
+
+    def level(self, factor: int) -> np.ndarray:
+        reduced = self._levels.get(factor)
+        if reduced is None:
+            import cv2
+
+            # Reduce from the nearest level already built
+            source = max(k for k in self._levels if factor % k == 0)
+            step = factor // source
+            pixels = self._levels[source]
+            height, width = pixels.shape[0] // step, pixels.shape[1] // step
+            reduced = cv2.resize(
+                pixels[:height * step, :width * step], (width, height), interpolation=cv2.INTER_AREA
+            )
+            self._levels[factor] = reduced
+        return reduced
+
+    def for_depth(self, module_size: int, depth: int) -> tuple[np.ndarray, int]:
+        """
+        (coarsest level that still resolves depth-`depth` leaves, module size on it).
+        Chosen on the full-resolution pitch, so leaves issued under 3 px but
+        captured `scale` times larger are sampled at their centre third.
+        """
+        module_size *= self.scale
+        factor = sampling_scale(module_size, depth)
+        return self.level(factor), module_size // factor
+
+
+def load_image_array(image) -> np.ndarray:
+    """
+    Returns an RGB uint8 array for a path, PIL image or array input.
+    Arrays are assumed to already be RGB and are returned unchanged, as
+    are ImagePyramids (the tile readers sample them level by level).
+    """
+    if isinstance(image, (np.ndarray, ImagePyramid)):
+        return image
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    return np.asarray(image.convert("RGB"))
+
+
+def find_black_tile_positions(pixels: np.ndarray, module_size: int, threshold: int = 80) -> np.ndarray:
+    """
+    Vectorized equivalent of `is_black_tile` over the whole module grid.
+    Returns an (N, 2) int32 array of (row, col) module coordinates in scan order.
+    An ImagePyramid is thresholded on its one-pixel-per-module level.
+    """
+    if isinstance(pixels, ImagePyramid):
+        module_means = pixels.level(pixels.scale * module_size)[..., :3].astype(np.float64)
+        return np.argwhere(module_means @ np.array([0.299, 0.587, 0.114]) < threshold).astype(np.int32)
+    grid_h = pixels.shape[0] // module_size
+    grid_w = pixels.shape[1] // module_size
+    blocks = pixels[:grid_h * module_size, :grid_w * module_size, :3].reshape(
+        grid_h, module_size, grid_w, module_size, 3
+    )
+    channel_sums = blocks.sum(axis=(1, 3), dtype=np.uint64).astype(np.float64)
+    # Same luma weights PIL uses for convert("L").
+    luma = channel_sums @ np.array([0.299, 0.587, 0.114])
+    dark = luma < threshold * module_size * module_size
+    return np.argwhere(dark).astype(np.int32)
+
+
+def find_black_tile_positions_indexed(indices: np.ndarray, lit_table: np.ndarray, module_size: int) -> np.ndarray:
+    """
+    `find_black_tile_positions` for a lossless palette ticket, from one pixel
+    per module: a T-square tile never paints its centre ninth, so a module is
+    dark exactly when its centre pixel is an unlit (black) index.
+    """
+    grid_h = indices.shape[0] // module_size
+    grid_w = indices.shape[1] // module_size
+    centre = module_size // 2
+    centres = indices[centre:grid_h * module_size:module_size, centre:grid_w * module_size:module_size]
+    return np.argwhere(lit_table[centres] == 0).astype(np.int32)
+
+
+@lru_cache(maxsize=None)
+def build_sampling_plan(module_size: int, depth: int) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Precomputes the leaf sample windows `extract_byte_from_recursive_tile` reads.
+    Returns (y_offsets, x_offsets, inner) with offsets in bit order, relative to the
+    tile origin, and `inner` the side length of each sampled window.
+    Leaves under 3 px (minimal-pitch tickets) are sampled at their centre pixel.
+    """
+    leaf_region = module_size // (3 ** depth)
+    if leaf_region < 1:
+        raise ValueError(f"module_size={module_size} is too small to sample depth={depth}")
+    inner = max(1, leaf_region // 3)
+    offset = (leaf_region - inner) // 2
+
+    ys, xs = [], []
+
+    def walk(y, x, size, current_depth):
+        region_size = size // 3
+        for col, row in BIT_POSITIONS:
+            y0 = y + row * region_size
+            x0 = x + col * region_size
+            if current_depth == 1:
+                ys.append(y0 + offset)
+                xs.append(x0 + offset)
+            else:
+                walk(y0, x0, region_size, current_depth - 1)
+
+    walk(0, 0, module_size, depth)
+    y_offsets = np.array(ys, dtype=np.int32)
+    x_offsets = np.array(xs, dtype=np.int32)
+    y_offsets.setflags(write=False)
+    x_offsets.setflags(write=False)
+    return y_offsets, x_offsets, inner
+
+
+def sample_tile_bits(pixels: np.ndarray, positions: np.ndarray, module_size: int, depth: int) -> np.ndarray:
+    """
+    Samples every leaf of every tile in `positions` at once.
+    Returns a (tiles, 8 ** depth) uint8 array of bits in the encoder's bit order.
+    """
+    bits_per_tile = 8 ** depth
+    if len(positions) == 0:
+        return np.zeros((0, bits_per_tile), dtype=np.uint8)
+    y_offsets, x_offsets, inner = build_sampling_plan(module_size, depth)
+    window = np.arange(inner, dtype=np.int32)
+    ys = positions[:, 0, None] * module_size + y_offsets[None, :]
+    xs = positions[:, 1, None] * module_size + x_offsets[None, :]
+    samples = pixels[
+        ys[:, :, None, None] + window[None, None, :, None],
+        xs[:, :, None, None] + window[None, None, None, :],
+        :3,
+    ]
+    sums = samples.sum(axis=(2, 3, 4), dtype=np.uint32)
+    return (sums > 50 * inner * inner * 3).astype(np.uint8)
+
+
+def load_palette_png(img_bytes: bytes) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    (palette indices, (n, 3) RGB palette) for an indexed-colour PNG, else None.
+    """
+    if img_bytes[:8] != b"\x89PNG\r\n\x1a\n" or len(img_bytes) < 26 or img_bytes[25] != 3:
+        return None
+    image = Image.open(io.BytesIO(img_bytes))
+    if image.mode != "P":
+        return None
+    indices = np.asarray(image)
+    palette = np.array(image.getpalette()[:3 * (int(indices.max()) + 1)], dtype=np.uint8).reshape(-1, 3)
+    return indices, palette
+
+
+def palette_lit_table(palette: np.ndarray) -> np.ndarray:
+    """
+    Per palette index, 1 where `sample_tile_bits` would read a leaf of that colour as set.
+    """
+    return (palette[:, :3].astype(np.uint16).sum(axis=1) > 150).astype(np.uint8)
+
+
+def sample_tile_bits_indexed(
+    indices: np.ndarray,
+    lit_table: np.ndarray,
+    positions: np.ndarray,
+    module_size: int,
+    depth: int,
+) -> np.ndarray:
+    """
+    `sample_tile_bits` for a lossless palette image: one index per leaf,
+    looked up in `lit_table`, instead of averaging RGB windows.
+    """
+    bits_per_tile = 8 ** depth
+    if len(positions) == 0:
+        return np.zeros((0, bits_per_tile), dtype=np.uint8)
+    y_offsets, x_offsets, inner = build_sampling_plan(module_size, depth)
+    ys = positions[:, 0, None] * module_size + (y_offsets + inner // 2)[None, :]
+    xs = positions[:, 1, None] * module_size + (x_offsets + inner // 2)[None, :]
+    return lit_table[indices[ys, xs]]
+
+
+def read_tile_bytes(
+    pixels: np.ndarray,
+    positions: np.ndarray,
+    module_size: int,
+    depth: int,
+    tile_start: int = 0,
+    tile_count: int | None = None,
+    indexed: tuple | None = None,
+) -> bytes:
+    """
+    Reads `tile_count` tiles starting at `tile_start` of an existing position index.
+    `indexed` is (palette indices, lit table) of the same image, sampled instead of `pixels`.
+    An ImagePyramid is sampled at the coarsest level that resolves `depth`.
+    """
+    if tile_start >= len(positions):
+        raise ValueError(f"tile_start={tile_start} exceeds available black tiles={len(positions)}")
+    stop = len(positions) if tile_count is None else tile_start + tile_count
+    if indexed is not None:
+        bits = sample_tile_bits_indexed(*indexed, positions[tile_start:stop], module_size, depth)
+    else:
+        if isinstance(pixels, ImagePyramid):
+            pixels, module_size = pixels.for_depth(module_size, depth)
+        bits = sample_tile_bits(pixels, positions[tile_start:stop], module_size, depth)
+    return np.packbits(bits, axis=None).tobytes()
+
+
 def extract_bitstream_from_recursive_qr(
     image_path,
     module_size=27,
     depth=1,
     tile_start=0,
-    bit_limit=None
+    bit_limit=None,
+    positions=None,
 ):
     """
     Extracts a raw bitstream from the QR image using T-square fractal decoding.
     Caller must specify depth, tile_start, and optional bit_limit in bits.
 
     Parameters:
-    - image_path: Path to QR image file.
+    - image_path: Path to QR image file, PIL image, RGB array or ImagePyramid.
     - module_size: Pixel size of each tile (default 27).
     - depth: Fractal depth used for each tile (default 1).
     - tile_start: Tile index to start from (default 0).
     - bit_limit: Optional cap on number of bits to return.
+    - positions: Optional black-tile index from `find_black_tile_positions`.
 
     Returns:
     - bitstream: String of 0s and 1s
     """
-    tiles = extract_tiles_from_image(image_path, module_size=module_size)
-
-    black_tiles = []
-    for row in tiles:
-        for tile in row:
-            if is_black_tile(tile):
-                black_tiles.append(tile)
-
-    if tile_start >= len(black_tiles):
-        raise ValueError(f"tile_start={tile_start} exceeds available black tiles={len(black_tiles)}")
-
-    usable_tiles = black_tiles[tile_start:]
+    pixels = load_image_array(image_path)
+    if positions is None:
+        positions = find_black_tile_positions(pixels, module_size)
 
     bits_per_tile = 8 * (8 ** (depth - 1))  # Each tile gives this many bits
-    tiles_to_extract = len(usable_tiles)
+    tiles_to_extract = max(0, len(positions) - tile_start)
 
     if bit_limit:
         max_tiles = (bit_limit + bits_per_tile - 1) // bits_per_tile
         tiles_to_extract = min(tiles_to_extract, max_tiles)
 
-    bit_chunks = []
-    for tile in usable_tiles[:tiles_to_extract]:
-        byte_data = extract_byte_from_recursive_tile(tile, depth=depth)
-        if isinstance(byte_data, bytes):
-            byte_data = int.from_bytes(byte_data, byteorder='big')
-        bin_str = format(byte_data, f'0{bits_per_tile}b')
-        bit_chunks.append(bin_str)
-
-    bitstream = ''.join(bit_chunks)
+    data = read_tile_bytes(pixels, positions, module_size, depth, tile_start, tiles_to_extract)
+    bitstream = ''.join(f'{byte:08b}' for byte in data)
     if bit_limit:
         bitstream = bitstream[:bit_limit]
 
-    print(f"[DECODE] depth={depth}, tile_start={tile_start}, bits_per_tile={bits_per_tile}")
-    print(f"[DECODE] Extracted {tiles_to_extract} tiles → {len(bitstream)} bits")
+    debug(f"[DECODE] depth={depth}, tile_start={tile_start}, bits_per_tile={bits_per_tile}")
+    debug(f"[DECODE] Extracted {tiles_to_extract} tiles → {len(bitstream)} bits")
     return bitstream
 
 
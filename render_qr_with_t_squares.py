@@ -104,6 +104,7 @@ def generate_recursive_t_square_tile_from_bytes(byte_values: list[int], size: in
 
 from typing import Tuple
 from PIL import Image
+from tile_index import matrix_tile_positions
 
 def render_qr_with_t_squares_partial(
     matrix, bitstream: str, module_size: int = 10, depth: int = 1,
@@ -121,27 +122,14 @@ def render_qr_with_t_squares_partial(
         for i in range(0, len(bitstream), bits_per_tile)
     ]
 
-    tile_idx = 0
-    written = 0
-    for y in range(qr_size):
-        for x in range(qr_size):
-            if not matrix[y][x]:
-                continue
-            if tile_idx < start_tile:
-                tile_idx += 1
-                continue
-            if written >= len(bit_chunks):
-                return img, tile_idx
-
-            top_left = (x * module_size, y * module_size)
-            base_tile = Image.new("RGB", (module_size, module_size), "black")
-            chunk_bits = bit_chunks[written]
-            byte_values = [int(chunk_bits[i:i + 8], 2) for i in range(0, len(chunk_bits), 8)]
-            overlay = generate_recursive_t_square_tile_from_bytes(byte_values, module_size, depth=depth, color=color)
-            base_tile.paste(overlay, (0, 0), overlay)
-            img.paste(base_tile, top_left)
-
-            written += 1
-            tile_idx += 1
-
-    return img, tile_idx
+    # Tiles are filled in scan order of the dark modules
+    positions = matrix_tile_positions(matrix)[start_tile:start_tile + len(bit_chunks)]
+    for (y, x), chunk_bits in zip(positions, bit_chunks):
+        top_left = (int(x) * module_size, int(y) * module_size)
+        base_tile = Image.new("RGB", (module_size, module_size), "black")
+        byte_values = [int(chunk_bits[i:i + 8], 2) for i in range(0, len(chunk_bits), 8)]
+        overlay = generate_recursive_t_square_tile_from_bytes(byte_values, module_size, depth=depth, color=color)
+        base_tile.paste(overlay, (0, 0), overlay)
+        img.paste(base_tile, top_left)
+
+    return img, start_tile + len(positions)
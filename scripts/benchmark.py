@@ -0,0 +1,240 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from c2pa_integration import get_verifier, is_c2pa_available, sign_png_with_c2pa
+from c2pa_integration.manifest_builder import build_manifest_payload, compute_commitments
+from config import ROLE_SECTIONS
+from main import compute_module_size, decode_with_role, encode_from_dict
+
+DEFAULT_DEPTHS = (1, 2, 3)
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 1.20  # p50 slower than baseline by more than this ratio fails the comparison
+CERT_PATH = "c2pa_integration/trust_store/issuer_cert.pem"
+KEY_PATH = "c2pa_integration/trust_store/issuer_private_key.pem"
+TRUST_STORE_DIR = "c2pa_integration/trust_store"
+
+# Payload sizes scale the RSA-encrypted fields, which dominate the hidden layer
+PAYLOAD_ITEMS = {"small": 1, "medium": 3, "large": 8}
+
+
+def make_event(size: str) -> dict:
+    items = PAYLOAD_ITEMS[size]
+    return {
+        "event_id": f"BENCH-{size.upper()}",
+        "name": "Benchmark Expo",
+        "location": "Convention Center, San Francisco",
+        "start_time": "2025-09-12T09:00:00Z",
+        "end_time": "2025-09-12T18:00:00Z",
+        "public_data": {
+            "agenda_summary": "Talks on AI, IoT, and Sustainable Tech",
+            "dress_code": "Smart Casual",
+            "general_guidelines": ["Carry a valid photo ID"],
+        },
+        "vip_data": {
+            "vip_lounge_location": "2nd Floor, Sapphire Lounge",
+            "vip_contact": "vip@futuretech.com",
+            "exclusive_sessions": [f"Session {i}" for i in range(items)],
+        },
+        "staff_data": {
+            "internal_briefing": "Ensure secure entry checkpoints are staffed by 08:30AM.",
+            "security_codes": [f"SEC-{i:04d}" for i in range(items)],
+            "requires_background_check": True,
+        },
+    }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile; with few repeats p99 is effectively the max.
+    """
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_alloc_mb(fn) -> float:
+    """
+    Peak memory allocated during one call of `fn` (Python objects and NumPy
+    buffers), measured with tracemalloc on an untimed run so the tracing
+    overhead stays out of the timings.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 1)
+
+
+def measure(name: str, fn, repeat: int, warmup: int = 1, **params) -> dict:
+    """
+    Times `fn` `repeat` times after `warmup` untimed calls, then makes one more
+    call to measure this case's peak allocation. The decoder's debug prints are
+    swallowed so they are not part of the measurement.
+    """
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        peak_mb = peak_alloc_mb(fn)
+    mean = sum(samples) / len(samples)
+    result = {
+        "name": name,
+        **params,
+        "n": len(samples),
+        "mean_ms": round(mean, 2),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "min_ms": round(min(samples), 2),
+        "throughput_per_s": round(1000 / mean, 2) if mean else None,
+        "peak_alloc_mb": peak_mb,
+    }
+    print(f"{name:<40} p50 {result['p50_ms']:>9.2f} ms   p99 {result['p99_ms']:>9.2f} ms   peak {result['peak_alloc_mb']} MB")
+    return result
+
+
+def run_suite(depths, sizes, roles, repeat: int, c2pa: bool, workdir: str) -> list[dict]:
+    results = []
+    for depth in depths:
+        module_size = compute_module_size(depth)
+        for size in sizes:
+            event = make_event(size)
+            path = os.path.join(workdir, f"bench_d{depth}_{size}.png")
+            tag = f"d{depth}/ms{module_size}/{size}"
+            params = {"depth": depth, "module_size": module_size, "payload": size}
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                meta = encode_from_dict(event, path, dimension=depth, return_metadata=True)
+            results.append(measure(
+                f"encode/{tag}",
+                lambda: encode_from_dict(event, path, dimension=depth),
+                repeat,
+                **params,
+            ))
+            with open(path, "rb") as f:
+                png_bytes = f.read()
+            params["image_bytes"] = len(png_bytes)
+
+            for role in roles:
+                results.append(measure(
+                    f"decode/{role}/{tag}",
+                    lambda role=role: decode_with_role(role, png_bytes),
+                    repeat,
+                    role=role,
+                    **params,
+                ))
+
+            if not c2pa:
+                continue
+            manifest = build_manifest_payload(
+                issuer_name="Benchmark Issuer",
+                intent="event_access_admit",
+                event_id=event["event_id"],
+                ticket_id="BENCH",
+                valid_from=event["start_time"],
+                valid_to=event["end_time"],
+                commitments=compute_commitments(png_bytes, meta["public_payload"], meta["secret_bytes"]),
+            )
+            sign = lambda: sign_png_with_c2pa(
+                input_png_bytes=png_bytes,
+                manifest_payload=manifest,
+                cert_path=CERT_PATH,
+                key_path=KEY_PATH,
+            )
+            results.append(measure(f"sign/{tag}", sign, repeat, **params))
+            signed_bytes = sign()
+            verifier = get_verifier(TRUST_STORE_DIR)
+            results.append(measure(f"verify/{tag}", lambda: verifier.verify(signed_bytes), repeat, **params))
+    return results
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    """
+    Matches results to the baseline by name and reports the p50 ratio for each.
+    """
+    previous = {entry["name"]: entry for entry in baseline.get("results", [])}
+    rows = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if not old or not old.get("p50_ms"):
+            continue
+        ratio = entry["p50_ms"] / old["p50_ms"]
+        rows.append({
+            "name": entry["name"],
+            "baseline_p50_ms": old["p50_ms"],
+            "p50_ms": entry["p50_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > threshold,
+        })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark encode, decode, sign and verify across depths and payload sizes.")
+    parser.add_argument("--depths", type=int, nargs="+", default=list(DEFAULT_DEPTHS), help="Fractal depths to run")
+    parser.add_argument("--sizes", nargs="+", default=list(PAYLOAD_ITEMS), choices=list(PAYLOAD_ITEMS), help="Payload sizes")
+    parser.add_argument("--roles", nargs="+", default=list(ROLE_SECTIONS), help="Decode roles")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per benchmark")
+    parser.add_argument("--no-c2pa", action="store_true", help="Skip the C2PA sign/verify benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="p50 ratio over baseline that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    c2pa = not args.no_c2pa and is_c2pa_available() and os.path.exists(CERT_PATH) and os.path.exists(KEY_PATH)
+    if not args.no_c2pa and not c2pa:
+        print("⚠️ c2pa-python or the issuer cert/key is missing; skipping sign/verify.")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_suite(args.depths, args.sizes, args.roles, args.repeat, c2pa, workdir)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "c2pa": c2pa,
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            rows = compare(results, json.load(f), args.threshold)
+        report["comparison"] = rows
+        print("\nAgainst baseline:")
+        for row in rows:
+            flag = "  ❌ regression" if row["regression"] else ""
+            print(f"{row['name']:<40} {row['baseline_p50_ms']:>9.2f} → {row['p50_ms']:>9.2f} ms  x{row['ratio']}{flag}")
+        if any(row["regression"] for row in rows):
+            exit_code = 1
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
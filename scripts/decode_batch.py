@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import sys
+
+from batch_decoder import EXECUTORS, decode_many
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def image_paths(inputs: list[str]) -> list[str]:
+    """
+    Files as given; folders expanded to their images, sorted by name.
+    """
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            paths.extend(
+                os.path.join(entry, name)
+                for name in sorted(os.listdir(entry))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            paths.append(entry)
+    return paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Decode folders of ticket images, one JSON line per image in input order.")
+    parser.add_argument("inputs", nargs="+", help="Ticket images and/or folders of them")
+    parser.add_argument("--role", default="admin", help="Decode role (general, vip, staff, asserter, admin)")
+    parser.add_argument("--workers", type=int, default=None, help="Decode workers (default: CPU count)")
+    parser.add_argument("--executor", choices=EXECUTORS, default="thread", help="Decode in threads or in processes")
+    parser.add_argument("--output", default=None, help="JSON lines file (default: stdout)")
+    args = parser.parse_args()
+
+    paths = image_paths(args.inputs)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        for path, result in zip(paths, decode_many(paths, args.role, args.workers, args.executor)):
+            failed += "error" in result
+            out.write(json.dumps({"image": path, **result}, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Decoded {len(paths) - failed}/{len(paths)} images", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,29 @@
+import argparse
+import json
+
+from gate_client import GateClient
+from gate_protocol import DEFAULT_SOCKET_PATH
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Decode or verify tickets through a running gate service's Unix socket.")
+    parser.add_argument("images", nargs="+", help="Ticket image(s)")
+    parser.add_argument("--role", default="general", help="Decode role (general, vip, staff, asserter, admin)")
+    parser.add_argument("--verify", action="store_true", help="Verify the C2PA manifest instead of decoding")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Gate service socket path")
+    args = parser.parse_args()
+
+    exit_code = 0
+    with GateClient(args.socket) as client:
+        for path in args.images:
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+            status, result = client.verify(image_bytes) if args.verify else client.decode(image_bytes, args.role)
+            print(json.dumps({"image": path, "status": status, **result}, ensure_ascii=False))
+            if status != 200:
+                exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPEAT = 5
+
+# Entry point -> (interpreter arguments, budget in ms of import time, interpreter startup excluded).
+# CLI scripts are timed through `--help`, which exits right after their imports.
+IMPORT_BUDGETS = {
+    "general-decode": (["-c", "from public_layer import decode_general"], 140),
+    "sign": (["-c", "from c2pa_integration import sign_png_with_c2pa"], 85),
+    "verify": (["-c", "from c2pa_integration import verify_png_with_c2pa"], 40),
+    "main": (["-c", "import main"], 180),
+    "gate-service": (["-c", "import gate_service"], 90),
+    "scripts/overlay_only.py": (["scripts/overlay_only.py", "--help"], 180),
+    "scripts/issue_sheet.py": (["scripts/issue_sheet.py", "--help"], 180),
+    "scripts/scan_stream.py": (["scripts/scan_stream.py", "--help"], 190),
+    "scripts/run_gate_service.py": (["scripts/run_gate_service.py", "--help"], 100),
+    "scripts/gate_scan.py": (["scripts/gate_scan.py", "--help"], 40),
+    "scripts/decode_batch.py": (["scripts/decode_batch.py", "--help"], 180),
+}
+
+
+def import_time_ms(args: list[str]) -> float:
+    """
+    Total module import time of one fresh interpreter, from `-X importtime`.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us = line.split("|")[0].split(":")[1].strip()
+        if self_us.isdigit():
+            total_us += int(self_us)
+    return total_us / 1000
+
+
+def median_import_ms(args: list[str], repeat: int) -> float:
+    import_time_ms(args)  # Warm-up: writes __pycache__ and fills the OS file cache
+    return statistics.median(import_time_ms(args) for _ in range(repeat))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the entry points against their budgets.")
+    parser.add_argument("--only", nargs="+", default=list(IMPORT_BUDGETS), choices=list(IMPORT_BUDGETS), help="Entry points to time")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Fresh interpreters per entry point")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slower machines)")
+    args = parser.parse_args()
+
+    startup_ms = median_import_ms(["-c", "pass"], args.repeat)
+    over = []
+    for name in args.only:
+        entry_args, budget_ms = IMPORT_BUDGETS[name]
+        budget_ms *= args.scale
+        elapsed_ms = max(0.0, median_import_ms(entry_args, args.repeat) - startup_ms)
+        flag = ""
+        if elapsed_ms > budget_ms:
+            flag = "  ❌ over budget"
+            over.append(name)
+        print(f"{name:<30} {elapsed_ms:>8.1f} ms  (budget {budget_ms:.0f} ms){flag}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
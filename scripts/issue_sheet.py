@@ -0,0 +1,57 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+from config import SHEET_COLUMNS, SHEET_DPI, SHEET_GAP_PX, SHEET_MARGIN_PX, SHEET_MIN_MODULE_MM
+from main import issue_batch
+from print_sheet import render_sheet
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Issue tickets for an event and lay them out on print sheets.")
+    parser.add_argument("event", help="Event JSON (same shape as data/event.json)")
+    parser.add_argument("--copies", type=int, default=8, help="Tickets to issue")
+    parser.add_argument("--depth", type=int, default=1, help="Fractal depth")
+    parser.add_argument("--serial-prefix", default="", help="Prefix of the per-ticket serials")
+    parser.add_argument("--serial-digits", type=int, default=4, help="Zero-padded width of the serial number")
+    parser.add_argument("--columns", type=int, default=SHEET_COLUMNS, help="Tickets per sheet row")
+    parser.add_argument("--rows-per-page", type=int, default=None, help="Sheet rows per page (default: one page)")
+    parser.add_argument("--gap", type=int, default=SHEET_GAP_PX, help="Pixels between tickets")
+    parser.add_argument("--margin", type=int, default=SHEET_MARGIN_PX, help="Page margin in pixels")
+    parser.add_argument("--dpi", type=int, default=SHEET_DPI, help="Print resolution recorded in the output")
+    parser.add_argument(
+        "--min-module-mm",
+        type=float,
+        default=SHEET_MIN_MODULE_MM,
+        help="Smallest printed module size in millimetres",
+    )
+    parser.add_argument("--output", default="sheet.pdf", help="Sheet file (.png, .pdf, .tif or .tiff)")
+    args = parser.parse_args()
+
+    with open(args.event, "r", encoding="utf-8") as f:
+        event = json.load(f)
+
+    serials = [{"serial": f"{args.serial_prefix}{number:0{args.serial_digits}d}"} for number in range(1, args.copies + 1)]
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        tickets = issue_batch(event, serials, os.path.join(workdir, "ticket_{serial}.png"), dimension=args.depth)
+
+    paths = render_sheet(
+        tickets,
+        args.output,
+        columns=args.columns,
+        rows_per_page=args.rows_per_page,
+        gap_px=args.gap,
+        margin_px=args.margin,
+        dpi=args.dpi,
+        min_module_mm=args.min_module_mm,
+    )
+    for path in paths:
+        print(f"✅ Sheet written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
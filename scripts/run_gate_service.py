@@ -0,0 +1,45 @@
+import argparse
+
+from gate_protocol import DEFAULT_SOCKET_PATH
+from gate_service import DEFAULT_DEADLINE_S, DEFAULT_HOST, DEFAULT_PORT, QUEUE_PER_WORKER, run
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the localhost decode/verify service for gate devices.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Bind address (keep it on localhost)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Listen port")
+    parser.add_argument(
+        "--unix-socket",
+        nargs="?",
+        const=DEFAULT_SOCKET_PATH,
+        default=None,
+        help=f"Also listen on a Unix socket (binary protocol for gate_client; default path {DEFAULT_SOCKET_PATH})",
+    )
+    parser.add_argument("--no-http", action="store_true", help="Serve the Unix socket only")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--trust-store", default="c2pa_integration/trust_store", help="C2PA trust store directory")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE_S, help="Per-request deadline in seconds")
+    parser.add_argument(
+        "--queue-per-worker",
+        type=int,
+        default=QUEUE_PER_WORKER,
+        help="Requests admitted per worker before replying 503",
+    )
+    args = parser.parse_args()
+    if args.no_http and args.unix_socket is None:
+        parser.error("--no-http needs --unix-socket")
+
+    run(
+        host=args.host,
+        port=None if args.no_http else args.port,
+        unix_socket=args.unix_socket,
+        workers=args.workers,
+        trust_store_dir=args.trust_store,
+        deadline_s=args.deadline,
+        queue_per_worker=args.queue_per_worker,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
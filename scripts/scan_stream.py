@@ -0,0 +1,42 @@
+import argparse
+import json
+
+from stream_scanner import DUPLICATE_THRESHOLD, MIN_SHARPNESS, scan_stream
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scan a camera or video stream until a ticket decodes.")
+    parser.add_argument("source", help="Camera index (e.g. 0) or video file / stream URL")
+    parser.add_argument("--role", default="general", help="Decode role (general, vip, staff, asserter, admin)")
+    parser.add_argument("--vote", action="store_true", help="Majority-vote leaves across recent frames")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--timeout", type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument("--min-sharpness", type=float, default=MIN_SHARPNESS, help="Laplacian variance floor")
+    parser.add_argument(
+        "--duplicate-threshold",
+        type=float,
+        default=DUPLICATE_THRESHOLD,
+        help="Mean thumbnail difference below which frames are skipped",
+    )
+    args = parser.parse_args()
+
+    outcome = scan_stream(
+        args.source,
+        role=args.role,
+        vote=args.vote,
+        min_sharpness=args.min_sharpness,
+        duplicate_threshold=args.duplicate_threshold,
+        max_frames=args.max_frames,
+        timeout_s=args.timeout,
+    )
+    stats = outcome["stats"]
+    print(json.dumps(outcome, indent=2, default=str))
+    print(
+        f"frames={stats['frames_read']} fps={stats['fps']:.1f} "
+        f"decodes={stats['decode_attempts']} time_to_decode={outcome['time_to_decode_s']}"
+    )
+    return 0 if outcome["confident"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from camera_decoder import PROBE_MODULE_SIZE, rectify_capture
+from config import OPTIONAL_SECTIONS, ROLE_SECTIONS
+from main import decode_pixels
+
+THUMBNAIL_SIZE = 32  # Gray thumbnail edge used for duplicate detection
+DUPLICATE_THRESHOLD = 2.0  # Mean absolute thumbnail difference (0-255) below which frames are duplicates
+SHARPNESS_WIDTH = 640  # Frames are downscaled to this width before the duplicate and blur checks
+MIN_SHARPNESS = 60.0  # Laplacian variance below which a frame is too blurry to decode
+VOTE_FRAMES = 3  # Rectified frames combined by majority vote
+
+
+def gate_view(frame_bgr: np.ndarray) -> np.ndarray:
+    """
+    Small grayscale copy of a frame for the per-frame gates, so their cost
+    does not grow with camera resolution.
+    """
+    if frame_bgr.shape[1] > SHARPNESS_WIDTH:
+        height = int(frame_bgr.shape[0] * SHARPNESS_WIDTH / frame_bgr.shape[1])
+        frame_bgr = cv2.resize(frame_bgr, (SHARPNESS_WIDTH, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+
+
+def frame_thumbnail(gray: np.ndarray) -> np.ndarray:
+    return cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def is_near_duplicate(thumbnail: np.ndarray, previous: np.ndarray | None, threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    if previous is None:
+        return False
+    return float(np.mean(np.abs(thumbnail - previous))) < threshold
+
+
+def frame_sharpness(gray: np.ndarray) -> float:
+    """
+    Variance of the Laplacian; low values mean motion blur or defocus.
+    """
+    return float(cv2.Laplacian(gray, cv2.CV_16S).var())
+
+
+def majority_vote(frames) -> np.ndarray:
+    """
+    Per-pixel bitwise majority of three rectified, palette-snapped frames.
+    Palette values nest bitwise (0 within 200 within 255), so this equals the
+    per-channel median, i.e. each leaf takes the color most frames agree on.
+    """
+    a, b, c = frames
+    return cv2.bitwise_or(
+        cv2.bitwise_or(cv2.bitwise_and(a, b), cv2.bitwise_and(a, c)),
+        cv2.bitwise_and(b, c),
+    )
+
+
+def is_confident(role: str, result: dict) -> bool:
+    """
+    A decode is confident once every layer the role asked for came back whole:
+    hidden sections decrypted (OAEP rejects corrupted ciphertext) or, for the
+    general role, the public payload parsed. OPTIONAL_SECTIONS only count
+    when the ticket carries them.
+    """
+    role = role.lower()
+    wanted = [name.lower() for name in ROLE_SECTIONS.get(role, ())]
+    if not wanted:
+        general = result.get("general") or {}
+        return bool(general) and "error" not in general
+    optional = {name.lower() for name in OPTIONAL_SECTIONS}
+    for key in wanted:
+        payload = result.get(key)
+        if not payload:
+            if key in optional and key not in result:
+                continue
+            return False
+        for value in payload.values():
+            if value is None or (isinstance(value, list) and any(item is None for item in value)):
+                return False
+    return True
+
+
+def open_video_source(source):
+    """
+    Opens a camera index ("0", 1, ...) or a video file / stream URL.
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source {source!r}.")
+    return capture
+
+
+class StreamScanner:
+    """
+    Scans a video stream for a ticket. Frames are gated at stream rate
+    (duplicates and blurry frames dropped) while a single worker decodes the
+    sharpest frame seen since it last became free, so slow decodes never
+    stall frame intake.
+    """
+
+    def __init__(
+        self,
+        role: str = "general",
+        min_sharpness: float = MIN_SHARPNESS,
+        duplicate_threshold: float = DUPLICATE_THRESHOLD,
+        vote: bool = False,
+    ):
+        self.role = role.lower()
+        self.min_sharpness = min_sharpness
+        self.duplicate_threshold = duplicate_threshold
+        self.vote = vote
+        self._votes = deque(maxlen=VOTE_FRAMES)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets what earlier frames taught the scanner; the next ticket may be issued at another depth.
+        """
+        # Warp pitch (a whole multiple of the header-declared module size), learned from the first frame whose header reads
+        self.module_size = PROBE_MODULE_SIZE if not ROLE_SECTIONS.get(self.role) else None
+        self._votes.clear()
+        self.last_error = None
+
+    def decode_frame(self, frame_bgr: np.ndarray) -> tuple[dict | None, bool]:
+        """
+        Rectifies and decodes one frame; returns (result, voted).
+        Runs on the worker thread only, so scanner state needs no lock.
+        """
+        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        try:
+            canonical, module_size = rectify_capture(rgb, self.module_size)
+            self.module_size = module_size
+            result = decode_pixels(self.role, canonical, module_sizes=[module_size])
+        except Exception as exc:
+            self.last_error = str(exc)
+            return None, False
+        if is_confident(self.role, result) or not self.vote:
+            return result, False
+
+        if self._votes and self._votes[-1].shape != canonical.shape:
+            self._votes.clear()
+        self._votes.append(canonical)
+        if len(self._votes) < VOTE_FRAMES:
+            return result, False
+        try:
+            voted = decode_pixels(self.role, majority_vote(self._votes), module_sizes=[module_size])
+        except Exception as exc:
+            self.last_error = str(exc)
+            return result, False
+        return voted, True
+
+    def scan(self, source, max_frames: int | None = None, timeout_s: float | None = None) -> dict:
+        """
+        Reads `source` until a confident decode, the end of the stream,
+        `max_frames` or `timeout_s`. Returns the best result plus throughput stats.
+        """
+        self.reset()
+        capture = open_video_source(source)
+        stats = {
+            "frames_read": 0,
+            "skipped_duplicate": 0,
+            "skipped_blurry": 0,
+            "decode_attempts": 0,
+            "decode_seconds": 0.0,
+        }
+        outcome = {"result": None, "confident": False, "voted": False, "frame_index": None, "time_to_decode_s": None}
+        previous = None
+        candidate = None
+        pending = None
+        start = time.perf_counter()
+
+        def collect(future) -> bool:
+            result, voted, frame_index, elapsed = future.result()
+            stats["decode_attempts"] += 1
+            stats["decode_seconds"] += elapsed
+            if result is None:
+                return False
+            confident = is_confident(self.role, result)
+            if confident or outcome["result"] is None:
+                outcome.update(result=result, confident=confident, voted=voted, frame_index=frame_index)
+            if confident:
+                outcome["time_to_decode_s"] = time.perf_counter() - start
+            return confident
+
+        def submit(executor, frame, frame_index):
+            def run():
+                t0 = time.perf_counter()
+                result, voted = self.decode_frame(frame)
+                return result, voted, frame_index, time.perf_counter() - t0
+            return executor.submit(run)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                while max_frames is None or stats["frames_read"] < max_frames:
+                    if timeout_s is not None and time.perf_counter() - start > timeout_s:
+                        break
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    stats["frames_read"] += 1
+
+                    gray = gate_view(frame)
+                    thumbnail = frame_thumbnail(gray)
+                    if is_near_duplicate(thumbnail, previous, self.duplicate_threshold):
+                        stats["skipped_duplicate"] += 1
+                        continue
+                    previous = thumbnail
+                    sharpness = frame_sharpness(gray)
+                    if sharpness < self.min_sharpness:
+                        stats["skipped_blurry"] += 1
+                        continue
+                    if candidate is None or sharpness > candidate[0]:
+                        candidate = (sharpness, frame, stats["frames_read"] - 1)
+
+                    if pending is not None and pending.done():
+                        finished, pending = pending, None
+                        if collect(finished):
+                            break
+                    if pending is None:
+                        pending = submit(executor, candidate[1], candidate[2])
+                        candidate = None
+
+                # Stream ended or limit hit: finish the in-flight decode, then the last candidate
+                if pending is not None and not outcome["confident"]:
+                    if not collect(pending) and candidate is not None:
+                        collect(submit(executor, candidate[1], candidate[2]))
+            finally:
+                capture.release()
+
+        elapsed = time.perf_counter() - start
+        stats["elapsed_s"] = elapsed
+        stats["fps"] = stats["frames_read"] / elapsed if elapsed > 0 else 0.0
+        if self.last_error and not outcome["confident"]:
+            outcome["last_error"] = self.last_error
+        outcome["stats"] = stats
+        return outcome
+
+
+def scan_stream(source, role: str = "general", **kwargs) -> dict:
+    """
+    Convenience wrapper: StreamScanner(role, ...).scan(source, max_frames, timeout_s).
+    """
+    scan_kwargs = {key: kwargs.pop(key) for key in ("max_frames", "timeout_s") if key in kwargs}
+    return StreamScanner(role, **kwargs).scan(source, **scan_kwargs)
@@ -1,6 +1,10 @@
 import zlib
 import json
 
+from deadline import check as check_deadline
+from fec import rs_encode_interleaved
+from metrics import debug
+
 def encode_sections_protobuf(sections: dict, depth: int = 1) -> str:
     full_bytes = b""
 
@@ -32,25 +36,68 @@ def encode_sections_protobuf(sections: dict, depth: int = 1) -> str:
 
 
 
-def decode_sections_protobuf(byte_data: bytes, message_factory: dict) -> dict:
+def encode_section_blob(name: str, proto_obj) -> bytes:
     """
-    Input:
-        - byte_data: compressed byte stream starting with a 2-byte length header
-        - message_factory: {section_name: ProtobufMessageClass}
-    Output:
-        - {section_name: parsed Protobuf object}
+    Compresses a single section on its own so it can be read without the others.
+    Uses the same framing as `encode_sections_protobuf`, without the JSON prefix.
+    """
+    name_bytes = name.encode()
+    content_bytes = proto_obj.SerializeToString()
+    frame = (
+        len(name_bytes).to_bytes(1, "big")
+        + name_bytes
+        + len(content_bytes).to_bytes(2, "big")
+        + content_bytes
+    )
+    return zlib.compress(frame)
+
+
+def encode_section_blobs(sections: dict, rs_parity: int = 0) -> dict:
+    """
+    Compressed (and, with rs_parity > 0, RS-encoded) blob per section.
+    Event-level blobs can be encoded once and laid out on many tickets.
+    """
+    return {
+        name: rs_encode_interleaved(encode_section_blob(name, proto_obj), rs_parity)
+        for name, proto_obj in sections.items()
+    }
+
+
+def layout_section_blobs(
+    blobs: dict,
+    depth: int = 1,
+    key_ids: dict | None = None,
+    rs_parity: int = 0,
+) -> tuple[str, list]:
+    """
+    Lays out `encode_section_blobs` output on whole tiles, in dict order.
+    Returns the secret bitstream and a directory with one
+    [name, key_id, start_tile, tile_count, depth] entry per section.
+    start_tile is relative to the first secret tile. With rs_parity > 0 the
+    entry gains a sixth field with the encoded byte length.
+    """
+    key_ids = key_ids or {}
+    bits_per_tile = 8 ** depth
+    chunks = []
+    directory = []
+    start_tile = 0
+    for name, blob in blobs.items():
+        blob_bits = ''.join(f'{byte:08b}' for byte in blob)
+        tile_count = (len(blob_bits) + bits_per_tile - 1) // bits_per_tile
+        chunks.append(blob_bits.ljust(tile_count * bits_per_tile, "0"))
+        entry = [name, key_ids.get(name, name.lower()), start_tile, tile_count, depth]
+        if rs_parity > 0:
+            entry.append(len(blob))
+        directory.append(entry)
+        start_tile += tile_count
+    return ''.join(chunks), directory
+
+
+def _decompress_sections(byte_data: bytes) -> bytes:
+    """
+    Inflates a section stream, skipping an optional JSON header prefix or
+    resyncing on the first valid zlib header. Raises zlib.error.
     """
-    # try:
-    #     byte_data = bytes(int(bitstream[i:i+8], 2) for i in range(0, len(bitstream), 8))
-    # except ValueError as e:
-    #     print(f"[ERROR] Failed to convert bitstream to bytes: {e}")
-    #     print(f"[DEBUG] Bad segment: {bitstream[i:i+8]}")
-    #     raise
-
-    # print(f"[DEBUG] Bitstream length: {len(bitstream)} bits")
-    # print(f"[DEBUG] First 32 bits: {bitstream[:32]}")
-    # print(f"[DEBUG] Byte dump (first 8 bytes): {[bitstream[i:i+8] for i in range(0, 64, 8)]}")
-
     def try_decompress(data: bytes) -> bytes:
         return zlib.decompress(data)
 
@@ -76,6 +123,7 @@ def decode_sections_protobuf(byte_data: bytes, message_factory: dict) -> dict:
             # Attempt resync by scanning for a valid zlib header.
             candidates = (b"\x78\x01", b"\x78\x9c", b"\x78\xda")
             for i in range(len(byte_data) - 2):
+                check_deadline("decode.decompress")
                 if byte_data[i:i + 2] in candidates:
                     try:
                         decompressed = try_decompress(byte_data[i:])
@@ -84,9 +132,35 @@ def decode_sections_protobuf(byte_data: bytes, message_factory: dict) -> dict:
                         continue
             if decompressed is None:
                 raise
+    return decompressed
+
+
+def decode_sections_protobuf(byte_data: bytes, message_factory: dict) -> dict:
+    """
+    Input:
+        - byte_data: compressed byte stream starting with a 2-byte length header
+        - message_factory: {section_name: ProtobufMessageClass}
+    Output:
+        - {section_name: parsed Protobuf object}
+    """
+    # try:
+    #     byte_data = bytes(int(bitstream[i:i+8], 2) for i in range(0, len(bitstream), 8))
+    # except ValueError as e:
+    #     print(f"[ERROR] Failed to convert bitstream to bytes: {e}")
+    #     print(f"[DEBUG] Bad segment: {bitstream[i:i+8]}")
+    #     raise
 
+    # print(f"[DEBUG] Bitstream length: {len(bitstream)} bits")
+    # print(f"[DEBUG] First 32 bits: {bitstream[:32]}")
+    # print(f"[DEBUG] Byte dump (first 8 bytes): {[bitstream[i:i+8] for i in range(0, 64, 8)]}")
+
+    try:
+        decompressed = _decompress_sections(byte_data)
+    except zlib.error as exc:
+        # Resampled or damaged images land here; callers treat ValueError as a bad ticket
+        raise ValueError(f"Could not decompress hidden sections: {exc}") from exc
 
-    print(f"[DEBUG] Zlib input (first 16 bytes): {byte_data[:16].hex()}")
+    debug(f"[DEBUG] Zlib input (first 16 bytes): {byte_data[:16].hex()}")
 
     idx = 0
     sections = {}
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def event() -> dict:
+    with open(os.path.join(ROOT, "data", "event.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Scratch working directory that still sees the repo's keys, so encoding
+    (which writes event_rsa.bin and temp_qr.png to the cwd) leaves the tree alone.
+    """
+    os.symlink(os.path.join(ROOT, "keys"), tmp_path / "keys")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def issue(workdir, event):
+    """
+    Encodes the sample event and returns the ticket PNG bytes.
+    """
+    from main import encode_from_dict
+
+    def issue(depth: int = 1, **kwargs) -> bytes:
+        path = str(workdir / f"ticket_d{depth}.png")
+        with contextlib.redirect_stdout(io.StringIO()):
+            encode_from_dict(event, path, dimension=depth, **kwargs)
+        with open(path, "rb") as f:
+            return f.read()
+
+    return issue
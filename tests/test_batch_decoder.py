@@ -0,0 +1,30 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from batch_decoder import decode_many
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_results_follow_input_order_and_errors_stay_in_place(issue, workdir, executor):
+    def ticket(depth, serial):
+        return issue(depth=depth, ticket={"serial": serial, "holder": "Ada"})
+
+    first = ticket(1, "S-1")
+    second_path = workdir / "second.png"
+    second_path.write_bytes(ticket(2, "S-2"))
+    third = np.array(Image.open(io.BytesIO(ticket(1, "S-3"))).convert("RGB"))
+    items = [first, b"not an image", str(second_path), third, first]
+
+    results = list(decode_many(items, role="staff", workers=2, executor=executor))
+
+    assert "error" in results[1]
+    serials = [result.get("ticket", {}).get("serial") for result in results]
+    assert serials == ["S-1", None, "S-2", "S-3", "S-1"]
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        list(decode_many([], executor="fiber"))
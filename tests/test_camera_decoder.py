@@ -0,0 +1,47 @@
+import contextlib
+import io
+
+import cv2
+import numpy as np
+
+from camera_decoder import (
+    decode_camera_capture,
+    estimate_symbol_modules,
+    locate_qr_corners,
+    orient_corners,
+    refine_corners,
+)
+from public_layer import suppress_overlay_colors
+
+
+def _decode(role: str, img_bytes: bytes) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return decode_camera_capture(role, img_bytes)
+
+
+def _rgb(img_bytes: bytes) -> np.ndarray:
+    return cv2.cvtColor(cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+
+
+def test_clean_ticket_decodes_through_camera_path(issue, event):
+    result = _decode("vip", issue(depth=1))
+    assert result["vip"] == event["vip_data"]
+
+
+def test_refinement_keeps_exact_corners(issue):
+    rgb = _rgb(issue(depth=1))
+    dark = suppress_overlay_colors(rgb)
+    corners = locate_qr_corners(dark)
+    _, dark_mask = cv2.threshold(dark, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    symbol_modules = estimate_symbol_modules(dark_mask, corners)
+    corners = orient_corners(dark_mask, corners, symbol_modules)
+    np.testing.assert_array_equal(refine_corners(rgb, corners, symbol_modules), corners)
+
+
+def test_upscaled_jpeg_capture_decodes(issue, event):
+    rgb = _rgb(issue(depth=1))
+    big = cv2.resize(rgb, None, fx=3, fy=3, interpolation=cv2.INTER_LINEAR)
+    pad = big.shape[1] // 10
+    framed = cv2.copyMakeBorder(big, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=(240, 240, 240))
+    jpeg = cv2.imencode(".jpg", cv2.cvtColor(framed, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    assert _decode("vip", jpeg)["vip"] == event["vip_data"]
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import fec
+from fec import encoded_length, message_length_for, rs_decode_interleaved, rs_encode_interleaved, usable_parity
+from structured_codec import layout_section_blobs
+
+pytest.importorskip("reedsolo")
+
+PARITY = 16
+
+
+def test_interleaved_codewords_survive_a_damaged_run():
+    message = os.urandom(600)
+    encoded = bytearray(rs_encode_interleaved(message, PARITY))
+    assert len(encoded) == encoded_length(len(message), PARITY)
+    # One damaged tile's worth of consecutive bytes is spread over every codeword
+    encoded[100:121] = bytes(21)
+    assert rs_decode_interleaved(bytes(encoded), PARITY) == message
+
+
+def test_block_beyond_repair_passes_through_uncorrected():
+    message = os.urandom(200)
+    encoded = bytearray(rs_encode_interleaved(message, PARITY))
+    encoded[:PARITY] = bytes(b ^ 0xFF for b in encoded[:PARITY])
+    decoded = rs_decode_interleaved(bytes(encoded), PARITY)
+    assert len(decoded) == len(message)
+    assert decoded[PARITY:] == message[PARITY:]
+
+
+@pytest.mark.parametrize("length", [1, 239, 240, 600, 2000])
+def test_message_length_inverts_encoded_length(length):
+    assert message_length_for(encoded_length(length, PARITY), PARITY) == length
+
+
+def test_directory_records_encoded_length_with_parity():
+    blobs = {"VIP": rs_encode_interleaved(b"v" * 300, PARITY), "STAFF": rs_encode_interleaved(b"s" * 10, PARITY)}
+    bits, directory = layout_section_blobs(blobs, depth=2, key_ids={"VIP": "vip", "STAFF": "staff"}, rs_parity=PARITY)
+    assert directory == [
+        ["VIP", "vip", 0, 42, 2, len(blobs["VIP"])],
+        ["STAFF", "staff", 42, 4, 2, len(blobs["STAFF"])],
+    ]
+    assert len(bits) == 46 * 64  # 332 and 26 encoded bytes on 8-byte tiles
+    _, plain = layout_section_blobs({"VIP": b"v" * 300}, depth=2)
+    assert plain == [["VIP", "vip", 0, 38, 2]]
+
+
+def test_missing_reedsolo_issues_without_parity(monkeypatch, capsys):
+    monkeypatch.setattr(fec, "reedsolo", None)
+    monkeypatch.setattr(fec, "_WARNED_NO_FEC", False)
+    assert usable_parity(PARITY) == 0
+    assert usable_parity(PARITY) == 0
+    assert capsys.readouterr().out.count("reedsolo is not installed") == 1
+    assert rs_encode_interleaved(b"payload", usable_parity(PARITY)) == b"payload"
+
+
+def _blacken_secret_tiles(png: bytes, first: int, count: int) -> bytes:
+    from main import locate_header, secret_tile_start
+
+    pixels = np.array(Image.open(io.BytesIO(png)).convert("RGB"))
+    header, header_end_tile, positions = locate_header(pixels)
+    module_size = header["module_size"]
+    start = secret_tile_start(header, header_end_tile)
+    for row, col in positions[start + first:start + first + count]:
+        pixels[row * module_size:(row + 1) * module_size, col * module_size:(col + 1) * module_size] = 0
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, "PNG")
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("rs_parity", [PARITY, 0])
+def test_ticket_recovers_damaged_tiles_only_with_parity(issue, event, rs_parity):
+    from main import decode_with_role
+
+    damaged = _blacken_secret_tiles(issue(depth=1, rs_parity=rs_parity), 10, 4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if rs_parity:
+            assert decode_with_role("vip", damaged)["vip"] == event["vip_data"]
+        else:
+            with pytest.raises(ValueError):
+                decode_with_role("vip", damaged)
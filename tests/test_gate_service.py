@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+
+from gate_service import GateService, _decode_job
+
+
+async def _exchange(request: bytes) -> tuple[bytes, dict]:
+    service = GateService(workers=1)
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n", 1)[0], json.loads(body)
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length_is_rejected(length):
+    request = f"POST /decode?role=general HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1")
+    status_line, payload = asyncio.run(_exchange(request))
+    assert status_line.startswith(b"HTTP/1.1 400")
+    assert "error" in payload
+
+
+def test_decode_job_writes_nothing_to_stdout(issue, capsys):
+    png = issue(depth=1)
+    capsys.readouterr()
+    result = _decode_job("admin", png)
+    assert result["staff"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def _loaded_after(statement: str, module: str) -> bool:
+    probe = f"import sys; {statement}; print({module!r} in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip() == "True"
+
+
+def test_verify_path_does_not_load_cryptography():
+    assert not _loaded_after("from c2pa_integration import verify_png_with_c2pa, is_c2pa_available", "cryptography")
@@ -0,0 +1,20 @@
+import contextlib
+import io
+
+from main import decode_with_role, issue_batch
+
+
+def test_issue_batch_serials_decode_per_ticket(workdir, event):
+    tickets = [{"serial": "A-0001", "holder": "Ada"}, {"serial": "A-0002", "holder": "Grace"}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        issued = issue_batch(event, tickets, str(workdir / "ticket_{serial}.png"))
+    assert len(issued) == 2
+    holders = set()
+    for ticket in tickets:
+        with open(workdir / f"ticket_{ticket['serial']}.png", "rb") as f:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = decode_with_role("staff", f.read())
+        assert result["ticket"]["serial"] == ticket["serial"]
+        assert result["staff"] == event["staff_data"]
+        holders.add(result["ticket"]["holder_sha256"])
+    assert len(holders) == 2
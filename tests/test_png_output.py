@@ -0,0 +1,65 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from band_renderer import write_ticket_png
+from png_writer import StreamingPNGWriter, write_png
+
+
+def _read(png) -> np.ndarray:
+    return np.array(Image.open(png).convert("RGB"))
+
+
+def _sample_image() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    blocks = rng.integers(0, 4, (12, 15))
+    return np.kron(blocks, np.ones((3, 3), dtype=np.int64)).astype(np.uint8)  # 36 x 45 palette indices
+
+
+PALETTE = np.array([(255, 255, 255), (0, 0, 0), (0, 200, 120), (140, 60, 200)], dtype=np.uint8)
+
+
+@pytest.mark.parametrize("png_filter", ["none", "sub", "up", "adaptive"])
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("indexed", [True, False])
+def test_png_round_trips_for_every_filter(png_filter, workers, indexed):
+    indices = _sample_image()
+    pixels = indices if indexed else PALETTE[indices]
+    out = io.BytesIO()
+    write_png(out, pixels, palette=PALETTE if indexed else None, band_rows=7, png_filter=png_filter, workers=workers)
+    out.seek(0)
+    image = Image.open(out)
+    assert image.mode == ("P" if indexed else "RGB")
+    assert np.array_equal(np.array(image.convert("RGB")), PALETTE[indices])
+
+
+def test_off_palette_pixels_fall_back_to_rgb():
+    pixels = PALETTE[_sample_image()]
+    pixels[0, 0] = (1, 2, 3)
+    out = io.BytesIO()
+    write_png(out, pixels, palette=PALETTE)
+    out.seek(0)
+    assert Image.open(out).mode == "RGB"
+    assert np.array_equal(_read(out), pixels)
+
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError):
+        StreamingPNGWriter(io.BytesIO(), 4, 4, png_filter="paeth")
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_band_renderer_matches_in_memory_render(workdir, event, depth):
+    from main import encode_from_dict
+    from print_sheet import ticket_grid
+
+    path = str(workdir / "in_memory.png")
+    with contextlib.redirect_stdout(io.StringIO()):
+        ticket = encode_from_dict(event, path, dimension=depth, stream=False, return_metadata=True)
+    streamed = io.BytesIO()
+    write_ticket_png(streamed, ticket_grid(ticket), ticket["layers"], ticket["module_size"], band_rows=7)
+    streamed.seek(0)
+    assert np.array_equal(_read(streamed), _read(path))
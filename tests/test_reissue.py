@@ -0,0 +1,29 @@
+import contextlib
+import copy
+import io
+
+from main import decode_with_role, reissue_sections
+
+
+def _reissue(path, section_data):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return reissue_sections(str(path), section_data)
+
+
+def test_reissue_repaints_only_the_edited_section(issue, workdir, event):
+    path = workdir / "ticket.png"
+    path.write_bytes(issue(depth=2))
+
+    unchanged = _reissue(path, {"staff_data": event["staff_data"], "vip_data": event["vip_data"]})
+    assert unchanged["repainted_tiles"] == {"header": 0, "STAFF": 0, "VIP": 0}
+
+    staff = copy.deepcopy(event["staff_data"])
+    staff["internal_briefing"] = "Checkpoints open at 07:45."
+    edited = _reissue(path, {"staff_data": staff, "vip_data": event["vip_data"]})
+    assert edited["repainted_tiles"]["STAFF"] > 0
+    assert edited["repainted_tiles"]["VIP"] == 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = decode_with_role("admin", path.read_bytes())
+    assert result["staff"] == staff
+    assert result["vip"] == event["vip_data"]
@@ -0,0 +1,51 @@
+import contextlib
+import io
+
+import pytest
+
+from main import decode_with_role
+from stream_scanner import is_confident
+
+
+def _decode(role: str, img_bytes: bytes) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return decode_with_role(role, img_bytes)
+
+
+@pytest.mark.parametrize("role", ["general", "vip", "staff", "admin"])
+def test_ticket_without_serial_is_confident(issue, role):
+    # Non-batch tickets carry no TICKET section; staff and admin must still stop early
+    assert is_confident(role, _decode(role, issue(depth=1)))
+
+
+def test_missing_required_section_is_not_confident():
+    assert not is_confident("staff", {"general": {"name": "x"}})
+    assert not is_confident("admin", {"general": {"name": "x"}, "vip": {"vip_contact": "a"}})
+
+
+def _write_video(path, png: bytes, frames: int = 3) -> str:
+    cv2 = pytest.importorskip("cv2")
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+    # A camera sees each ticket pixel over a few sensor pixels
+    image = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+    image = cv2.copyMakeBorder(image, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=(255, 255, 255))
+    height, width = image.shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"FFV1"), 10, (width, height))
+    for _ in range(frames):
+        writer.write(image)
+    writer.release()
+    return str(path)
+
+
+def test_scanner_relearns_module_size_between_scans(issue, tmp_path):
+    from stream_scanner import StreamScanner
+
+    scanner = StreamScanner(role="vip")
+    first = scanner.scan(_write_video(tmp_path / "d2.avi", issue(depth=2)))
+    assert first["confident"]
+    learned = scanner.module_size
+    second = scanner.scan(_write_video(tmp_path / "d1.avi", issue(depth=1)))
+    assert second["confident"]
+    assert scanner.module_size != learned
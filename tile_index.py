@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import qrcode
+
+from config import QR_BORDER, TILE_INDEX_CACHE_SIZE, TILE_INDEX_MIN_AGREEMENT
+
+# (payload sha256, version) -> (dark-module grid, tile positions); both read-only
+_INDEX_CACHE = OrderedDict()
+_INDEX_LOCK = threading.Lock()  # decode_many decodes in threads
+
+
+def build_qr_matrix(public_payload: str, version: int) -> list[list[bool]]:
+    """
+    Regenerates the public QR matrix exactly as the encoder builds it (quiet zone included).
+    """
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=qrcode.constants.ERROR_CORRECT_Q,
+        box_size=1,
+        border=QR_BORDER,
+    )
+    qr.add_data(public_payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+@lru_cache(maxsize=TILE_INDEX_CACHE_SIZE)
+def min_version_for_payload(public_payload: str) -> int:
+    """
+    Smallest QR version that holds the payload; smaller versions grow to this one.
+    """
+    qr = qrcode.QRCode(version=None, error_correction=qrcode.constants.ERROR_CORRECT_Q, box_size=1, border=QR_BORDER)
+    qr.add_data(public_payload)
+    qr.make(fit=True)
+    return qr.version
+
+
+def matrix_version(matrix) -> int:
+    return (len(matrix) - 2 * QR_BORDER - 17) // 4
+
+
+def version_for_width(width: int, module_size: int) -> int | None:
+    """
+    QR version of a rendered ticket `width` pixels wide, or None if the width is not a whole symbol.
+    """
+    if module_size <= 0 or width % module_size:
+        return None
+    span = width // module_size - 2 * QR_BORDER - 17
+    if span <= 0 or span % 4 or not 1 <= span // 4 <= 40:
+        return None
+    return span // 4
+
+
+def matrix_tile_positions(matrix) -> np.ndarray:
+    """
+    (row, col) of every dark module in scan order, the order tiles are filled in.
+    """
+    return np.argwhere(np.asarray(matrix, dtype=bool)).astype(np.int32)
+
+
+def tile_index_for_payload(public_payload: str, version: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cached (dark-module grid, tile positions) for a public payload at a given QR version.
+    """
+    key = (hashlib.sha256(public_payload.encode("utf-8")).hexdigest(), version)
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None:
+            _INDEX_CACHE.move_to_end(key)
+            return cached
+
+    matrix = build_qr_matrix(public_payload, version)
+    if matrix_version(matrix) != version:
+        raise ValueError(f"Payload does not fit QR version {version}.")
+    grid = np.asarray(matrix, dtype=bool)
+    positions = matrix_tile_positions(grid)
+    grid.setflags(write=False)
+    positions.setflags(write=False)
+    with _INDEX_LOCK:
+        _INDEX_CACHE[key] = (grid, positions)
+        if len(_INDEX_CACHE) > TILE_INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return grid, positions
+
+
+def grid_agreement(pixels: np.ndarray, grid: np.ndarray, module_size: int) -> float:
+    """
+    Fraction of modules whose center pixel agrees with the grid. The center
+    is read on the per-pixel channel minimum, so red and purple overlay
+    still counts as dark and no tile threshold is involved.
+    """
+    centers = pixels[module_size // 2::module_size, module_size // 2::module_size]
+    if centers.shape[0] < grid.shape[0] or centers.shape[1] < grid.shape[1]:
+        return 0.0
+    centers = centers[:grid.shape[0], :grid.shape[1]]
+    dark = centers.min(axis=2) <= 127 if centers.ndim == 3 else centers <= 127
+    return float(np.mean(dark == grid))
+
+
+def tile_positions_for_image(pixels: np.ndarray, public_payload: str | None, module_size: int) -> np.ndarray | None:
+    """
+    Tile positions for a rendered ticket, derived from its public payload
+    instead of thresholding every module. Returns None when the payload is
+    unknown or the regenerated matrix does not line up with the image.
+    """
+    if not public_payload:
+        return None
+    version = version_for_width(pixels.shape[1], module_size)
+    if version is None:
+        return None
+    try:
+        grid, positions = tile_index_for_payload(public_payload, version)
+    except ValueError:
+        return None
+    if grid_agreement(pixels, grid, module_size) < TILE_INDEX_MIN_AGREEMENT:
+        return None
+    return positions
@@ -3,18 +3,22 @@ import os
 import sys
 import tempfile
 import streamlit as st
+from PIL import Image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 from main import (
     append_overlay_to_existing_qr,
+    decode_public_url,
     encrypt_rsa,
     extract_header_from_qr,
     load_key,
+    module_size_candidates,
 )
-from config import FILLER_TILE_COUNT, MODULE_SIZE, MODULE_SIZE_RECURSIVE_CANDIDATES
+from config import FILLER_TILE_COUNT, MODULE_SIZE
 from proto.event_pb2 import AccessLevelAsserter
 from structured_codec import encode_sections_protobuf
+from reccursive_decoder import load_image_array
 from ui.style import inject_style, page_title, render_sidebar_nav
 from ui.schema_form import load_schema, render_layers
 
@@ -37,7 +41,7 @@ if l0_file:
         with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
             tmp.write(l0_file.getvalue())
             tmp_path = tmp.name
-        for candidate_size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES:
+        for candidate_size in module_size_candidates(Image.open(tmp_path).width):
             try:
                 header, _ = extract_header_from_qr(tmp_path, module_size=candidate_size)
                 issuer_max_depth = header.get("asserter_max_depth")
@@ -76,7 +80,7 @@ if submitted:
 
             header = None
             header_end_tile = None
-            for candidate_size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES:
+            for candidate_size in module_size_candidates(Image.open(tmp_path).width):
                 try:
                     header, header_end_tile = extract_header_from_qr(tmp_path, module_size=candidate_size)
                     break
@@ -127,6 +131,8 @@ if submitted:
                 module_size=header.get("module_size", MODULE_SIZE),
                 depth=overlay_depth,
                 start_tile=tile_start,
+                overlay_header=bool(header.get("overlay_header")),
+                public_payload=decode_public_url(load_image_array(tmp_path)),
             )
             output_dir = "QRcodes"
             os.makedirs(output_dir, exist_ok=True)
@@ -8,10 +8,11 @@ from PIL import Image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from main import append_overlay_to_existing_qr, encrypt_rsa, extract_header_from_qr, load_key
+from main import append_overlay_to_existing_qr, decode_public_url, encrypt_rsa, extract_header_from_qr, load_key, module_size_candidates
+from reccursive_decoder import load_image_array
 from proto.event_pb2 import AccessLevelAsserter
 from structured_codec import encode_sections_protobuf
-from config import FILLER_TILE_COUNT, MODULE_SIZE, MODULE_SIZE_RECURSIVE_CANDIDATES
+from config import FILLER_TILE_COUNT, MODULE_SIZE
 from c2pa_integration import (
     build_manifest_payload,
     compute_commitments,
@@ -48,7 +49,7 @@ with st.expander("Optional: Add Asserter Overlay", expanded=False):
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
                     tmp.write(img_file.getvalue())
                     tmp_path = tmp.name
-                for candidate_size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES:
+                for candidate_size in module_size_candidates(Image.open(tmp_path).width):
                     try:
                         header, _ = extract_header_from_qr(tmp_path, module_size=candidate_size)
                         issuer_max_depth = header.get("asserter_max_depth")
@@ -111,7 +112,7 @@ if st.button("Attach Signed Metadata + Sign"):
 
                     header = None
                     header_end_tile = None
-                    for candidate_size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES:
+                    for candidate_size in module_size_candidates(Image.open(tmp_path).width):
                         try:
                             header, header_end_tile = extract_header_from_qr(tmp_path, module_size=candidate_size)
                             break
@@ -144,6 +145,8 @@ if st.button("Attach Signed Metadata + Sign"):
                         module_size=header.get("module_size", MODULE_SIZE),
                         depth=overlay_depth,
                         start_tile=tile_start,
+                        overlay_header=bool(header.get("overlay_header")),
+                        public_payload=decode_public_url(load_image_array(tmp_path)),
                     )
                 finally:
                     if tmp_path and os.path.exists(tmp_path):
@@ -3,11 +3,12 @@ import os
 import sys
 import tempfile
 import streamlit as st
+from PIL import Image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from config import MODULE_SIZE, MODULE_SIZE_RECURSIVE_CANDIDATES
-from c2pa_integration import is_c2pa_available, verify_png_with_c2pa
-from main import main, decode_asserter_overlay, extract_header_from_qr
+from c2pa_integration import is_c2pa_available
+from main import decode_asserter_overlay, extract_header_from_qr, module_size_candidates
+from decode_cache import cached_decode, cached_verify, get_result_cache, image_cache_key
 
 
 def render_event_sections(event_data: dict) -> None:
@@ -77,6 +78,13 @@ def render_event_sections(event_data: dict) -> None:
 
 
 def _detect_asserter_overlay(image_bytes: bytes) -> str:
+    return get_result_cache().get_or_compute(
+        image_cache_key(image_bytes, "asserter_overlay"),
+        lambda: _scan_asserter_overlay(image_bytes),
+    )
+
+
+def _scan_asserter_overlay(image_bytes: bytes) -> str:
     tmp_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
@@ -84,7 +92,7 @@ def _detect_asserter_overlay(image_bytes: bytes) -> str:
             tmp_path = tmp.name
         header = None
         header_end_tile = None
-        for candidate_size in [MODULE_SIZE] + MODULE_SIZE_RECURSIVE_CANDIDATES:
+        for candidate_size in module_size_candidates(Image.open(tmp_path).width):
             try:
                 header, header_end_tile = extract_header_from_qr(tmp_path, module_size=candidate_size)
                 break
@@ -105,7 +113,7 @@ def _detect_signed_metadata(image_bytes: bytes, trust_store_dir: str) -> tuple[s
     if not is_c2pa_available():
         return "Unknown", None
     try:
-        result = verify_png_with_c2pa(image_bytes, trust_store_dir=trust_store_dir)
+        result = cached_verify(image_bytes, trust_store_dir)
         manifest_present = result.get("manifest_present")
         if manifest_present is True:
             return "Present", result
@@ -160,7 +168,7 @@ def render_viewer(
 
         if st.button(button_label):
             with st.spinner("Decoding..."):
-                result = main(role.lower(), image_bytes)
+                result = cached_decode(role.lower(), image_bytes)
 
             st.success("✅ Done!")
             render_event_sections(result)